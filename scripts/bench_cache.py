@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Pfn AST Cache Benchmark
+
+Copies the bootstrap compiler sources into a temporary directory and times
+parsing every file from scratch against loading the trees an ``ASTCache``
+stored on the previous run, reporting hit/miss counts and the size of the
+cache entries. The cache directory is a temporary one too.
+
+Usage:
+    python scripts/bench_cache.py [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from pfn.lexer import Lexer, read_source  # noqa: E402
+from pfn.parser import ASTCache, Parser  # noqa: E402
+from pfn.parser.cache import CACHE_DIR_ENV, cache_dir  # noqa: E402
+
+BOOTSTRAP_DIR = ROOT / "src" / "pfn" / "bootstrap"
+
+
+def copy_corpus(target: Path) -> list[Path]:
+    """Write each bootstrap source to ``target`` without its ``module`` header."""
+    paths = []
+    for source in sorted(BOOTSTRAP_DIR.glob("*.pfn")):
+        lines = source.read_text().splitlines()
+        path = target / source.name
+        path.write_text("\n".join(ln for ln in lines if not ln.startswith("module ")))
+        paths.append(path)
+    return paths
+
+
+def best_of(repeat: int, run: Callable[[], Any]) -> float:
+    """Return the best wall time over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Pfn AST cache")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ[CACHE_DIR_ENV] = str(Path(tmp) / "cache")
+        paths = copy_corpus(Path(tmp))
+        size = sum(path.stat().st_size for path in paths)
+        print(f"Corpus: {len(paths)} files, {size / 1024:.1f} KiB")
+
+        parse = best_of(
+            args.repeat,
+            lambda: [Parser(Lexer(read_source(p)).stream()).parse() for p in paths],
+        )
+        cache = ASTCache()
+        for path in paths:
+            cache.parse(path, read_source(path))
+        cache.hits = cache.misses = 0
+        load = best_of(
+            args.repeat, lambda: [cache.parse(p, read_source(p)) for p in paths]
+        )
+        entries = sum(p.stat().st_size for p in cache_dir().iterdir())
+
+        print(f" parse: {parse * 1000:8.1f} ms")
+        print(f"cached: {load * 1000:8.1f} ms  ({parse / load:.1f}x)")
+        print(
+            f"Cache: {cache.hits} hits, {cache.misses} misses,"
+            f" {entries / 1024:.1f} KiB on disk"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Pfn Exhaustiveness Benchmark
+
+Times exhaustiveness and redundancy checking of generated matches of
+growing width, comparing the pattern-matrix usefulness check with testing
+each arm against every earlier one by ``pattern_covers``. The ``literals``
+shape is integer literal arms ending in a wildcard, ``constructors`` is one
+arm per constructor of a generated sum type, and ``nested`` is arms of
+``Some (i, True)``-style tuples under a constructor.
+
+Usage:
+    python scripts/bench_exhaustiveness.py [--repeat N] [--sizes 100,1000]
+                                           [--shape literals]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from pfn.parser import ast  # noqa: E402
+from pfn.typechecker.exhaustiveness import (  # noqa: E402
+    ConstructorSignatures,
+    Pattern,
+    PBool,
+    PCon,
+    PInt,
+    PTuple,
+    PWild,
+    check_exhaustiveness,
+    constructor_signatures,
+    pattern_covers,
+)
+
+
+def literals(n: int) -> tuple[list[Pattern], ConstructorSignatures]:
+    return [PInt(i) for i in range(n)] + [PWild()], constructor_signatures()
+
+
+def constructors(n: int) -> tuple[list[Pattern], ConstructorSignatures]:
+    ctors = [ast.Constructor(f"C{i}") for i in range(n)]
+    signatures = constructor_signatures([ast.TypeDecl("Wide", constructors=ctors)])
+    return [PCon(f"C{i}") for i in range(n)], signatures
+
+
+def nested(n: int) -> tuple[list[Pattern], ConstructorSignatures]:
+    patterns: list[Pattern] = [
+        PCon("Some", (PTuple((PInt(i), PBool(i % 2 == 0))),)) for i in range(n)
+    ]
+    return patterns + [PCon("Some", (PWild(),)), PCon("None")], constructor_signatures()
+
+
+SHAPES: dict[str, Callable[[int], tuple[list[Pattern], ConstructorSignatures]]] = {
+    "literals": literals,
+    "constructors": constructors,
+    "nested": nested,
+}
+
+
+def pairwise(patterns: list[Pattern]) -> list[int]:
+    """Redundant arms by comparing each arm with every earlier one."""
+    covered: list[Pattern] = []
+    redundant = []
+    for i, p in enumerate(patterns):
+        if any(pattern_covers(prev, p) for prev in covered):
+            redundant.append(i)
+        else:
+            covered.append(p)
+    return redundant
+
+
+def best_time(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark exhaustiveness checks")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size")
+    parser.add_argument("--shape", choices=SHAPES, default="literals")
+    parser.add_argument(
+        "--sizes", default="100,1000,4000", help="Comma-separated numbers of arms"
+    )
+    args = parser.parse_args()
+
+    for size in [int(n) for n in args.sizes.split(",")]:
+        patterns, signatures = SHAPES[args.shape](size)
+        matrix = best_time(
+            lambda: check_exhaustiveness(patterns, signatures=signatures), args.repeat
+        )
+        naive = best_time(lambda: pairwise(patterns), args.repeat)
+        print(
+            f"{size:>6} arms: usefulness {matrix * 1000:8.1f} ms"
+            f"  pairwise {naive * 1000:8.1f} ms"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
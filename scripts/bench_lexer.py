@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pfn Lexer Benchmark
+
+Measures lexer throughput and peak memory on the bootstrap compiler sources,
+comparing the character-at-a-time scanner with the table-driven regex
+scanner, and a token list with a TokenBuffer. With ``--edits`` it instead
+measures the latency of a one-character edit in the middle of files of
+growing size, re-lexed in full and incrementally.
+
+Usage:
+    python scripts/bench_lexer.py [--repeat N] [--scale N] [--edits]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from pfn.lexer import Lexer, TextEdit, relex  # noqa: E402
+
+BOOTSTRAP_DIR = ROOT / "src" / "pfn" / "bootstrap"
+
+
+def load_corpus(scale: int) -> str:
+    """Concatenate the bootstrap sources ``scale`` times."""
+    sources = [p.read_text() for p in sorted(BOOTSTRAP_DIR.glob("*.pfn"))]
+    return "\n".join(sources * scale)
+
+
+def time_lexer(run: Callable[[], Any], repeat: int) -> tuple[float, int]:
+    """Return the best wall time over ``repeat`` runs and the token count."""
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = run()
+        best = min(best, time.perf_counter() - start)
+        count = len(tokens)
+    return best, count
+
+
+def peak_memory(run: Callable[[], Any]) -> int:
+    """Return the tracemalloc peak in bytes for a single run."""
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+ENGINES: list[tuple[str, Callable[[str], Any]]] = [
+    ("char", lambda source: Lexer(source).tokenize()),
+    ("regex", lambda source: Lexer(source, regex=True).tokenize()),
+    ("buffer", lambda source: Lexer(source, regex=True).tokenize_buffer()),
+]
+
+
+def edit_latency(scales: list[int], word: str) -> None:
+    """Time typing ``word`` in the middle of corpora of each scale."""
+    for scale in scales:
+        source = load_corpus(scale)
+        tokens = Lexer(source, regex=True).tokenize_buffer()
+        offset = source.index("\n", len(source) // 2)
+
+        start = time.perf_counter()
+        Lexer(source, regex=True).tokenize_buffer()
+        full = time.perf_counter() - start
+
+        rescanned = 0
+        start = time.perf_counter()
+        for i, char in enumerate(word):
+            result = relex(source, tokens, TextEdit(offset + i, 0, char))
+            source, tokens = result.source, result.tokens
+            rescanned += result.new_stop - result.start
+        per_edit = (time.perf_counter() - start) / len(word)
+
+        print(
+            f"x{scale:<3} {len(source):>10,} chars: full {full * 1000:8.1f} ms"
+            f"  incremental {per_edit * 1000:6.2f} ms/edit"
+            f"  ({rescanned / len(word):.1f} tokens rescanned)"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Pfn lexer")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per engine")
+    parser.add_argument("--scale", type=int, default=10, help="Corpus copies")
+    parser.add_argument(
+        "--edits", action="store_true", help="Benchmark incremental re-lexing"
+    )
+    args = parser.parse_args()
+
+    if args.edits:
+        edit_latency([1, 4, 16, 64], " total + 1")
+        return 0
+
+    source = load_corpus(args.scale)
+    lines = source.count("\n") + 1
+    print(f"Corpus: {len(source):,} chars, {lines:,} lines")
+
+    baseline = None
+    for name, engine in ENGINES:
+        elapsed, count = time_lexer(lambda: engine(source), args.repeat)
+        peak = peak_memory(lambda: engine(source))
+        rate = count / elapsed
+        speedup = "" if baseline is None else f"  ({baseline / elapsed:.2f}x)"
+        baseline = baseline or elapsed
+        print(
+            f"{name:>6}: {elapsed * 1000:8.1f} ms  {rate:12,.0f} tokens/s"
+            f"  peak {peak / 2**20:7.1f} MiB{speedup}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Pfn Parser Benchmark
+
+Measures lexing plus parsing time and peak memory on the bootstrap compiler
+sources or on generated operator-heavy expressions, feeding the parser a
+token list, a TokenBuffer, or a TokenStream that is scanned on demand. The
+number of Python calls, the deepest call stack during one parse, and the
+memory still held by the finished AST are reported as well. With
+``--workers`` it instead times ``parse_parallel`` for each worker count
+against a serial parse, and with ``--scaling`` it times inputs that stress
+the speculative lookahead (nested match cases, long applications, nested
+arguments) at doubling sizes, where linear parsing shows a ratio near 2.
+
+Usage:
+    python scripts/bench_parser.py [--repeat N] [--scale N] [--corpus NAME]
+                                   [--workers 1,2,4] [--scaling]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from bench_lexer import load_corpus, peak_memory, time_lexer  # noqa: E402
+from pfn.lexer import Lexer  # noqa: E402
+from pfn.parser import Parser, parse_parallel  # noqa: E402
+
+
+def load_module(scale: int) -> str:
+    """The bootstrap sources as one module without ``module`` headers."""
+    lines = load_corpus(scale).splitlines()
+    return "\n".join(line for line in lines if not line.startswith("module "))
+
+
+OPERATORS = ["||", "&&", "==", "<", "::", "++", "+", "-", "*", "/", "%"]
+ATOMS = ["x", "1", "f y", "(a + b)", "[1, 2]", "-n", "g (h 1) 2"]
+
+
+def load_expressions(scale: int) -> str:
+    """Definitions whose bodies are long chains of binary operators."""
+    rng = random.Random(0)
+    defs = []
+    for i in range(500 * scale):
+        parts = [rng.choice(ATOMS)]
+        for _ in range(rng.randint(4, 16)):
+            parts += [rng.choice(OPERATORS), rng.choice(ATOMS)]
+        defs.append(f"def f{i} x y = " + " ".join(parts))
+    return "\n".join(defs)
+
+
+CORPORA: dict[str, Callable[[int], str]] = {
+    "bootstrap": load_module,
+    "expr": load_expressions,
+}
+
+
+def nested_matches(n: int) -> str:
+    """``n`` nested matches whose cases all end before a tuple binding."""
+    lines = ["def f x = let r = match x with"]
+    lines += ["  | A -> match x with"] * n
+    lines.append("  | B -> 0")
+    lines.append("  (" + ", ".join(f"p{i}" for i in range(n)) + ") = pair")
+    lines.append("  in r")
+    return "\n".join(lines)
+
+
+SCALING: dict[str, Callable[[int], str]] = {
+    "nested match": nested_matches,
+    "application": lambda n: "def f x = g " + " ".join(f"a{i}" for i in range(n)),
+    "nested parens": lambda n: "def f x = g " + "Foo (g " * n + "x" + ")" * n,
+    "nested lists": lambda n: "def f x = g " + "[g " * n + "x" + "]" * n,
+}
+
+
+def lookahead_scaling(repeat: int) -> None:
+    """Time each ``SCALING`` input at doubling sizes."""
+    sys.setrecursionlimit(20000)
+    for name, generate in SCALING.items():
+        times = []
+        for n in (50, 100, 200, 400):
+            tokens = Lexer(generate(n), regex=True).tokenize()
+            elapsed, _ = time_lexer(lambda: Parser(tokens).parse().declarations, repeat)
+            times.append(elapsed)
+        ratios = " ".join(f"{b / a:4.1f}" for a, b in zip(times, times[1:]))
+        print(f"{name:>13}: {times[-1] * 1000:8.1f} ms at n=400  growth {ratios}")
+
+
+def count_calls(run: Callable[[], Any]) -> tuple[int, int]:
+    """Return the Python calls made by ``run`` and the deepest stack."""
+    calls = depth = max_depth = 0
+
+    def profile(frame: Any, event: str, arg: Any) -> None:
+        nonlocal calls, depth, max_depth
+        if event == "call":
+            calls += 1
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif event == "return":
+            depth -= 1
+
+    sys.setprofile(profile)
+    try:
+        run()
+    finally:
+        sys.setprofile(None)
+    return calls, max_depth
+
+
+ENGINES: list[tuple[str, Callable[[str], Any]]] = [
+    ("list", lambda source: Parser(Lexer(source, regex=True).tokenize()).parse()),
+    (
+        "buffer",
+        lambda source: Parser(Lexer(source, regex=True).tokenize_buffer()).parse(),
+    ),
+    ("stream", lambda source: Parser(Lexer(source, regex=True).stream()).parse()),
+]
+
+
+def retained_memory(run: Callable[[], Any]) -> int:
+    """Return the bytes still allocated by ``run`` once it has returned."""
+    tracemalloc.start()
+    try:
+        result = run()
+        size = tracemalloc.get_traced_memory()[0]
+        del result
+        return size
+    finally:
+        tracemalloc.stop()
+
+
+def parallel_speedup(source: str, workers: list[int], repeat: int) -> None:
+    """Time ``parse_parallel`` per worker count against a serial parse."""
+    tokens = Lexer(source, regex=True).tokenize_buffer()
+    serial, count = time_lexer(lambda: Parser(tokens).parse().declarations, repeat)
+    print(f"serial: {serial * 1000:8.1f} ms  {count:,} declarations")
+    for n in workers:
+        elapsed, _ = time_lexer(lambda: parse_parallel(tokens, n).declarations, repeat)
+        print(f"{n:>3} workers: {elapsed * 1000:8.1f} ms  ({serial / elapsed:.2f}x)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Pfn parser")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine")
+    parser.add_argument("--scale", type=int, default=4, help="Corpus copies")
+    parser.add_argument("--corpus", choices=CORPORA, default="bootstrap")
+    parser.add_argument("--workers", help="Comma-separated parallel worker counts")
+    parser.add_argument(
+        "--scaling", action="store_true", help="Time lookahead-heavy inputs by size"
+    )
+    args = parser.parse_args()
+
+    if args.scaling:
+        lookahead_scaling(args.repeat)
+        return 0
+
+    source = CORPORA[args.corpus](args.scale)
+    print(f"Corpus: {len(source):,} chars, {source.count(chr(10)) + 1:,} lines")
+
+    if args.workers:
+        parallel_speedup(source, [int(n) for n in args.workers.split(",")], args.repeat)
+        return 0
+
+    for name, engine in ENGINES:
+        elapsed, count = time_lexer(lambda: engine(source).declarations, args.repeat)
+        peak = peak_memory(lambda: engine(source))
+        print(
+            f"{name:>6}: {elapsed * 1000:8.1f} ms  {count:,} declarations"
+            f"  peak {peak / 2**20:7.1f} MiB"
+        )
+
+    tokens = Lexer(source, regex=True).tokenize()
+    retained = retained_memory(lambda: Parser(tokens).parse())
+    print(f"AST size: {retained / 2**20:.1f} MiB")
+    calls, depth = count_calls(lambda: Parser(tokens).parse())
+    print(f"Parser calls: {calls:,} ({calls / len(tokens):.1f} per token)")
+    print(f"Deepest stack: {depth} frames")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Pfn Row Benchmark
+
+Times the row operations record types go through on wide records: unifying
+a closed record with an open one that names some of its fields, extending
+a row field by field, and substituting into a row whose tail is bound. Each
+record has ``--fields`` labels, given in scrambled order, with field types
+that mention type variables so substitution has work to do.
+
+Usage:
+    python scripts/bench_rows.py [--repeat N] [--fields 10,20,40,80]
+                                 [--count N]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from pfn.typechecker.rows import (  # noqa: E402
+    Row,
+    row_empty,
+    row_extend,
+    row_substitute,
+    unify_rows,
+)
+from pfn.types import Subst, TInt, TList, TRowPoly, TVar, Type  # noqa: E402
+
+
+def record_fields(width: int, seed: int) -> dict[str, Type]:
+    """``width`` fields in a scrambled order; odd ones are polymorphic."""
+    numbers = list(range(width))
+    random.Random(seed).shuffle(numbers)
+    return {
+        f"field{i:03}": TList(TVar(f"a{i}")) if i % 2 else TInt() for i in numbers
+    }
+
+
+def best_time(run: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark record row operations")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per width")
+    parser.add_argument("--count", type=int, default=2000, help="Operations per run")
+    parser.add_argument(
+        "--fields", default="10,20,40,80", help="Comma-separated record widths"
+    )
+    args = parser.parse_args()
+
+    for width in [int(n) for n in args.fields.split(",")]:
+        closed = Row(record_fields(width, 1))
+        wanted = record_fields(width, 2)
+        open_row = Row({k: wanted[k] for k in list(wanted)[: width // 2]}, "r")
+        tail = TRowPoly({f"extra{i}": TInt() for i in range(width // 2)}, "s")
+        subst = Subst({f"a{i}": TInt() for i in range(width)} | {"r": tail})
+
+        def unify() -> None:
+            for _ in range(args.count):
+                unify_rows(closed, open_row, Subst())
+
+        def extend() -> None:
+            for _ in range(args.count // width):
+                row = row_empty()
+                for label, t in wanted.items():
+                    row = row_extend(row, label, t)
+
+        def substitute() -> None:
+            for _ in range(args.count):
+                row_substitute(open_row, subst)
+
+        times = [best_time(run, args.repeat) for run in (unify, extend, substitute)]
+        print(
+            f"{width:>4} fields: unify {times[0] * 1000:7.1f} ms"
+            f"  extend {times[1] * 1000:7.1f} ms"
+            f"  substitute {times[2] * 1000:7.1f} ms"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Pfn Source Loading Benchmark
+
+Compares lexing a large generated source file read with ``read_text`` against
+lexing its memory-mapped bytes via ``read_source``. Each mode runs in a fresh
+interpreter so the reported peak RSS belongs to that mode alone.
+
+Usage:
+    python scripts/bench_source.py [--mb N]
+"""
+from __future__ import annotations
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from pfn.lexer import Lexer, read_source  # noqa: E402
+
+BOOTSTRAP_DIR = ROOT / "src" / "pfn" / "bootstrap"
+
+MODES = ["read_text", "mmap"]
+
+
+def write_corpus(path: Path, megabytes: int) -> int:
+    """Write bootstrap sources repeatedly until ``path`` holds ``megabytes``."""
+    chunk = "\n".join(p.read_text() for p in sorted(BOOTSTRAP_DIR.glob("*.pfn")))
+    data = chunk.encode("utf-8") + b"\n"
+    copies = max(1, megabytes * 2**20 // len(data))
+    with open(path, "wb") as f:
+        for _ in range(copies):
+            f.write(data)
+    return copies * len(data)
+
+
+def run_mode(mode: str, path: Path) -> None:
+    """Lex ``path`` in this process and print seconds, tokens and RSS."""
+    start = time.perf_counter()
+    source = path.read_text() if mode == "read_text" else read_source(path)
+    tokens = Lexer(source, regex=True).tokenize_buffer()
+    elapsed = time.perf_counter() - start
+    rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed} {len(tokens)} {rss_kib}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Pfn source loading")
+    parser.add_argument("--mb", type=int, default=20, help="Generated file size")
+    parser.add_argument(
+        "--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.child[0], Path(args.child[1]))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "generated.pfn"
+        size = write_corpus(path, args.mb)
+        print(f"Source: {size / 2**20:.1f} MiB")
+
+        for mode in MODES:
+            result = subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(path)],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            elapsed, count, rss_kib = result.stdout.split()
+            print(
+                f"{mode:>9}: {float(elapsed):8.2f} s  {int(count):,} tokens"
+                f"  peak RSS {int(rss_kib) / 1024:8.1f} MiB"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
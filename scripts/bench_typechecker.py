@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Pfn Type Checker Benchmark
+
+Times type inference for every top-level definition of a corpus, the way
+``pfn check`` does, inside environments padded with ``--prelude`` extra
+bindings to stand in for the prelude and imported Python modules. The
+``bootstrap`` corpus is the bootstrap compiler sources, with every name they
+use but do not define bound to ``forall a. a``; definitions using syntax the
+checker does not support yet are counted and skipped; ``--files`` limits it
+to some of the sources. The ``binders`` corpus is generated definitions made
+of nested lambda and ``match`` binders, and ``applications`` is definitions
+whose bodies are long lists of applications. With ``--jobs`` the corpus is
+checked as one module by ``check_definitions`` instead, with that many
+worker processes.
+
+Usage:
+    python scripts/bench_typechecker.py [--repeat N] [--corpus NAME]
+                                        [--files TypeChecker,Parser]
+                                        [--prelude 0,1000,10000] [--jobs N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from pfn.lexer import Lexer  # noqa: E402
+from pfn.parser import Parser, ast  # noqa: E402
+from pfn.typechecker import (  # noqa: E402
+    TypeChecker,
+    TypeError as PfnTypeError,
+    check_definitions,
+)
+from pfn.types import Scheme, TVar, TypeEnv  # noqa: E402
+
+BOOTSTRAP_DIR = ROOT / "src" / "pfn" / "bootstrap"
+
+ANY = Scheme(("a",), TVar("a"))
+
+
+def used_names(node: Any, names: set[str]) -> set[str]:
+    """Collect the name of every ``ast.Var`` below ``node``."""
+    if isinstance(node, ast.Var):
+        names.add(node.name)
+    for name in getattr(node, "__dataclass_fields__", ()):
+        value = getattr(node, name)
+        for child in value if isinstance(value, list) else [value]:
+            if hasattr(child, "__dataclass_fields__"):
+                used_names(child, names)
+    return names
+
+
+def load_bootstrap(files: list[str] | None = None) -> list[ast.DefDecl]:
+    """The definitions of the bootstrap sources without ``module`` headers."""
+    defs = []
+    for path in sorted(BOOTSTRAP_DIR.glob("*.pfn")):
+        if files and path.stem not in files:
+            continue
+        lines = path.read_text().splitlines()
+        source = "\n".join(ln for ln in lines if not ln.startswith("module "))
+        module = Parser(Lexer(source).tokenize()).parse()
+        defs += [d for d in module.declarations if isinstance(d, ast.DefDecl)]
+    return defs
+
+
+def load_binders(files: list[str] | None = None) -> list[ast.DefDecl]:
+    """Definitions that each bind 60 names in nested lambdas and matches."""
+    defs = []
+    for i in range(100):
+        body = "x"
+        for j in range(20):
+            body = (
+                f"(fn y{j} => match ({body}, y{j}) with"
+                f" | (a{j}, b{j}) -> a{j} + b{j}) {j}"
+            )
+        source = f"def f{i} x = {body}"
+        defs += Parser(Lexer(source).tokenize()).parse().declarations
+    return defs
+
+
+def load_applications(files: list[str] | None = None) -> list[ast.DefDecl]:
+    """Definitions whose bodies are lists of 400 applications."""
+    defs = []
+    for i in range(10):
+        elements = ", ".join(f"f (g x {j})" for j in range(400))
+        source = f"def h{i} x = [{elements}]"
+        defs += Parser(Lexer(source).tokenize()).parse().declarations
+    return defs
+
+
+CORPORA: dict[str, Callable[[list[str] | None], list[ast.DefDecl]]] = {
+    "bootstrap": load_bootstrap,
+    "binders": load_binders,
+    "applications": load_applications,
+}
+
+
+def base_env(defs: list[ast.DefDecl], prelude: int) -> TypeEnv:
+    """Bind every name ``defs`` use plus ``prelude`` padding names."""
+    names = set()
+    for decl in defs:
+        used_names(decl.body, names)
+    bindings = {name: ANY for name in names}
+    bindings.update((f"prelude{i}", ANY) for i in range(prelude))
+    return TypeEnv(bindings)
+
+
+def check_all(defs: list[ast.DefDecl], env: TypeEnv) -> int:
+    """Infer each definition as ``pfn check`` does; return how many failed."""
+    failed = 0
+    for decl in defs:
+        checker = TypeChecker(env)
+        try:
+            checker.infer_definition(decl)
+        except PfnTypeError:
+            failed += 1
+    return failed
+
+
+def check_module(defs: list[ast.DefDecl], env: TypeEnv, jobs: int) -> int:
+    """Check ``defs`` as one module; return 0, or all of them if it fails."""
+    try:
+        check_definitions(defs, env, workers=jobs)
+    except PfnTypeError:
+        return len(defs)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Pfn type checker")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size")
+    parser.add_argument("--corpus", choices=CORPORA, default="bootstrap")
+    parser.add_argument(
+        "--files", help="Comma-separated bootstrap sources to load, e.g. Parser"
+    )
+    parser.add_argument(
+        "--prelude", default="0,1000,10000", help="Comma-separated padding sizes"
+    )
+    parser.add_argument(
+        "--jobs", type=int, help="Check as one module with N worker processes"
+    )
+    args = parser.parse_args()
+
+    files = args.files.split(",") if args.files else None
+    defs = CORPORA[args.corpus](files)
+    for size in [int(n) for n in args.prelude.split(",")]:
+        env = base_env(defs, size)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            if args.jobs:
+                failed = check_module(defs, env, args.jobs)
+            else:
+                failed = check_all(defs, env)
+            best = min(best, time.perf_counter() - start)
+        print(
+            f"prelude {size:>6}: {best * 1000:8.1f} ms  {len(defs) - failed:,}"
+            f" of {len(defs):,} definitions checked"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
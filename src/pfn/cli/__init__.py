@@ -1,100 +1,124 @@
 from __future__ import annotations
 
 import argparse
+import cProfile
+import json
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
-from pfn.codegen import CodeGenerator
-from pfn.lexer import Lexer
-from pfn.parser import Parser
-from pfn.parser.ast import DefDecl
+from pfn.lexer import SourceText
+from pfn.parser import ASTCache
+from pfn.parser.ast import Module
+from pfn.profiling import Timings, write_profile
 from pfn.repl import start_repl
-from pfn.typechecker import TypeChecker, TypeError as PfnTypeError
-from pfn.types import Scheme, TInt, Subst, TypeEnv, TVar, TFun
-
-
-def compile_source(source: str) -> str:
-    tokens = Lexer(source).tokenize()
-    module = Parser(tokens).parse()
-    return CodeGenerator().generate_module(module)
-
-
-def typecheck_source(source: str) -> tuple[bool, str]:
-    tokens = Lexer(source).tokenize()
-    module = Parser(tokens).parse()
-
-    checker = TypeChecker()
-    global_env = TypeEnv()
-
-    try:
-        for decl in module.declarations:
-            if isinstance(decl, DefDecl):
-                checker.env = global_env
-
-                for param in decl.params:
-                    tv = checker.fresh_var()
-                    checker.env = checker.env.extend(param.name, Scheme((), tv))
-
-                t = checker.infer(decl.body)
-
-                for param in reversed(decl.params):
-                    scheme = checker.env.lookup(param.name)
-                    if scheme:
-                        t = TFun(scheme.type, t)
-
-                subst = Subst()
-                free_in_env = subst.free_vars_env(global_env)
-                free_in_t = subst.free_vars(t)
-                gen_vars = tuple(sorted(free_in_t - free_in_env))
-                scheme = Scheme(gen_vars, t)
-
-                global_env = global_env.extend(decl.name, scheme)
-                print(f"{decl.name} : {t}")
-        return True, "Type check passed"
-    except PfnTypeError as e:
-        return False, f"Type error: {e}"
+from pfn.session import CompilationSession
+from pfn.typechecker import SchemeCache
+
+
+def parse_source(
+    source: SourceText,
+    path: Path | None = None,
+    cache: ASTCache | None = None,
+    jobs: int = 1,
+) -> Module:
+    """Parse ``source``, going through ``cache`` when it was read from ``path``."""
+    return CompilationSession(source, path, ast_cache=cache, jobs=jobs).module
+
+
+def compile_source(
+    source: SourceText,
+    jobs: int = 1,
+    path: Path | None = None,
+    cache: ASTCache | None = None,
+) -> str:
+    return CompilationSession(source, path, ast_cache=cache, jobs=jobs).python
+
+
+def report_types(session: CompilationSession) -> tuple[bool, str]:
+    """Type check the session's module, printing each definition's type.
+
+    Problems with ``match`` expressions are printed to stderr as warnings.
+    """
+    for warning in session.match_warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+    error = session.check()
+    if error is not None:
+        return False, f"Type error: {error}"
+    for decl, scheme in zip(session.definitions, session.schemes):
+        print(f"{decl.name} : {scheme.type}")
+    return True, "Type check passed"
+
+
+def typecheck_source(
+    source: SourceText,
+    path: Path | None = None,
+    cache: ASTCache | None = None,
+    jobs: int = 1,
+    scheme_cache: SchemeCache | None = None,
+) -> tuple[bool, str]:
+    session = CompilationSession(
+        source, path, ast_cache=cache, scheme_cache=scheme_cache, jobs=jobs
+    )
+    return report_types(session)
 
 
-def run_source(source: str, typecheck: bool = False) -> None:
-    tokens = Lexer(source).tokenize()
-    module = Parser(tokens).parse()
+def run_session(session: CompilationSession, typecheck: bool = False) -> None:
+    """Execute the session's module and print what its ``main`` returns.
 
+    With ``typecheck``, a type error is raised instead of running anything.
+    """
     if typecheck:
-        checker = TypeChecker()
-        global_env = TypeEnv()
-
-        for decl in module.declarations:
-            if isinstance(decl, DefDecl):
-                checker.env = global_env
-
-                for param in decl.params:
-                    tv = checker.fresh_var()
-                    checker.env = checker.env.extend(param.name, Scheme((), tv))
-
-                t = checker.infer(decl.body)
-
-                for param in reversed(decl.params):
-                    scheme = checker.env.lookup(param.name)
-                    if scheme:
-                        t = TFun(scheme.type, t)
-
-                subst = Subst()
-                free_in_env = subst.free_vars_env(global_env)
-                free_in_t = subst.free_vars(t)
-                gen_vars = tuple(sorted(free_in_t - free_in_env))
-                scheme = Scheme(gen_vars, t)
-
-                global_env = global_env.extend(decl.name, scheme)
-
-    generated = CodeGenerator().generate_module(module)
+        error = session.check()
+        if error is not None:
+            raise error
+    with session.phase("run"):
+        namespace = session.execute()
+        result = namespace["main"]() if "main" in namespace else None
+    if result is not None:
+        print(result)
+
+
+def run_source(
+    source: SourceText,
+    typecheck: bool = False,
+    path: Path | None = None,
+    cache: ASTCache | None = None,
+) -> None:
+    run_session(CompilationSession(source, path, ast_cache=cache), typecheck)
+
+
+def _add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always parse and type check instead of using the user cache",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Print AST cache hits and misses and re-checked definitions to stderr",
+    )
 
-    namespace: dict = {}
-    exec(generated, namespace)
 
-    if "main" in namespace:
-        result = namespace["main"]()
-        if result is not None:
-            print(result)
+def _add_timing_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print the time and peak memory of each phase and definition to stderr",
+    )
+    parser.add_argument(
+        "--timings-json",
+        type=Path,
+        metavar="FILE",
+        help="Write the timings as JSON to FILE",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="FILE",
+        help="Write cProfile stats to FILE and collapsed stacks to FILE.collapsed",
+    )
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -112,61 +136,132 @@ def main(argv: list[str] | None = None) -> int:
     compile_parser.add_argument(
         "--typecheck", action="store_true", help="Run type checker before compilation"
     )
+    compile_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Parse top-level declarations in N processes",
+    )
+    _add_cache_arguments(compile_parser)
+    _add_timing_arguments(compile_parser)
 
     run_parser = subparsers.add_parser("run", help="Compile and run Pfn file")
     run_parser.add_argument("input", type=Path, help="Input .pfn file")
     run_parser.add_argument(
         "--typecheck", action="store_true", help="Run type checker before running"
     )
+    _add_cache_arguments(run_parser)
+    _add_timing_arguments(run_parser)
 
     check_parser = subparsers.add_parser("check", help="Type check Pfn file")
     check_parser.add_argument("input", type=Path, help="Input .pfn file")
+    check_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Check independent groups of definitions in N processes",
+    )
+    check_parser.add_argument(
+        "--effects",
+        action="store_true",
+        help="Also infer and print the effects of each definition",
+    )
+    _add_cache_arguments(check_parser)
+    _add_timing_arguments(check_parser)
 
     repl_parser = subparsers.add_parser("repl", help="Start interactive REPL")
 
     args = parser.parse_args(argv)
-
-    if args.command == "compile":
-        source = args.input.read_text()
-
-        if args.typecheck:
-            ok, msg = typecheck_source(source)
-            if not ok:
-                print(msg, file=sys.stderr)
-                return 1
-
-        python_code = compile_source(source)
-
-        if args.output:
-            args.output.write_text(python_code)
-        else:
-            print(python_code)
-        return 0
-
-    if args.command == "run":
-        source = args.input.read_text()
-
-        if args.typecheck:
-            ok, msg = typecheck_source(source)
-            if not ok:
-                print(msg, file=sys.stderr)
-                return 1
-
-        run_source(source, typecheck=args.typecheck)
+    if args.command == "repl":
+        start_repl()
         return 0
-
+    if args.command is None:
+        parser.print_help()
+        return 1
+
+    cache = None if args.no_cache else ASTCache()
+    scheme_cache = None if args.no_cache else SchemeCache()
+    timings = Timings() if args.timings or args.timings_json else None
+    profile = cProfile.Profile() if args.profile else None
+    try:
+        with timings or nullcontext():
+            if profile is not None:
+                profile.enable()
+            try:
+                return _run_command(args, cache, scheme_cache, timings)
+            finally:
+                if profile is not None:
+                    profile.disable()
+    finally:
+        if cache is not None and args.cache_stats:
+            print(
+                f"AST cache: {cache.hits} hits, {cache.misses} misses",
+                file=sys.stderr,
+            )
+        if scheme_cache is not None and args.cache_stats:
+            rechecked = scheme_cache.rechecked
+            total = len(rechecked) + scheme_cache.reused
+            if total:
+                print(
+                    f"Type cache: {len(rechecked)} of {total} definitions"
+                    f" re-checked: {', '.join(rechecked) or '-'}",
+                    file=sys.stderr,
+                )
+        if timings is not None:
+            _report_timings(args, timings)
+        if profile is not None:
+            collapsed = write_profile(profile, args.profile)
+            print(f"Profile written to {args.profile} and {collapsed}", file=sys.stderr)
+
+
+def _report_timings(args: argparse.Namespace, timings: Timings) -> None:
+    if args.timings:
+        print(f"Timings for {args.input}:", file=sys.stderr)
+        print(timings.report(), file=sys.stderr)
+    if args.timings_json:
+        data = {"command": args.command, "module": str(args.input)}
+        data.update(timings.to_json())
+        args.timings_json.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def _run_command(
+    args: argparse.Namespace,
+    cache: ASTCache | None,
+    scheme_cache: SchemeCache | None = None,
+    timings: Timings | None = None,
+) -> int:
+    session = CompilationSession.from_path(
+        args.input,
+        ast_cache=cache,
+        scheme_cache=scheme_cache,
+        jobs=getattr(args, "jobs", 1),
+        timings=timings,
+    )
     if args.command == "check":
-        source = args.input.read_text()
-        ok, msg = typecheck_source(source)
+        ok, msg = report_types(session)
+        if ok and args.effects:
+            for decl in session.definitions:
+                print(f"{decl.name} ! {session.effects.effects_of(decl.name)}")
         print(msg)
         return 0 if ok else 1
 
-    if args.command == "repl":
-        start_repl()
+    if args.typecheck:
+        ok, msg = report_types(session)
+        if not ok:
+            print(msg, file=sys.stderr)
+            return 1
+
+    if args.command == "compile":
+        if args.output:
+            args.output.write_text(session.python)
+        else:
+            print(session.python)
         return 0
 
-    parser.print_help()
-    return 1
+    run_session(session)
+    return 0
 
 
 if __name__ == "__main__":
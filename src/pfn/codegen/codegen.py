@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from pfn.lexer.symbols import PYTHON_KEYWORDS
 from pfn.parser import ast
+from pfn.profiling import declaration
 
 
 class CodeGenerator:
@@ -167,43 +169,7 @@ class CodeGenerator:
             lines.append(f"    return {body}")
         return "\n".join(lines)
 
-    PYTHON_KEYWORDS = {
-        "lambda",
-        "def",
-        "class",
-        "if",
-        "else",
-        "elif",
-        "for",
-        "while",
-        "try",
-        "except",
-        "finally",
-        "with",
-        "as",
-        "import",
-        "from",
-        "return",
-        "yield",
-        "raise",
-        "break",
-        "continue",
-        "pass",
-        "True",
-        "False",
-        "None",
-        "and",
-        "or",
-        "not",
-        "in",
-        "is",
-        "global",
-        "nonlocal",
-        "assert",
-        "del",
-        "match",
-        "case",
-    }
+    PYTHON_KEYWORDS = PYTHON_KEYWORDS
 
     def _safe_name(self, name: str) -> str:
         if name in self.PYTHON_KEYWORDS:
@@ -231,7 +197,8 @@ class CodeGenerator:
             "from stdlib import reverse, _not_, fst, snd",
         ]
         for decl in module.declarations:
-            lines.append(self._gen_decl(decl))
+            with declaration(getattr(decl, "name", type(decl).__name__)):
+                lines.append(self._gen_decl(decl))
         # Insert helper functions AFTER imports but BEFORE declarations
         helper_funcs = self._generate_helper_funcs()
         if helper_funcs:
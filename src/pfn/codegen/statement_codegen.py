@@ -9,6 +9,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Union
 
+from pfn.lexer.symbols import PYTHON_KEYWORDS
 from pfn.parser import ast
 from pfn.codegen.statement import (
     Statement,
@@ -474,43 +475,6 @@ BK|                return f"{func}()"
 
     def _safe_name(self, name: str) -> str:
         """Make a name safe for Python."""
-        PYTHON_KEYWORDS = {
-            "lambda",
-            "def",
-            "class",
-            "if",
-            "else",
-            "elif",
-            "for",
-            "while",
-            "try",
-            "except",
-            "finally",
-            "with",
-            "as",
-            "import",
-            "from",
-            "return",
-            "yield",
-            "raise",
-            "break",
-            "continue",
-            "pass",
-            "True",
-            "False",
-            "None",
-            "and",
-            "or",
-            "not",
-            "in",
-            "is",
-            "global",
-            "nonlocal",
-            "assert",
-            "del",
-            "match",
-            "case",
-        }
         if name in PYTHON_KEYWORDS:
             return f"_{name}_"
         return name
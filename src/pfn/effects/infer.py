@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Mapping
 
 from pfn.parser import ast
 from pfn.effects import (
@@ -13,24 +13,34 @@ from pfn.effects import (
     ReadEffect,
     PURE,
 )
+from pfn.types.hamt import HAMT
 
 
-@dataclass
 class EffectEnv:
-    bindings: dict[str, EffectSet] = field(default_factory=dict)
+    """Effects of the names in scope, held in a persistent map like TypeEnv."""
+
+    def __init__(self, bindings: Mapping[str, EffectSet] | None = None):
+        self._map: HAMT[str, EffectSet] = HAMT(bindings.items() if bindings else ())
+
+    @classmethod
+    def _from_map(cls, bindings: HAMT[str, EffectSet]) -> EffectEnv:
+        env = cls.__new__(cls)
+        env._map = bindings
+        return env
+
+    @property
+    def bindings(self) -> dict[str, EffectSet]:
+        """A snapshot of the bindings; changing it does not change the env."""
+        return dict(self._map.items())
 
     def extend(self, name: str, effects: EffectSet) -> EffectEnv:
-        new_bindings = self.bindings.copy()
-        new_bindings[name] = effects
-        return EffectEnv(new_bindings)
+        return self._from_map(self._map.set(name, effects))
 
     def lookup(self, name: str) -> EffectSet | None:
-        return self.bindings.get(name)
+        return self._map.get(name)
 
     def merge(self, other: EffectEnv) -> EffectEnv:
-        new_bindings = self.bindings.copy()
-        new_bindings.update(other.bindings)
-        return EffectEnv(new_bindings)
+        return self._from_map(self._map.update(other._map.items()))
 
 
 @dataclass
@@ -213,6 +223,29 @@ class EffectInferer:
             combined = combined.union(body_result.effects)
             return EffectInferenceResult(combined, self.env)
 
+        if isinstance(expr, ast.PerformExpr):
+            effect = self.infer_operation_effect(expr.effect_name, expr.op_name)
+            combined = EffectSet(frozenset({effect}))
+            for arg in expr.args:
+                combined = combined.union(self._infer(arg).effects)
+            return EffectInferenceResult(combined, self.env)
+
+        if isinstance(expr, ast.HandleExpr):
+            # Handled effects are kept: which effect a handler discharges is
+            # not known here, and a summary must not claim too little.
+            combined = self._infer(expr.expr).effects
+            old_env = self.env
+            for case in expr.handler_cases:
+                case_env = old_env
+                for param in case.params:
+                    case_env = case_env.extend(param.name, PURE)
+                if case.resume_param:
+                    case_env = case_env.extend(case.resume_param, PURE)
+                self.env = case_env
+                combined = combined.union(self._infer(case.body).effects)
+            self.env = old_env
+            return EffectInferenceResult(combined, self.env)
+
         return EffectInferenceResult(PURE, self.env)
 
     def _infer_pattern_effects(self, pattern: ast.Pattern) -> dict[str, EffectSet]:
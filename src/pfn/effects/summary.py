@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from pfn.effects import PURE, EffectSet
+from pfn.effects.infer import EffectEnv, EffectInferer
+from pfn.parser import ast
+from pfn.profiling import declaration
+from pfn.typechecker.driver import (
+    definition_graph,
+    free_names,
+    strongly_connected_components,
+)
+
+
+class ModuleEffects:
+    """Effect summaries of a module's top-level definitions.
+
+    ``update`` builds the module's reference graph and infers each strongly
+    connected component once every component it refers to has a summary,
+    re-inferring a recursive component until its summaries stop growing.
+    A definition's summary is the effects of its body, with its parameters
+    pure and the names it uses bound to their summaries or to ``env``.
+    After that, ``effects_of`` and ``is_pure`` are dictionary lookups.
+
+    Calling ``update`` again with the edited module only re-infers the
+    components with a changed definition, and those using a name whose
+    summary changed or that was removed. ``reinferred`` lists the
+    definitions the last update inferred, in order.
+    """
+
+    def __init__(self, env: EffectEnv | None = None) -> None:
+        self.base = env or EffectEnv()
+        self.summaries: dict[str, EffectSet] = {}
+        self.reinferred: list[str] = []
+        self._decls: dict[str, ast.DefDecl] = {}
+        self._uses: dict[str, frozenset[str]] = {}
+        self._env: EffectEnv | None = None
+
+    def update(self, decls: list[ast.DefDecl]) -> None:
+        """Bring the summaries up to date with the module's definitions."""
+        index = {decl.name: i for i, decl in enumerate(decls)}
+        current = {name: decls[i] for name, i in index.items()}
+        changed = set()
+        for name, decl in current.items():
+            old = self._decls.get(name)
+            if old is not decl and old != decl:
+                changed.add(name)
+        # Names whose summary differs from last time or that are no longer
+        # defined. A changed definition is added once its new summary is
+        # known to differ, so an edit that keeps it stops there.
+        dirty = self._decls.keys() - current.keys()
+
+        uses: list[frozenset[str]] = []
+        for decl in decls:
+            names = self._uses.get(decl.name)
+            if decl.name in changed or names is None:
+                names = frozenset(
+                    free_names(decl.body, frozenset(p.name for p in decl.params))
+                )
+            uses.append(names)
+        graph = definition_graph(decls, uses)
+
+        previous = self.summaries
+        summaries: dict[str, EffectSet] = {}
+        self.reinferred = []
+        for component in strongly_connected_components(graph):
+            members = [i for i in component if index[decls[i].name] == i]
+            if not members:
+                continue
+            names = [decls[i].name for i in members]
+            stale = any(name in changed for name in names) or any(
+                not dirty.isdisjoint(uses[i]) for i in members
+            )
+            if not stale:
+                for name in names:
+                    summaries[name] = previous[name]
+                continue
+            with declaration(*names):
+                self._infer_component(decls, members, graph, summaries)
+            self.reinferred.extend(names)
+            for name in names:
+                if previous.get(name) != summaries[name]:
+                    dirty.add(name)
+
+        self.summaries = summaries
+        self._decls = current
+        self._uses = {decls[i].name: uses[i] for i in index.values()}
+        self._env = None
+
+    def _infer_component(
+        self,
+        decls: list[ast.DefDecl],
+        members: list[int],
+        graph: list[list[int]],
+        summaries: dict[str, EffectSet],
+    ) -> None:
+        """Infer a component's summaries into ``summaries``, to a fixed point.
+
+        Summaries only grow from pure and there are finitely many effects,
+        so the iteration ends.
+        """
+        env = self.base
+        for i in members:
+            for j in graph[i]:
+                name = decls[j].name
+                if name in summaries:
+                    env = env.extend(name, summaries[name])
+        for i in members:
+            summaries[decls[i].name] = PURE
+        recursive = len(members) > 1 or members[0] in graph[members[0]]
+        while True:
+            grew = False
+            for i in members:
+                decl = decls[i]
+                inner = env
+                for member in members:
+                    name = decls[member].name
+                    inner = inner.extend(name, summaries[name])
+                for param in decl.params:
+                    inner = inner.extend(param.name, PURE)
+                effects = EffectInferer(inner).infer(decl.body)
+                if effects != summaries[decl.name]:
+                    summaries[decl.name] = effects
+                    grew = True
+            if not (grew and recursive):
+                return
+
+    def effects_of(self, name: str) -> EffectSet | None:
+        """The summary of the definition ``name``, if the module has one."""
+        return self.summaries.get(name)
+
+    def is_pure(self, name: str) -> bool:
+        """Whether the definition ``name`` is known to have no effects."""
+        effects = self.summaries.get(name)
+        return effects is not None and not effects.effects
+
+    @property
+    def env(self) -> EffectEnv:
+        """``env`` with every definition bound to its summary."""
+        if self._env is None:
+            self._env = self.base.merge(EffectEnv(self.summaries))
+        return self._env
+
+    def infer(self, expr: ast.Expr) -> EffectSet:
+        """The effects of an expression in the module's scope."""
+        return EffectInferer(self.env).infer(expr)
@@ -1,4 +1,29 @@
-from pfn.lexer.lexer import Lexer, LexerError
-from pfn.lexer.tokens import KEYWORDS, Span, Token, TokenType
+from pfn.lexer.buffer import TokenBuffer
+from pfn.lexer.incremental import RelexResult, TextEdit, relex
+from pfn.lexer.lexer import Lexer, LexerError, SourceText
+from pfn.lexer.lines import LineIndex
+from pfn.lexer.source import read_source
+from pfn.lexer.stream import TokenStream
+from pfn.lexer.symbols import PYTHON_KEYWORDS, Symbol, SymbolTable
+from pfn.lexer.tokens import KEYWORDS, Span, SymbolFlags, Token, TokenType
 
-__all__ = ["Lexer", "LexerError", "Token", "TokenType", "Span", "KEYWORDS"]
+__all__ = [
+    "Lexer",
+    "LexerError",
+    "LineIndex",
+    "RelexResult",
+    "SourceText",
+    "Symbol",
+    "SymbolFlags",
+    "SymbolTable",
+    "TextEdit",
+    "Token",
+    "TokenBuffer",
+    "TokenStream",
+    "TokenType",
+    "Span",
+    "KEYWORDS",
+    "PYTHON_KEYWORDS",
+    "read_source",
+    "relex",
+]
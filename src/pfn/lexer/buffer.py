@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from array import array
+from typing import Iterator, overload
+
+from pfn.lexer.lines import LineIndex, shifted_bisect, splice_shifted
+from pfn.lexer.symbols import SymbolTable
+from pfn.lexer.tokens import NAME_TYPES, Span, SymbolFlags, Token, TokenType
+
+TOKEN_TYPES: tuple[TokenType, ...] = tuple(TokenType)
+TOKEN_KINDS: dict[TokenType, int] = {t: i for i, t in enumerate(TOKEN_TYPES)}
+
+
+class BufferedToken(Token):
+    """A token view into a ``TokenBuffer``.
+
+    Fields are read from the buffer columns on access, so the ``Span`` is
+    only built when ``span`` is read.
+    """
+
+    def __init__(self, buffer: TokenBuffer, index: int):
+        self._buffer = buffer
+        self._index = index
+
+    @property  # type: ignore[override]
+    def type(self) -> TokenType:
+        return TOKEN_TYPES[self._buffer.kinds[self._index]]
+
+    @property  # type: ignore[override]
+    def value(self) -> str | int | float | None:
+        value_index = self._buffer.value_indexes[self._index]
+        return None if value_index < 0 else self._buffer.values[value_index]
+
+    @property  # type: ignore[override]
+    def span(self) -> Span:
+        return self._buffer.span(self._index)
+
+    @property  # type: ignore[override]
+    def flags(self) -> SymbolFlags:
+        if self.type not in NAME_TYPES:
+            return SymbolFlags.NONE
+        return self._buffer.symbols.flags(self.value)  # type: ignore[arg-type]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.type, self.value, self.span) == (
+            other.type,
+            other.value,
+            other.span,
+        )
+
+
+class TokenBuffer:
+    """Struct-of-arrays token storage.
+
+    Token kinds and offsets live in ``array`` columns and token values are
+    interned into a shared table, so lexing a large module does not
+    allocate a ``Token`` and a ``Span`` per token. Lines and columns come
+    from the shared ``LineIndex``. ``Token`` objects are materialized on
+    indexing; ``types`` gives the parser the kind column without
+    materializing anything.
+    """
+
+    def __init__(self, lines: LineIndex, symbols: SymbolTable | None = None) -> None:
+        self.line_index = lines
+        self.symbols = SymbolTable() if symbols is None else symbols
+        self.kinds = array("B")
+        self.value_indexes = array("i")
+        self.values: list[str | int | float] = []
+        self._value_ids: dict[object, int] = {}
+        # Offsets of tokens from ``_shift_at`` on are stored ``_shift`` too
+        # low until ``starts`` or ``ends`` is read; see ``splice``.
+        self._starts = array("I")
+        self._ends = array("I")
+        self._shift_at = 0
+        self._shift = 0
+
+    def append(
+        self,
+        token_type: TokenType,
+        value: str | int | float | None,
+        start: int,
+        end: int,
+    ) -> None:
+        self.kinds.append(TOKEN_KINDS[token_type])
+        self._starts.append(start)
+        self._ends.append(end)
+        if value is None:
+            self.value_indexes.append(-1)
+            return
+        # 1 == 1.0 == True, so only strings are interned by value alone.
+        key = value if isinstance(value, str) else (type(value), value)
+        index = self._value_ids.get(key)
+        if index is None:
+            index = len(self.values)
+            self.values.append(value)
+            self._value_ids[key] = index
+        self.value_indexes.append(index)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def starts(self) -> array[int]:
+        self._apply_shift()
+        return self._starts
+
+    @property
+    def ends(self) -> array[int]:
+        self._apply_shift()
+        return self._ends
+
+    def _apply_shift(self) -> None:
+        if self._shift:
+            shift, at = self._shift, self._shift_at
+            self._starts[at:] = array("I", map(shift.__add__, self._starts[at:]))
+            self._ends[at:] = array("I", map(shift.__add__, self._ends[at:]))
+            self._shift = 0
+
+    def start(self, index: int) -> int:
+        start = self._starts[index]
+        return start + self._shift if index >= self._shift_at else start
+
+    def end(self, index: int) -> int:
+        end = self._ends[index]
+        return end + self._shift if index >= self._shift_at else end
+
+    def bisect_starts(self, offset: int) -> int:
+        """Index of the first token starting at or after ``offset``."""
+        return shifted_bisect(self._starts, self._shift_at, self._shift, offset, False)
+
+    def bisect_ends(self, offset: int) -> int:
+        """Number of tokens ending at or before ``offset``."""
+        return shifted_bisect(self._ends, self._shift_at, self._shift, offset)
+
+    def splice(
+        self,
+        start: int,
+        stop: int,
+        replacement: TokenBuffer,
+        delta: int,
+        lines: LineIndex,
+    ) -> TokenBuffer:
+        """Return a buffer with tokens ``start:stop`` replaced.
+
+        ``replacement`` must share this buffer's value table. Offsets of
+        the tokens after ``stop`` move by ``delta``; the move is recorded
+        as a pending shift rather than applied, so splicing costs a copy
+        of the columns plus the tokens between this edit and the last.
+        """
+        buffer = TokenBuffer(lines, self.symbols)
+        buffer.values = self.values
+        buffer._value_ids = self._value_ids
+        buffer.kinds = self.kinds[:start] + replacement.kinds + self.kinds[stop:]
+        buffer.value_indexes = (
+            self.value_indexes[:start]
+            + replacement.value_indexes
+            + self.value_indexes[stop:]
+        )
+        shift_at, shift = self._shift_at, self._shift
+        buffer._starts, buffer._shift_at, buffer._shift = splice_shifted(
+            self._starts, shift_at, shift, start, stop, replacement.starts, delta
+        )
+        buffer._ends = splice_shifted(
+            self._ends, shift_at, shift, start, stop, replacement.ends, delta
+        )[0]
+        return buffer
+
+    @overload
+    def __getitem__(self, index: int) -> Token: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Token]: ...
+
+    def __getitem__(self, index: int | slice) -> Token | list[Token]:
+        if isinstance(index, slice):
+            return [BufferedToken(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        return BufferedToken(self, index)
+
+    def __iter__(self) -> Iterator[Token]:
+        for i in range(len(self)):
+            yield BufferedToken(self, i)
+
+    @property
+    def types(self) -> list[TokenType]:
+        """The kind column as ``TokenType`` members."""
+        return [TOKEN_TYPES[k] for k in self.kinds]
+
+    def span(self, index: int) -> Span:
+        return Span(self.start(index), self.end(index), self.line_index)
+
+    def to_list(self) -> list[Token]:
+        flags = self.symbols.flags
+        tokens = []
+        for i, (kind, vi) in enumerate(zip(self.kinds, self.value_indexes)):
+            token_type = TOKEN_TYPES[kind]
+            value = None if vi < 0 else self.values[vi]
+            token = Token(token_type, value, self.span(i))
+            if token_type in NAME_TYPES:
+                token.flags = flags(value)  # type: ignore[arg-type]
+            tokens.append(token)
+        return tokens
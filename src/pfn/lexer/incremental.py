@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from pfn.lexer.buffer import TokenBuffer
+from pfn.lexer.lexer import Lexer
+
+# Longest lookahead the scanners use past the end of a token (``1.`` needs
+# two characters to decide between a float and an int followed by ``.``).
+_LOOKAHEAD = 2
+
+
+@dataclass(frozen=True)
+class TextEdit:
+    """Replace ``removed`` characters at ``offset`` with ``inserted``."""
+
+    offset: int
+    removed: int
+    inserted: str
+
+    @property
+    def delta(self) -> int:
+        return len(self.inserted) - self.removed
+
+    def apply(self, source: str) -> str:
+        end = self.offset + self.removed
+        return source[: self.offset] + self.inserted + source[end:]
+
+
+@dataclass
+class RelexResult:
+    """Outcome of ``relex``.
+
+    Tokens ``start:old_stop`` of the previous buffer were replaced by
+    tokens ``start:new_stop`` of ``tokens``; every other token was reused.
+    """
+
+    source: str
+    tokens: TokenBuffer
+    start: int
+    old_stop: int
+    new_stop: int
+
+
+def relex(
+    source: str, tokens: TokenBuffer, edit: TextEdit, regex: bool = True
+) -> RelexResult:
+    """Re-tokenize ``source`` after ``edit`` using its previous ``tokens``.
+
+    Scanning restarts after the last token that the edit cannot affect and
+    stops at the first new token that starts on an old token boundary past
+    the edit, since the lexer carries no state between tokens. Tokens
+    after that point are reused with their offsets shifted.
+    """
+    if not 0 <= edit.offset <= edit.offset + edit.removed <= len(source):
+        raise ValueError(f"edit out of range: {edit}")
+
+    new_source = edit.apply(source)
+    delta = edit.delta
+    lines = tokens.line_index.edited(
+        new_source, edit.offset, edit.removed, edit.inserted
+    )
+
+    start = tokens.bisect_ends(edit.offset - _LOOKAHEAD)
+    restart_pos = tokens.end(start - 1) if start else 0
+    sync_pos = edit.offset + len(edit.inserted)
+    # The trailing EOF token is never reused, so a scan that reaches the
+    # end of the file replaces everything after ``start``.
+    last = len(tokens) - 1
+
+    replacement = TokenBuffer(lines, tokens.symbols)
+    replacement.values = tokens.values
+    replacement._value_ids = tokens._value_ids
+    append = replacement.append
+
+    old_stop = len(tokens)
+    scanner = Lexer(new_source, regex, lines, tokens.symbols).scan(restart_pos)
+    for token_type, value, token_start, token_end in scanner:
+        if token_start >= sync_pos:
+            old_index = tokens.bisect_starts(token_start - delta)
+            if old_index < last and tokens.start(old_index) == token_start - delta:
+                old_stop = old_index
+                break
+        append(token_type, value, token_start, token_end)
+
+    buffer = tokens.splice(start, old_stop, replacement, delta, lines)
+    return RelexResult(new_source, buffer, start, old_stop, start + len(replacement))
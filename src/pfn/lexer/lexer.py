@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-from pfn.lexer.tokens import KEYWORDS, Span, Token, TokenType
+import re
+from mmap import mmap
+from typing import Iterator, Union
+
+from pfn.lexer.buffer import TokenBuffer
+from pfn.lexer.lines import LineIndex
+from pfn.lexer.stream import TokenStream
+from pfn.lexer.symbols import Symbol, SymbolTable
+from pfn.lexer.tokens import NAME_TYPES, Span, Token, TokenType
 
 
 class LexerError(Exception):
@@ -10,20 +18,302 @@ class LexerError(Exception):
         super().__init__(f"{message} at {span}")
 
 
+# Master pattern for the table-driven scanner. Only ASCII input is matched
+# here; anything else (Unicode letters, digits and whitespace, malformed
+# literals) is left to the character scanner so both engines agree exactly.
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>[\t\n\x0b\x0c\r\x1c-\x1f ]+)
+  | (?P<comment>--[^\n]*)
+  | (?P<float>[0-9][0-9_]*\.[0-9][0-9_]*(?:[eE][+-]?[0-9]*)?)
+  | (?P<int>[0-9][0-9_]*)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<string>"(?:[^"\\\n]|\\[\s\S])*")
+  | (?P<char>'(?:[^'\\]|\\[\s\S])')
+  | (?P<op>\.\.\.|\.\.|::|->|=>|==|!=|<=|<-|>=|\+\+|\|\||&&|[-+*/%:=!@<>|&()\[\]{},.;`\\])
+    """,
+    re.VERBOSE,
+)
+
+_ESCAPE_RE = re.compile(r"\\([\s\S])")
+
+_STRING_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"'}
+
+_CHAR_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "0": "\0", "\\": "\\", "'": "'"}
+
+_OPERATORS: dict[str, TokenType] = {
+    "+": TokenType.PLUS,
+    "++": TokenType.DOUBLE_PLUS,
+    "-": TokenType.MINUS,
+    "->": TokenType.ARROW,
+    "*": TokenType.STAR,
+    "/": TokenType.SLASH,
+    "%": TokenType.PERCENT,
+    ":": TokenType.COLON,
+    "::": TokenType.DOUBLE_COLON,
+    "=": TokenType.EQUALS,
+    "==": TokenType.EQ,
+    "=>": TokenType.FAT_ARROW,
+    "!": TokenType.BANG,
+    "!=": TokenType.NEQ,
+    "@": TokenType.AT,
+    "<": TokenType.LT,
+    "<=": TokenType.LE,
+    "<-": TokenType.LEFT_ARROW,
+    ">": TokenType.GT,
+    ">=": TokenType.GE,
+    "|": TokenType.PIPE,
+    "||": TokenType.DOUBLE_PIPE,
+    "&": TokenType.AMP,
+    "&&": TokenType.DOUBLE_AMP,
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+    "[": TokenType.LBRACKET,
+    "]": TokenType.RBRACKET,
+    "{": TokenType.LBRACE,
+    "}": TokenType.RBRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "..": TokenType.DOUBLE_DOT,
+    "...": TokenType.TRIPLE_DOT,
+    ";": TokenType.SEMICOLON,
+    "`": TokenType.BACKTICK,
+    "\\": TokenType.BACKSLASH,
+}
+
+
+# The same pattern over UTF-8 bytes, for sources that are not decoded up
+# front. Multi-byte characters only match inside strings and comments.
+_TOKEN_RE_BYTES = re.compile(_TOKEN_RE.pattern.encode(), re.VERBOSE)
+
+_BYTE_OPERATORS: dict[bytes, tuple[TokenType, str]] = {
+    op.encode(): (token_type, op) for op, token_type in _OPERATORS.items()
+}
+
+
+def _unescape(body: str, table: dict[str, str]) -> str:
+    if "\\" not in body:
+        return body
+    return _ESCAPE_RE.sub(lambda m: table.get(m.group(1), m.group(1)), body)
+
+
+RawToken = tuple[TokenType, "str | int | float | None", int, int]
+
+# A source file's text, or its undecoded UTF-8 bytes (e.g. an ``mmap``).
+SourceText = Union[str, bytes, mmap]
+
+
 class Lexer:
-    def __init__(self, source: str):
+    def __init__(
+        self,
+        source: SourceText,
+        regex: bool = False,
+        lines: LineIndex | None = None,
+        symbols: SymbolTable | None = None,
+    ):
         self.source = source
+        self.regex = regex
+        # Identifiers are interned here; share one table per compilation.
+        self.symbols = SymbolTable() if symbols is None else symbols
+        # Bytes are always scanned with the byte pattern; offsets are byte
+        # offsets and values are decoded per token.
+        self.is_bytes = not isinstance(source, str)
         self.pos = 0
-        self.line = 1
-        self.column = 1
+        self.lines = LineIndex(source) if lines is None else lines
         self.tokens: list[Token] = []
+        self._pending: list[RawToken] = []
 
     def tokenize(self) -> list[Token]:
-        self.tokens = []
-        while not self._at_end():
-            self._scan_token()
-        self._add_token(TokenType.EOF, None)
-        return self.tokens
+        lines = self.lines
+        flags = self.symbols.flags
+        tokens = self.tokens = []
+        append = tokens.append
+        for token_type, value, start, end in self.scan():
+            token = Token(token_type, value, Span(start, end, lines))
+            if token_type in NAME_TYPES:
+                token.flags = flags(value)  # type: ignore[arg-type]
+            append(token)
+        return tokens
+
+    def tokenize_buffer(self) -> TokenBuffer:
+        """Tokenize into a compact ``TokenBuffer`` instead of a list."""
+        buffer = TokenBuffer(self.lines, self.symbols)
+        append = buffer.append
+        for token_type, value, start, end in self.scan():
+            append(token_type, value, start, end)
+        return buffer
+
+    def stream(self) -> TokenStream:
+        """Tokenize lazily, as the parser consumes the tokens."""
+        return TokenStream(self)
+
+    def scan(self, start: int = 0) -> Iterator[RawToken]:
+        """Yield ``(type, value, start, end)`` tuples from offset ``start``.
+
+        The lexer keeps no state between tokens, so scanning may begin at
+        any offset where a previous scan finished a token. The last tuple
+        is always the EOF token.
+        """
+        self.pos = start
+        self._pending.clear()
+        if self.is_bytes:
+            yield from self._scan_bytes()
+        elif self.regex:
+            yield from self._scan_regex()
+        else:
+            pending = self._pending
+            while not self._at_end():
+                self._scan_token()
+                if pending:
+                    yield from pending
+                    pending.clear()
+        yield (TokenType.EOF, None, self.pos, self.pos)
+
+    def _scan_regex(self) -> Iterator[RawToken]:
+        """Scan the source with the master pattern.
+
+        Whole identifiers, numbers, comments and string bodies are consumed
+        in one step. Positions the pattern cannot handle are delegated to
+        ``_scan_token`` so the resulting tokens and errors are identical to
+        the character scanner.
+        """
+        source = self.source
+        length = len(source)
+        pending = self._pending
+        match = _TOKEN_RE.match
+        symbols = self.symbols.symbols
+        lookup = self.symbols.lookup
+        operators = _OPERATORS
+        pos = self.pos
+
+        while pos < length:
+            m = match(source, pos)
+            kind = m.lastgroup if m else None
+            end = m.end() if m else pos
+
+            if kind in ("int", "float", "ident") and end < length:
+                # A Unicode letter or digit may continue this token.
+                if not source[end : end + 2].isascii():
+                    kind = None
+
+            if kind is None:
+                self.pos = pos
+                self._scan_token()
+                pos = self.pos
+                if pending:
+                    yield from pending
+                    pending.clear()
+                continue
+
+            if kind == "ws" or kind == "comment":
+                pos = end
+                continue
+
+            text = m.group()
+
+            if kind == "ident":
+                symbol = symbols.get(text) or lookup(text)
+                yield (symbol.type, symbol.name, pos, end)
+            elif kind == "op":
+                yield (operators[text], text, pos, end)
+            elif kind == "int":
+                yield (TokenType.INT, int(text.replace("_", "")), pos, end)
+            elif kind == "float":
+                yield (TokenType.FLOAT, float(text.replace("_", "")), pos, end)
+            elif kind == "string":
+                value = _unescape(text[1:-1], _STRING_ESCAPES)
+                yield (TokenType.STRING, value, pos, end)
+            else:
+                yield (TokenType.CHAR, _unescape(text[1:-1], _CHAR_ESCAPES), pos, end)
+
+            pos = end
+
+        self.pos = pos
+
+    def _scan_bytes(self) -> Iterator[RawToken]:
+        """Scan UTF-8 bytes with the byte pattern.
+
+        Identifier values are decoded once per distinct name and operators
+        are not decoded at all; string and char literals are decoded when
+        their token is produced. Anything else non-ASCII goes through
+        ``_scan_decoded``.
+        """
+        source = self.source
+        length = len(source)
+        match = _TOKEN_RE_BYTES.match
+        operators = _BYTE_OPERATORS
+        lookup = self.symbols.lookup
+        names: dict[bytes, Symbol] = {}
+        pos = self.pos
+
+        while pos < length:
+            m = match(source, pos)
+            kind = m.lastgroup if m else None
+            end = m.end() if m else pos
+
+            if kind in ("int", "float", "ident") and end < length:
+                if not source[end : end + 2].isascii():
+                    kind = None
+
+            if kind is None:
+                tokens, pos = self._scan_decoded(pos)
+                yield from tokens
+                continue
+
+            if kind == "ws" or kind == "comment":
+                pos = end
+                continue
+
+            text = m.group()
+
+            if kind == "ident":
+                symbol = names.get(text)
+                if symbol is None:
+                    symbol = names[text] = lookup(text.decode("ascii"))
+                yield (symbol.type, symbol.name, pos, end)
+            elif kind == "op":
+                token_type, op = operators[text]
+                yield (token_type, op, pos, end)
+            elif kind == "int":
+                yield (TokenType.INT, int(text.replace(b"_", b"")), pos, end)
+            elif kind == "float":
+                yield (TokenType.FLOAT, float(text.replace(b"_", b"")), pos, end)
+            elif kind == "string":
+                value = _unescape(text[1:-1].decode("utf-8"), _STRING_ESCAPES)
+                yield (TokenType.STRING, value, pos, end)
+            else:
+                value = _unescape(text[1:-1].decode("ascii"), _CHAR_ESCAPES)
+                yield (TokenType.CHAR, value, pos, end)
+
+            pos = end
+
+        self.pos = pos
+
+    def _scan_decoded(self, pos: int) -> tuple[list[RawToken], int]:
+        """Scan one token at byte offset ``pos`` with the character scanner.
+
+        The rest of the line and the next one are decoded, which covers
+        any single token. Offsets are mapped back to bytes.
+        """
+        source = self.source
+        end = source.find(b"\n", pos)
+        end = source.find(b"\n", end + 1) if end >= 0 else -1
+        text = source[pos : len(source) if end < 0 else end].decode("utf-8")
+
+        def offset(index: int) -> int:
+            return pos + len(text[:index].encode("utf-8"))
+
+        lexer = Lexer(text, symbols=self.symbols)
+        try:
+            lexer._scan_token()
+        except LexerError as e:
+            span = Span(offset(e.span.start), offset(e.span.end), self.lines)
+            raise LexerError(e.message, span) from None
+        tokens = [
+            (token_type, value, offset(start), offset(stop))
+            for token_type, value, start, stop in lexer._pending
+        ]
+        return tokens, offset(lexer.pos)
 
     def _at_end(self) -> bool:
         return self.pos >= len(self.source)
@@ -37,11 +327,6 @@ class Lexer:
     def _advance(self) -> str:
         char = self.source[self.pos]
         self.pos += 1
-        if char == "\n":
-            self.line += 1
-            self.column = 1
-        else:
-            self.column += 1
         return char
 
     def _match(self, expected: str) -> bool:
@@ -51,35 +336,21 @@ class Lexer:
         return True
 
     def _current_span(self) -> Span:
-        return Span(
-            start=self.pos,
-            end=self.pos,
-            line=self.line,
-            column=self.column,
-        )
-
-    def _span_from(self, start_pos: int, start_line: int, start_col: int) -> Span:
-        return Span(
-            start=start_pos,
-            end=self.pos,
-            line=start_line,
-            column=start_col,
-        )
+        return Span(self.pos, self.pos, self.lines)
+
+    def _span_from(self, start_pos: int) -> Span:
+        return Span(start_pos, self.pos, self.lines)
 
     def _add_token(
         self,
         token_type: TokenType,
         value: str | int | float | None,
-        span: Span | None = None,
+        start: int,
     ) -> None:
-        if span is None:
-            span = self._current_span()
-        self.tokens.append(Token(token_type, value, span))
+        self._pending.append((token_type, value, start, self.pos))
 
     def _scan_token(self) -> None:
         start_pos = self.pos
-        start_line = self.line
-        start_col = self.column
 
         char = self._advance()
 
@@ -91,260 +362,120 @@ class Lexer:
             return
 
         if char.isdigit():
-            self._number(start_pos, start_line, start_col, char)
+            self._number(start_pos, char)
             return
 
         if char == '"':
-            self._string(start_pos, start_line, start_col)
+            self._string(start_pos)
             return
 
         if char == "'":
-            self._char(start_pos, start_line, start_col)
+            self._char(start_pos)
             return
 
         if char.isalpha() or char == "_":
             if char == "_" and not (self._peek().isalnum() or self._peek() == "_"):
-                self._add_token(
-                    TokenType.UNDERSCORE,
-                    "_",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.UNDERSCORE, "_", start_pos)
                 return
-            self._identifier(start_pos, start_line, start_col)
+            self._identifier(start_pos)
             return
 
         if char == "+":
             if self._match("+"):
-                self._add_token(
-                    TokenType.DOUBLE_PLUS,
-                    "++",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.DOUBLE_PLUS, "++", start_pos)
             else:
-                self._add_token(
-                    TokenType.PLUS,
-                    "+",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.PLUS, "+", start_pos)
         elif char == "-":
             if self._match(">"):
-                self._add_token(
-                    TokenType.ARROW,
-                    "->",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.ARROW, "->", start_pos)
             else:
-                self._add_token(
-                    TokenType.MINUS,
-                    "-",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.MINUS, "-", start_pos)
         elif char == "*":
-            self._add_token(
-                TokenType.STAR, "*", self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.STAR, "*", start_pos)
         elif char == "/":
-            self._add_token(
-                TokenType.SLASH, "/", self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.SLASH, "/", start_pos)
         elif char == "%":
-            self._add_token(
-                TokenType.PERCENT,
-                "%",
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.PERCENT, "%", start_pos)
         elif char == ":":
             if self._match(":"):
-                self._add_token(
-                    TokenType.DOUBLE_COLON,
-                    "::",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.DOUBLE_COLON, "::", start_pos)
             else:
-                self._add_token(
-                    TokenType.COLON,
-                    ":",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.COLON, ":", start_pos)
         elif char == "=":
             if self._match(">"):
-                self._add_token(
-                    TokenType.FAT_ARROW,
-                    "=>",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.FAT_ARROW, "=>", start_pos)
             elif self._match("="):
-                self._add_token(
-                    TokenType.EQ,
-                    "==",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.EQ, "==", start_pos)
             else:
-                self._add_token(
-                    TokenType.EQUALS,
-                    "=",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.EQUALS, "=", start_pos)
         elif char == "!":
             if self._match("="):
-                self._add_token(
-                    TokenType.NEQ,
-                    "!=",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.NEQ, "!=", start_pos)
             else:
-                self._add_token(
-                    TokenType.BANG,
-                    "!",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.BANG, "!", start_pos)
         elif char == "@":
-            self._add_token(
-                TokenType.AT,
-                "@",
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.AT, "@", start_pos)
         elif char == "<":
             if self._match("="):
-                self._add_token(
-                    TokenType.LE,
-                    "<=",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.LE, "<=", start_pos)
             elif self._match("-"):
-                self._add_token(
-                    TokenType.LEFT_ARROW,
-                    "<-",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.LEFT_ARROW, "<-", start_pos)
             else:
-                self._add_token(
-                    TokenType.LT,
-                    "<",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.LT, "<", start_pos)
         elif char == ">":
             if self._match("="):
-                self._add_token(
-                    TokenType.GE,
-                    ">=",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.GE, ">=", start_pos)
             else:
-                self._add_token(
-                    TokenType.GT,
-                    ">",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.GT, ">", start_pos)
         elif char == "|":
             if self._match("|"):
-                self._add_token(
-                    TokenType.DOUBLE_PIPE,
-                    "||",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.DOUBLE_PIPE, "||", start_pos)
             else:
-                self._add_token(
-                    TokenType.PIPE,
-                    "|",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.PIPE, "|", start_pos)
         elif char == "&":
             if self._match("&"):
-                self._add_token(
-                    TokenType.DOUBLE_AMP,
-                    "&&",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.DOUBLE_AMP, "&&", start_pos)
             else:
-                self._add_token(
-                    TokenType.AMP,
-                    "&",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.AMP, "&", start_pos)
         elif char == "(":
-            self._add_token(
-                TokenType.LPAREN, "(", self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.LPAREN, "(", start_pos)
         elif char == ")":
-            self._add_token(
-                TokenType.RPAREN, ")", self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.RPAREN, ")", start_pos)
         elif char == "[":
-            self._add_token(
-                TokenType.LBRACKET,
-                "[",
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.LBRACKET, "[", start_pos)
         elif char == "]":
-            self._add_token(
-                TokenType.RBRACKET,
-                "]",
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.RBRACKET, "]", start_pos)
         elif char == "{":
-            self._add_token(
-                TokenType.LBRACE, "{", self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.LBRACE, "{", start_pos)
         elif char == "}":
-            self._add_token(
-                TokenType.RBRACE, "}", self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.RBRACE, "}", start_pos)
         elif char == ",":
-            self._add_token(
-                TokenType.COMMA, ",", self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.COMMA, ",", start_pos)
         elif char == ".":
             if self._match("."):
                 if self._match("."):
-                    self._add_token(
-                        TokenType.TRIPLE_DOT,
-                        "...",
-                        self._span_from(start_pos, start_line, start_col),
-                    )
+                    self._add_token(TokenType.TRIPLE_DOT, "...", start_pos)
                 else:
-                    self._add_token(
-                        TokenType.DOUBLE_DOT,
-                        "..",
-                        self._span_from(start_pos, start_line, start_col),
-                    )
+                    self._add_token(TokenType.DOUBLE_DOT, "..", start_pos)
             else:
-                self._add_token(
-                    TokenType.DOT,
-                    ".",
-                    self._span_from(start_pos, start_line, start_col),
-                )
+                self._add_token(TokenType.DOT, ".", start_pos)
         elif char == ";":
-            self._add_token(
-                TokenType.SEMICOLON,
-                ";",
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.SEMICOLON, ";", start_pos)
         elif char == "`":
-            self._add_token(
-                TokenType.BACKTICK,
-                "`",
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.BACKTICK, "`", start_pos)
         elif char == "\\":
-            self._add_token(
-                TokenType.BACKSLASH,
-                "\\",
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.BACKSLASH, "\\", start_pos)
         else:
             raise LexerError(
                 f"Unexpected character: {char!r}",
-                self._span_from(start_pos, start_line, start_col),
+                self._span_from(start_pos),
             )
 
     def _line_comment(self) -> None:
         while not self._at_end() and self._peek() != "\n":
             self._advance()
 
-    def _number(
-        self, start_pos: int, start_line: int, start_col: int, first_char: str
-    ) -> None:
+    def _number(self, start_pos: int, first_char: str) -> None:
         digits = [first_char]
 
         while self._peek().isdigit() or self._peek() == "_":
@@ -367,32 +498,26 @@ class Lexer:
                     digits.append(self._advance())
 
             value = float("".join(digits))
-            self._add_token(
-                TokenType.FLOAT,
-                value,
-                self._span_from(start_pos, start_line, start_col),
-            )
+            self._add_token(TokenType.FLOAT, value, start_pos)
         else:
             value = int("".join(digits))
-            self._add_token(
-                TokenType.INT, value, self._span_from(start_pos, start_line, start_col)
-            )
+            self._add_token(TokenType.INT, value, start_pos)
 
-    def _string(self, start_pos: int, start_line: int, start_col: int) -> None:
+    def _string(self, start_pos: int) -> None:
         chars: list[str] = []
 
         while not self._at_end() and self._peek() != '"':
             if self._peek() == "\n":
                 raise LexerError(
                     "Unterminated string",
-                    self._span_from(start_pos, start_line, start_col),
+                    self._span_from(start_pos),
                 )
             if self._peek() == "\\":
                 self._advance()
                 if self._at_end():
                     raise LexerError(
                         "Unterminated escape sequence",
-                        self._span_from(start_pos, start_line, start_col),
+                        self._span_from(start_pos),
                     )
                 escaped = self._advance()
                 if escaped == "n":
@@ -413,27 +538,23 @@ class Lexer:
         if self._at_end():
             raise LexerError(
                 "Unterminated string",
-                self._span_from(start_pos, start_line, start_col),
+                self._span_from(start_pos),
             )
 
         self._advance()
-        self._add_token(
-            TokenType.STRING,
-            "".join(chars),
-            self._span_from(start_pos, start_line, start_col),
-        )
+        self._add_token(TokenType.STRING, "".join(chars), start_pos)
 
-    def _char(self, start_pos: int, start_line: int, start_col: int) -> None:
+    def _char(self, start_pos: int) -> None:
         if self._at_end():
             raise LexerError(
                 "Unterminated character literal",
-                self._span_from(start_pos, start_line, start_col),
+                self._span_from(start_pos),
             )
 
         if self._peek() == "'":
             raise LexerError(
                 "Empty character literal",
-                self._span_from(start_pos, start_line, start_col),
+                self._span_from(start_pos),
             )
 
         char_value: str
@@ -442,7 +563,7 @@ class Lexer:
             if self._at_end():
                 raise LexerError(
                     "Unterminated escape sequence",
-                    self._span_from(start_pos, start_line, start_col),
+                    self._span_from(start_pos),
                 )
             escaped = self._advance()
             if escaped == "n":
@@ -465,22 +586,15 @@ class Lexer:
         if self._at_end() or self._peek() != "'":
             raise LexerError(
                 "Unterminated character literal",
-                self._span_from(start_pos, start_line, start_col),
+                self._span_from(start_pos),
             )
 
         self._advance()
-        self._add_token(
-            TokenType.CHAR,
-            char_value,
-            self._span_from(start_pos, start_line, start_col),
-        )
+        self._add_token(TokenType.CHAR, char_value, start_pos)
 
-    def _identifier(self, start_pos: int, start_line: int, start_col: int) -> None:
+    def _identifier(self, start_pos: int) -> None:
         while self._peek().isalnum() or self._peek() == "_":
             self._advance()
 
-        text = self.source[start_pos : self.pos]
-        token_type = KEYWORDS.get(text, TokenType.IDENT)
-        self._add_token(
-            token_type, text, self._span_from(start_pos, start_line, start_col)
-        )
+        symbol = self.symbols.lookup(self.source[start_pos : self.pos])
+        self._add_token(symbol.type, symbol.name, start_pos)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from mmap import mmap
+
+
+def shifted_bisect(
+    values: array[int], shift_at: int, shift: int, offset: int, right: bool = True
+) -> int:
+    """Bisect ``values`` as if ``shift`` were added to ``values[shift_at:]``."""
+    bisect = bisect_right if right else bisect_left
+    if shift_at < len(values):
+        first = values[shift_at] + shift
+        if first < offset or (right and first == offset):
+            return bisect(values, offset - shift, shift_at)
+    return bisect(values, offset, 0, shift_at)
+
+
+def splice_shifted(
+    values: array[int],
+    shift_at: int,
+    shift: int,
+    start: int,
+    stop: int,
+    middle: array[int],
+    delta: int,
+) -> tuple[array[int], int, int]:
+    """Replace ``values[start:stop]`` and shift everything after by ``delta``.
+
+    ``values`` has ``shift`` pending on ``values[shift_at:]``. The result
+    again carries a single pending shift, so only the offsets between the
+    previous edit and this one are rewritten; the rest is copied as is.
+    Returns the new values, shift index and shift.
+    """
+    head = values[:start]
+    if shift and shift_at < start:
+        head[shift_at:] = array("I", map(shift.__add__, head[shift_at:]))
+    head.extend(middle)
+    new_shift_at = len(head)
+    tail = values[stop:]
+    if shift and shift_at > stop:
+        unshifted = shift_at - stop
+        if delta:
+            tail[:unshifted] = array("I", map(delta.__add__, tail[:unshifted]))
+        new_shift_at += unshifted
+    head.extend(tail)
+    return head, new_shift_at, shift + delta
+
+
+class LineIndex:
+    """Line-start offsets of a source text.
+
+    Built once per file; lines and columns are computed by binary search
+    only when a diagnostic asks for them. Lines and columns are 1-based.
+    The source may also be UTF-8 bytes, indexed by byte offset; columns
+    still count characters.
+    """
+
+    def __init__(self, source: str | bytes | mmap):
+        self.source = source
+        starts = array("I", [0])
+        find = source.find
+        eol = "\n" if isinstance(source, str) else b"\n"
+        newline = find(eol)  # type: ignore[arg-type]
+        while newline >= 0:
+            starts.append(newline + 1)
+            newline = find(eol, newline + 1)  # type: ignore[arg-type]
+        self._starts = starts
+        self._shift_at = len(starts)
+        self._shift = 0
+
+    @property
+    def starts(self) -> array[int]:
+        if self._shift:
+            starts = self._starts
+            starts[self._shift_at :] = array(
+                "I", map(self._shift.__add__, starts[self._shift_at :])
+            )
+            self._shift = 0
+        return self._starts
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def edited(
+        self, source: str, offset: int, removed: int, inserted: str
+    ) -> LineIndex:
+        """Index of ``source``, the result of an edit to the indexed text.
+
+        Line starts before and after the edited range are reused, so only
+        the inserted text is searched for newlines.
+        """
+        starts, shift_at, shift = self._starts, self._shift_at, self._shift
+        head = shifted_bisect(starts, shift_at, shift, offset)
+        tail = shifted_bisect(starts, shift_at, shift, offset + removed + 1, False)
+        middle = array("I")
+        newline = inserted.find("\n")
+        while newline >= 0:
+            middle.append(offset + newline + 1)
+            newline = inserted.find("\n", newline + 1)
+
+        index = LineIndex.__new__(LineIndex)
+        index.source = source
+        index._starts, index._shift_at, index._shift = splice_shifted(
+            starts, shift_at, shift, head, tail, middle, len(inserted) - removed
+        )
+        return index
+
+    def _start(self, line: int) -> int:
+        start = self._starts[line - 1]
+        return start + self._shift if line > self._shift_at else start
+
+    def line(self, offset: int) -> int:
+        return shifted_bisect(self._starts, self._shift_at, self._shift, offset)
+
+    def position(self, offset: int) -> tuple[int, int]:
+        line = self.line(offset)
+        start = self._start(line)
+        if isinstance(self.source, str):
+            return line, offset - start + 1
+        prefix = self.source[start:offset]
+        return line, len(prefix.decode("utf-8", errors="replace")) + 1
+
+    def line_text(self, line: int) -> str:
+        source = self.source
+        start = self._start(line)
+        if isinstance(source, str):
+            end = source.find("\n", start)
+            return source[start:] if end < 0 else source[start:end]
+        end = source.find(b"\n", start)
+        text = source[start:] if end < 0 else source[start:end]
+        return text.decode("utf-8", errors="replace")
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import mmap
+from pathlib import Path
+
+from pfn.lexer.lexer import SourceText
+
+
+def read_source(path: Path) -> SourceText:
+    """Memory-map a source file for lexing without decoding it.
+
+    The mapping is read-only and stays valid after the file is closed;
+    it is released when the last token span referencing it is dropped.
+    Empty files cannot be mapped and are returned as ``b""``.
+    """
+    with path.open("rb") as f:
+        if f.seek(0, 2) == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
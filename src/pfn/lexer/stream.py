@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from pfn.lexer.tokens import NAME_TYPES, Span, Token, TokenType
+
+if TYPE_CHECKING:
+    from pfn.lexer.lexer import Lexer
+
+
+class TokenStream:
+    """Tokens scanned from a ``Lexer`` only when the parser asks for them.
+
+    The stream itself keeps no tokens: ``pull`` appends the next chunk to
+    lists owned by the consumer, which drops them once they are no longer
+    reachable by backtracking. Lexer errors surface when the parser
+    reaches the offending token.
+    """
+
+    def __init__(self, lexer: Lexer, chunk: int = 64):
+        self.lines = lexer.lines
+        self.symbols = lexer.symbols
+        self.chunk = chunk
+        self.done = False
+        self._scan = lexer.scan()
+
+    def pull(self, tokens: list[Token], types: list[TokenType]) -> None:
+        """Append up to ``chunk`` tokens; the last one appended is EOF."""
+        lines = self.lines
+        flags = self.symbols.flags
+        for token_type, value, start, end in islice(self._scan, self.chunk):
+            token = Token(token_type, value, Span(start, end, lines))
+            if token_type in NAME_TYPES:
+                token.flags = flags(value)  # type: ignore[arg-type]
+            tokens.append(token)
+            types.append(token_type)
+        if types and types[-1] == TokenType.EOF:
+            self.done = True
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from pfn.lexer.tokens import KEYWORDS, SymbolFlags, TokenType
+
+# Names the code generator must escape because Python reserves them.
+PYTHON_KEYWORDS: frozenset[str] = frozenset(
+    {
+        "lambda",
+        "def",
+        "class",
+        "if",
+        "else",
+        "elif",
+        "for",
+        "while",
+        "try",
+        "except",
+        "finally",
+        "with",
+        "as",
+        "import",
+        "from",
+        "return",
+        "yield",
+        "raise",
+        "break",
+        "continue",
+        "pass",
+        "True",
+        "False",
+        "None",
+        "and",
+        "or",
+        "not",
+        "in",
+        "is",
+        "global",
+        "nonlocal",
+        "assert",
+        "del",
+        "match",
+        "case",
+    }
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Symbol:
+    name: str
+    type: TokenType
+    flags: SymbolFlags
+
+
+def _flags(name: str, token_type: TokenType) -> SymbolFlags:
+    flags = SymbolFlags.NONE
+    if token_type is not TokenType.IDENT:
+        flags |= SymbolFlags.KEYWORD
+    if name in PYTHON_KEYWORDS:
+        flags |= SymbolFlags.PY_KEYWORD
+    if name[0].isupper():
+        flags |= SymbolFlags.CONSTRUCTOR
+    return flags
+
+
+class SymbolTable:
+    """Interned identifier spellings for one compilation.
+
+    Keywords are preloaded, so recognizing a keyword and interning a name
+    is one dict lookup. Every occurrence of a name shares one ``str``, and
+    later passes can compare names by identity and read their flags
+    instead of re-inspecting the spelling.
+    """
+
+    def __init__(self) -> None:
+        self.symbols: dict[str, Symbol] = {
+            name: Symbol(name, token_type, _flags(name, token_type))
+            for name, token_type in KEYWORDS.items()
+        }
+        self.symbols["_"] = Symbol("_", TokenType.UNDERSCORE, SymbolFlags.NONE)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.symbols
+
+    def lookup(self, name: str) -> Symbol:
+        """Return the symbol for ``name``, interning it on first sight."""
+        symbol = self.symbols.get(name)
+        if symbol is None:
+            symbol = Symbol(name, TokenType.IDENT, _flags(name, TokenType.IDENT))
+            self.symbols[name] = symbol
+        return symbol
+
+    def intern(self, name: str) -> str:
+        return self.lookup(name).name
+
+    def flags(self, name: str) -> SymbolFlags:
+        return self.lookup(name).flags
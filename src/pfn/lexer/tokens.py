@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from enum import Enum, auto
+from dataclasses import dataclass, field
+from enum import Enum, IntFlag, auto
 from typing import Union
 
+from pfn.lexer.lines import LineIndex
+
 
 class TokenType(Enum):
     # Literals
@@ -90,12 +92,28 @@ class TokenType(Enum):
     EOF = auto()
 
 
+class SymbolFlags(IntFlag):
+    """Precomputed facts about an identifier or keyword spelling."""
+
+    NONE = 0
+    KEYWORD = 1
+    PY_KEYWORD = 2  # reserved in Python; escaped by the code generator
+    CONSTRUCTOR = 4  # starts with an uppercase letter
+
+
 @dataclass(frozen=True)
 class Span:
     start: int
     end: int
-    line: int
-    column: int
+    lines: LineIndex = field(compare=False, repr=False)
+
+    @property
+    def line(self) -> int:
+        return self.lines.line(self.start)
+
+    @property
+    def column(self) -> int:
+        return self.lines.position(self.start)[1]
 
     def __repr__(self):
         return f"Span({self.line}:{self.column})"
@@ -106,6 +124,7 @@ class Token:
     type: TokenType
     value: str | int | float | None
     span: Span
+    flags: SymbolFlags = field(default=SymbolFlags.NONE, compare=False)
 
     def __repr__(self):
         return f"Token({self.type.name}, {self.value!r}, {self.span})"
@@ -141,3 +160,8 @@ KEYWORDS: dict[str, TokenType] = {
     "True": TokenType.TRUE,
     "False": TokenType.FALSE,
 }
+
+# Token types whose value is a name interned in the lexer's symbol table.
+NAME_TYPES: frozenset[TokenType] = frozenset(
+    [*KEYWORDS.values(), TokenType.IDENT, TokenType.UNDERSCORE]
+)
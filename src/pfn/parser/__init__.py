@@ -1,4 +1,14 @@
 from pfn.parser import ast
+from pfn.parser.cache import ASTCache
+from pfn.parser.incremental import IncrementalParser
+from pfn.parser.parallel import parse_parallel
 from pfn.parser.parser import ParseError, Parser
 
-__all__ = ["Parser", "ParseError", "ast"]
+__all__ = [
+    "ASTCache",
+    "IncrementalParser",
+    "Parser",
+    "ParseError",
+    "ast",
+    "parse_parallel",
+]
@@ -4,7 +4,7 @@ from dataclasses import dataclass, field
 from typing import Union
 
 
-@dataclass
+@dataclass(slots=True)
 class Span:
     start: int
     end: int
@@ -12,34 +12,34 @@ class Span:
     column: int
 
 
-@dataclass
+@dataclass(slots=True)
 class TypeRef:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class SimpleTypeRef(TypeRef):
     name: str
     args: list[TypeRef] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class FunTypeRef(TypeRef):
     param: TypeRef
     result: TypeRef
 
 
-@dataclass
+@dataclass(slots=True)
 class TupleTypeRef(TypeRef):
     elements: list[TypeRef]
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordTypeRef(TypeRef):
     fields: list[tuple[str, TypeRef]]
 
 
-@dataclass
+@dataclass(slots=True)
 class Param:
     name: str
     type_annotation: TypeRef | None = None
@@ -48,69 +48,69 @@ class Param:
 # ============ Patterns ============
 
 
-@dataclass
+@dataclass(slots=True)
 class Pattern:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class IntPattern(Pattern):
     value: int
 
 
-@dataclass
+@dataclass(slots=True)
 class FloatPattern(Pattern):
     value: float
 
 
-@dataclass
+@dataclass(slots=True)
 class StringPattern(Pattern):
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CharPattern(Pattern):
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BoolPattern(Pattern):
     value: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class VarPattern(Pattern):
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class WildcardPattern(Pattern):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class ConsPattern(Pattern):
     head: Pattern
     tail: Pattern
 
 
-@dataclass
+@dataclass(slots=True)
 class ListPattern(Pattern):
     elements: list[Pattern]
     rest: Pattern | None = None  # For spread pattern: [a, b, ...rest]
 
 
-@dataclass
+@dataclass(slots=True)
 class TuplePattern(Pattern):
     elements: list[Pattern]
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordPattern(Pattern):
     fields: list[tuple[str, Pattern]]
 
 
-@dataclass
+@dataclass(slots=True)
 class ConstructorPattern(Pattern):
     name: str
     args: list[Pattern] = field(default_factory=list)
@@ -119,93 +119,93 @@ class ConstructorPattern(Pattern):
 # ============ Expressions ============
 
 
-@dataclass
+@dataclass(slots=True)
 class Expr:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class IntLit(Expr):
     value: int
 
 
-@dataclass
+@dataclass(slots=True)
 class FloatLit(Expr):
     value: float
 
 
-@dataclass
+@dataclass(slots=True)
 class StringLit(Expr):
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CharLit(Expr):
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BoolLit(Expr):
     value: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class UnitLit(Expr):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class Var(Expr):
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Lambda(Expr):
     params: list[Param]
     body: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class App(Expr):
     func: Expr
     args: list[Expr]
 
 
-@dataclass
+@dataclass(slots=True)
 class BinOp(Expr):
     left: Expr
     op: str
     right: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(Expr):
     op: str
     operand: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class If(Expr):
     cond: Expr
     then_branch: Expr
     else_branch: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Let(Expr):
     name: str
     value: Expr
     body: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class LetPattern(Expr):
     pattern: Pattern
     value: Expr
     body: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class LetFunc(Expr):
     name: str
     params: list[Param]
@@ -214,71 +214,71 @@ class LetFunc(Expr):
     is_recursive: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class DoNotation(Expr):
     bindings: list[DoBinding]
     body: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class DoBinding:
     name: str
     value: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Match(Expr):
     scrutinee: Expr
     cases: list[MatchCase]
 
 
-@dataclass
+@dataclass(slots=True)
 class MatchCase:
     pattern: Pattern
     body: Expr
     guard: Expr | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ListLit(Expr):
     elements: list[Expr]
 
 
-@dataclass
+@dataclass(slots=True)
 class TupleLit(Expr):
     elements: list[Expr]
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordLit(Expr):
     fields: list[RecordField]
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordField:
     name: str
     value: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class FieldAccess(Expr):
     expr: Expr
     field: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordUpdate(Expr):
     record: Expr
     updates: list[RecordField]
 
 
-@dataclass
+@dataclass(slots=True)
 class IndexAccess(Expr):
     expr: Expr
     index: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Slice(Expr):
     expr: Expr
     start: Expr | None
@@ -289,12 +289,12 @@ class Slice(Expr):
 # ============ Declarations ============
 
 
-@dataclass
+@dataclass(slots=True)
 class Decl:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class DefDecl(Decl):
     name: str
     params: list[Param]
@@ -304,7 +304,7 @@ class DefDecl(Decl):
     export_name: str | None = None
     has_parens: bool = False  # True if defined with () like def foo() = expr
 
-@dataclass
+@dataclass(slots=True)
 class TypeDecl(Decl):
     name: str
     params: list[str] = field(default_factory=list)
@@ -314,27 +314,27 @@ class TypeDecl(Decl):
     is_gadt: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class GADTConstructor:
     name: str
     params: list[TypeRef]
     result_type: TypeRef
 
 
-@dataclass
+@dataclass(slots=True)
 class Constructor:
     name: str
     fields: list[TypeRef] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class TypeAliasDecl(Decl):
     name: str
     params: list[str]
     type_ref: TypeRef
 
 
-@dataclass
+@dataclass(slots=True)
 class ImportDecl(Decl):
     module: str
     alias: str | None = None
@@ -342,12 +342,12 @@ class ImportDecl(Decl):
     is_python: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ExportDecl(Decl):
     names: list[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class InterfaceDecl(Decl):
     """Type class interface definition"""
 
@@ -357,13 +357,13 @@ class InterfaceDecl(Decl):
     superclasses: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class InterfaceMethod:
     name: str
     type: TypeRef
 
 
-@dataclass
+@dataclass(slots=True)
 class ImplDecl(Decl):
     """Type class instance implementation"""
 
@@ -372,14 +372,14 @@ class ImplDecl(Decl):
     methods: list[ImplMethod] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ImplMethod:
     name: str
     params: list[Param]
     body: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class EffectDecl(Decl):
     """Effect declaration"""
 
@@ -387,13 +387,13 @@ class EffectDecl(Decl):
     operations: list[EffectOp] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class EffectOp:
     name: str
     type: TypeRef
 
 
-@dataclass
+@dataclass(slots=True)
 class HandlerDecl(Decl):
     """Handler declaration for custom effect handling"""
 
@@ -402,7 +402,7 @@ class HandlerDecl(Decl):
     return_type: TypeRef | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class HandlerCase:
     """Single handler case for an operation"""
 
@@ -412,7 +412,7 @@ class HandlerCase:
     resume_param: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class HandleExpr(Expr):
     """Handle expression: handle expr with handler"""
 
@@ -421,7 +421,7 @@ class HandleExpr(Expr):
     handler_name: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PerformExpr(Expr):
     """Perform an effect operation"""
 
@@ -433,7 +433,7 @@ class PerformExpr(Expr):
 # ============ Module ============
 
 
-@dataclass
+@dataclass(slots=True)
 class Module:
     name: str | None = None
     declarations: list[Decl] = field(default_factory=list)
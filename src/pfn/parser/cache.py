@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import hashlib
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import Callable
+
+from pfn import __version__
+from pfn.lexer import Lexer, SourceText
+from pfn.parser import ast
+from pfn.parser.parser import Parser
+
+# Overrides where ``cache_dir`` keeps entries.
+CACHE_DIR_ENV = "PFN_CACHE_DIR"
+
+_MAGIC = b"PFNAST01"
+
+
+def _ast_layout() -> bytes:
+    """Every AST class with its field names, so a changed node shape misses."""
+    classes = sorted(
+        (name, value)
+        for name, value in vars(ast).items()
+        if isinstance(value, type) and dataclasses.is_dataclass(value)
+    )
+    return repr(
+        [(name, [f.name for f in dataclasses.fields(cls)]) for name, cls in classes]
+    ).encode()
+
+
+def sources_digest(*packages: str) -> bytes:
+    """SHA-256 of the Python sources of the ``pfn`` subpackages ``packages``.
+
+    Caches mix this into their keys, so entries made by a compiler whose
+    behaviour may differ miss even when ``__version__`` was not bumped.
+    """
+    root = Path(__file__).resolve().parent.parent
+    digest = hashlib.sha256()
+    for package in packages:
+        for source in sorted((root / package).rglob("*.py")):
+            digest.update(f"\0{source.relative_to(root).as_posix()}\0".encode())
+            digest.update(source.read_bytes())
+    return digest.digest()
+
+
+@functools.cache
+def _salt() -> bytes:
+    """Mixed into every digest: entries from another compiler, including one
+    whose lexer or parser was edited, never match.
+
+    Computed on first use, so importing the parser does not read its sources.
+    """
+    layout = _ast_layout() + sources_digest("lexer", "parser")
+    return hashlib.sha256(_MAGIC + __version__.encode() + layout).digest()
+
+
+def source_digest(source: SourceText) -> bytes:
+    """SHA-256 of ``source`` salted with the compiler version and AST layout."""
+    digest = hashlib.sha256(_salt())
+    digest.update(source.encode() if isinstance(source, str) else source)
+    return digest.digest()
+
+
+def cache_dir() -> Path:
+    """The per-user directory cache entries are kept in.
+
+    ``$PFN_CACHE_DIR`` if set, else ``pfn`` under ``$XDG_CACHE_HOME`` or
+    ``~/.cache``. Entries are unpickled when loaded, so they are never read
+    from next to the sources, where whoever wrote those could plant one.
+    """
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "pfn"
+
+
+def cache_key(path: Path) -> str:
+    """The file name stem of ``path``'s entries, unique to where it is."""
+    location = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:24]
+    return f"{path.stem}-{location}.pfn-{__version__}"
+
+
+def cache_path(path: Path) -> Path:
+    """Where the parsed AST of ``path`` is cached."""
+    return cache_dir() / f"{cache_key(path)}.ast"
+
+
+def _parse(source: SourceText) -> ast.Module:
+    return Parser(Lexer(source).stream()).parse()
+
+
+class ASTCache:
+    """Parsed modules pickled in ``cache_dir()``, one entry per source file.
+
+    An entry starts with a magic tag and the ``source_digest`` of the text
+    it was parsed from, so a changed source, compiler version, AST layout
+    or lexer and parser source is detected from the header alone and the
+    entry is replaced.
+    The zlib-compressed pickle that follows is smaller than the source.
+    Unreadable or truncated entries count as misses. Entries are written
+    to a temporary file and renamed into place, and a read-only source
+    directory just disables storing.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path: Path, source: SourceText) -> ast.Module | None:
+        """The cached AST for ``source`` read from ``path``, or None."""
+        expected = _MAGIC + source_digest(source)
+        try:
+            with cache_path(path).open("rb") as f:
+                if f.read(len(expected)) != expected:
+                    return None
+                module = pickle.loads(zlib.decompress(f.read()))
+        except Exception:
+            # Unpickling a stale or foreign entry can fail in many ways.
+            return None
+        return module if isinstance(module, ast.Module) else None
+
+    def store(self, path: Path, source: SourceText, module: ast.Module) -> None:
+        target = cache_path(path)
+        temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            target.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with temp.open("wb") as f:
+                f.write(_MAGIC + source_digest(source))
+                f.write(zlib.compress(pickle.dumps(module, pickle.HIGHEST_PROTOCOL), 1))
+            os.replace(temp, target)
+        except OSError:
+            temp.unlink(missing_ok=True)
+
+    def parse(
+        self,
+        path: Path,
+        source: SourceText,
+        parse: Callable[[SourceText], ast.Module] = _parse,
+    ) -> ast.Module:
+        """Load ``path``'s AST from the cache, or ``parse`` it and store it."""
+        module = self.load(path, source)
+        if module is not None:
+            self.hits += 1
+            return module
+        self.misses += 1
+        module = parse(source)
+        self.store(path, source, module)
+        return module
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from pfn.lexer import Span, Token, TokenBuffer, TokenType
+from pfn.parser import ast
+from pfn.parser.parser import ParseError, Parser
+
+# Tokens that open a top-level declaration when they start a line.
+DECLARATION_STARTS: frozenset[TokenType] = frozenset(
+    {
+        TokenType.KW_DEF,
+        TokenType.KW_TYPE,
+        TokenType.KW_GADT,
+        TokenType.KW_IMPORT,
+        TokenType.KW_INTERFACE,
+        TokenType.KW_IMPL,
+        TokenType.KW_EFFECT,
+        TokenType.AT,
+    }
+)
+
+
+@dataclass
+class DeclarationChunk:
+    """Tokens ``start:stop`` of one top-level declaration and its source.
+
+    The first chunk also holds the ``module`` header, if any.
+    """
+
+    start: int
+    stop: int
+    text: str | bytes
+
+
+def split_declarations(tokens: list[Token] | TokenBuffer) -> list[DeclarationChunk]:
+    """Cut ``tokens`` before every declaration keyword in column 1."""
+    if isinstance(tokens, TokenBuffer):
+        types = tokens.types
+        starts, ends = tokens.starts, tokens.ends
+        source = tokens.line_index.source
+    else:
+        types = [token.type for token in tokens]
+        starts = [token.span.start for token in tokens]
+        ends = [token.span.end for token in tokens]
+        source = tokens[-1].span.lines.source
+
+    eof = len(types) - 1
+    cuts = [0]
+    for i in range(1, eof):
+        if types[i] in DECLARATION_STARTS:
+            start = starts[i]
+            if source[start - 1 : start] in ("\n", b"\n"):
+                cuts.append(i)
+    cuts.append(eof)
+
+    return [
+        DeclarationChunk(start, stop, source[starts[start] : ends[stop - 1]])
+        for start, stop in zip(cuts, cuts[1:])
+        if stop > start
+    ]
+
+
+def parse_chunk(
+    tokens: list[Token] | TokenBuffer, chunk: DeclarationChunk
+) -> ast.Module:
+    """Parse one chunk on its own, as if it were followed by end of file."""
+    window = list(tokens[chunk.start : chunk.stop])
+    end = window[-1].span
+    window.append(Token(TokenType.EOF, None, Span(end.end, end.end, end.lines)))
+    return Parser(window).parse()
+
+
+class IncrementalParser:
+    """Reparses only the top-level declarations whose source changed.
+
+    Declarations are keyed by their source text, which fixes their tokens
+    and line breaks. Declarations whose text was seen in the previous
+    ``parse`` are reused as the same ``ast.Decl`` objects, so later stages
+    can skip them by identity. The AST carries no offsets, so moving a
+    declaration does not invalidate it.
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[str | bytes, list[ast.Module]] = {}
+        self.reused = 0
+        self.parsed = 0
+
+    def parse(self, tokens: list[Token] | TokenBuffer) -> ast.Module:
+        previous = self._cache
+        cache: dict[str | bytes, list[ast.Module]] = {}
+        self.reused = self.parsed = 0
+        name = None
+        declarations: list[ast.Decl] = []
+
+        try:
+            for i, chunk in enumerate(split_declarations(tokens)):
+                # Identical declarations each keep their own AST.
+                cached = previous.get(chunk.text)
+                if cached:
+                    module = cached.pop()
+                    self.reused += 1
+                else:
+                    module = parse_chunk(tokens, chunk)
+                    self.parsed += 1
+                cache.setdefault(chunk.text, []).append(module)
+                if i == 0:
+                    name = module.name
+                declarations.extend(module.declarations)
+        except ParseError:
+            # Report the error exactly as a whole-module parse would.
+            self._cache = {}
+            return Parser(tokens).parse()
+
+        self._cache = cache
+        return ast.Module(name=name, declarations=declarations)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from pfn.lexer import Lexer, LexerError, Token, TokenBuffer
+from pfn.parser import ast
+from pfn.parser.incremental import DeclarationChunk, split_declarations
+from pfn.parser.parser import ParseError, Parser
+
+
+def _parse_sources(sources: list[str | bytes]) -> list[ast.Module] | None:
+    """Worker: parse each declaration's source; None if any fails.
+
+    Errors are not sent back because the caller reparses serially to
+    report them, and exceptions carrying tokens do not pickle.
+    """
+    try:
+        return [
+            Parser(Lexer(source, regex=True).tokenize()).parse() for source in sources
+        ]
+    except (LexerError, ParseError):
+        return None
+
+
+def _batches(chunks: list[DeclarationChunk], count: int) -> list[list[str | bytes]]:
+    """Split ``chunks`` into about ``count`` runs of similar source length."""
+    total = sum(len(chunk.text) for chunk in chunks)
+    target = max(1, total // count)
+    batches: list[list[str | bytes]] = [[]]
+    size = 0
+    for chunk in chunks:
+        if size >= target:
+            batches.append([])
+            size = 0
+        batches[-1].append(chunk.text)
+        size += len(chunk.text)
+    return batches
+
+
+def parse_parallel(
+    tokens: list[Token] | TokenBuffer,
+    workers: int | None = None,
+    executor: Executor | None = None,
+) -> ast.Module:
+    """Parse a module's top-level declarations in a process pool.
+
+    The module is cut with ``split_declarations`` and each worker re-lexes
+    and parses the source text of a run of consecutive declarations, so
+    no tokens are pickled. Results are stitched back in source order. If
+    any declaration fails, the module is parsed serially so the error is
+    the one ``Parser.parse`` raises.
+    """
+    chunks = split_declarations(tokens)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) < 2:
+        return Parser(tokens).parse()
+
+    # A few batches per worker keeps the pool busy when sizes vary.
+    batches = _batches(chunks, workers * 4)
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_parse_sources, batches))
+    else:
+        results = list(executor.map(_parse_sources, batches))
+
+    modules: list[ast.Module] = []
+    for result in results:
+        if result is None:
+            return Parser(tokens).parse()
+        modules.extend(result)
+
+    declarations = [decl for module in modules for decl in module.declarations]
+    return ast.Module(name=modules[0].name, declarations=declarations)
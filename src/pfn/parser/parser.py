@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from pfn.lexer import Token, TokenType
+from typing import Any
+
+from pfn.lexer import SymbolFlags, Token, TokenBuffer, TokenStream, TokenType
 from pfn.parser import ast
 from pfn.types import TFun
 
@@ -32,9 +34,37 @@ class Parser:
         TokenType.FAT_ARROW: 8,
     }
 
-    def __init__(self, tokens: list[Token]):
-        self.tokens = tokens
+    # Operators handled by _parse_binary. ``=>`` is excluded: it ends a
+    # lambda's parameter list and is never a binary operator.
+    BINARY_PRECEDENCE: dict[TokenType, int] = {
+        token_type: precedence
+        for token_type, precedence in PRECEDENCE.items()
+        if token_type != TokenType.FAT_ARROW
+    }
+
+    RIGHT_ASSOCIATIVE: frozenset[TokenType] = frozenset({TokenType.DOUBLE_COLON})
+
+    def __init__(self, tokens: list[Token] | TokenBuffer | TokenStream):
         self.pos = 0
+        self._buffer: TokenBuffer | None = None
+        self._stream: TokenStream | None = None
+        # Kind column used by the lookahead checks, so a TokenBuffer only
+        # materializes Token objects for tokens whose value is read.
+        self._types: list[TokenType] = []
+        # Streamed tokens of the current declaration; see _fill and _release.
+        self._window: list[Token] = []
+        self.tokens: list[Token] | TokenBuffer = self._window
+        # Answers of speculative lookahead keyed by (rule, token index), so
+        # nested constructs ending at the same token do not rescan it.
+        self._memo: dict[tuple[str, int], Any] = {}
+        if isinstance(tokens, TokenStream):
+            self._stream = tokens
+        elif isinstance(tokens, TokenBuffer):
+            self.tokens = self._buffer = tokens
+            self._types = tokens.types
+        else:
+            self.tokens = tokens
+            self._types = [token.type for token in tokens]
 
     def parse(self) -> ast.Module:
         declarations = []
@@ -53,18 +83,43 @@ class Parser:
             decl = self._parse_declaration()
             if decl is not None:
                 declarations.append(decl)
+            self._release()
         return ast.Module(name=module_name, declarations=declarations)
 
     def parse_expr(self) -> ast.Expr:
         return self._parse_expr()
 
+    def _fill(self, index: int) -> bool:
+        """Pull streamed tokens until ``index`` exists; False if past EOF."""
+        stream = self._stream
+        if stream is None:
+            return False
+        while not stream.done and index >= len(self._types):
+            stream.pull(self._window, self._types)
+        return index < len(self._types)
+
+    def _release(self) -> None:
+        """Drop streamed tokens before the current position.
+
+        Called between declarations, which no lookahead or backtracking
+        crosses, so indexes are rebased to the start of the window and the
+        lookahead memo is emptied.
+        """
+        self._memo.clear()
+        if self._stream is not None and self.pos:
+            del self._window[: self.pos]
+            del self._types[: self.pos]
+            self.pos = 0
+
     def _current(self) -> Token:
-        if self.pos >= len(self.tokens):
+        if self.pos >= len(self._types) and not self._fill(self.pos):
             return self.tokens[-1]
         return self.tokens[self.pos]
 
     def _check(self, *types: TokenType) -> bool:
-        return self._current().type in types
+        if self.pos >= len(self._types) and not self._fill(self.pos):
+            return self._types[-1] in types
+        return self._types[self.pos] in types
 
     def _match(self, *types: TokenType) -> Token | None:
         if self._check(*types):
@@ -261,7 +316,7 @@ class Parser:
 
         params = []
         while self._check(TokenType.IDENT):
-            peek_type = self._peek().type
+            peek_type = self._peek_type()
             if peek_type in (TokenType.EQUALS, TokenType.PIPE, TokenType.EOF):
                 param_token = self._match(TokenType.IDENT)
                 if param_token:
@@ -326,15 +381,27 @@ class Parser:
         return type_decl
 
     def _peek(self) -> Token:
-        if self.pos + 1 >= len(self.tokens):
+        if self.pos + 1 >= len(self._types) and not self._fill(self.pos + 1):
             return self.tokens[-1]
         return self.tokens[self.pos + 1]
 
     def _peek_n(self, n: int) -> Token:
-        if self.pos + n >= len(self.tokens):
+        if self.pos + n >= len(self._types) and not self._fill(self.pos + n):
             return self.tokens[-1]
         return self.tokens[self.pos + n]
 
+    def _peek_type(self, n: int = 1) -> TokenType:
+        if self.pos + n >= len(self._types) and not self._fill(self.pos + n):
+            return self._types[-1]
+        return self._types[self.pos + n]
+
+    def _peek_line(self, n: int) -> int:
+        self._fill(self.pos + n)
+        index = min(self.pos + n, len(self._types) - 1)
+        if self._buffer is not None:
+            return self._buffer.line_index.line(self._buffer.start(index))
+        return self.tokens[index].span.line
+
     def _is_binding_pattern(self) -> bool:
         """Check if current position starts a new let binding pattern.
         
@@ -342,33 +409,38 @@ class Parser:
         Examples:
         - name = ...        (simple binding)
         - name param = ...  (function binding)
+
+        Every IDENT of the scanned run gets the same answer, so it is
+        memoized for all of them and an application is scanned once
+        rather than once per argument.
         """
+        known = self._memo.get(("binding", self.pos))
+        if known is not None:
+            return known
         if not self._check(TokenType.IDENT):
             return False
         # Get the line number of the first IDENT
-        first_token = self._current()
-        if not hasattr(first_token, 'span') or not first_token.span:
-            return False
-        first_line = first_token.span.line
-        
+        first_line = self._peek_line(0)
+
         idx = 1
-        while self._peek_n(idx).type == TokenType.IDENT:
+        result = None
+        while self._peek_type(idx) == TokenType.IDENT:
             # Check if this IDENT is on the same line
-            peek_token = self._peek_n(idx)
-            if hasattr(peek_token, 'span') and peek_token.span:
-                if peek_token.span.line != first_line:
-                    # Different line - this is not a binding pattern
-                    return False
+            if self._peek_line(idx) != first_line:
+                # Different line - this is not a binding pattern
+                result = False
+                break
             idx += 1
-        
-        # Check if the token after all IDENTs is EQUALS and on the same line
-        equals_token = self._peek_n(idx)
-        if hasattr(equals_token, 'span') and equals_token.span:
-            if equals_token.span.line != first_line:
-                return False
-        
-        # This is a binding pattern if we see IDENT followed by IDENT(s) and then EQUALS
-        return equals_token.type == TokenType.EQUALS
+
+        if result is None:
+            # A binding pattern if IDENT(s) are followed by EQUALS on the same line
+            result = (
+                self._peek_line(idx) == first_line
+                and self._peek_type(idx) == TokenType.EQUALS
+            )
+        for index in range(self.pos, self.pos + idx):
+            self._memo[("binding", index)] = result
+        return result
 
     def _parse_import(self) -> ast.ImportDecl:
         is_python = False
@@ -598,12 +670,9 @@ class Parser:
                 # Check for next binding: IDENT followed by IDENT (function params) or EQUALS
                 if self._check(TokenType.IDENT):
                     # Look ahead to see if this is a new binding
-                    next_pos = self.pos + 1
-                    if next_pos < len(self.tokens):
-                        next_token = self.tokens[next_pos]
-                        # Continue if: IDENT IDENT (function) or IDENT EQUALS (value)
-                        if next_token.type in (TokenType.IDENT, TokenType.EQUALS):
-                            continue
+                    # Continue if: IDENT IDENT (function) or IDENT EQUALS (value)
+                    if self._peek_type() in (TokenType.IDENT, TokenType.EQUALS):
+                        continue
                 if self._check(TokenType.LPAREN):
                     continue
                 break
@@ -665,21 +734,11 @@ class Parser:
                 cases.append(ast.MatchCase(pattern=pattern, guard=guard, body=body))
                 if self._match(TokenType.PIPE):
                     continue
-                if self._is_pattern_start() and self._peek().type == TokenType.ARROW:
+                if self._is_case_start():
                     continue
-                if self._is_pattern_start():
-                    saved_pos = self.pos
-                    try:
-                        self._parse_pattern()
-                        if self._check(TokenType.ARROW):
-                            self.pos = saved_pos
-                            continue
-                    except:
-                        pass
-                    self.pos = saved_pos
                 break
             return ast.Match(scrutinee=scrutinee, cases=cases)
-        return self._parse_or()
+        return self._parse_binary()
 
     def _parse_expr_stop_on_pattern(self) -> ast.Expr:
         return self._parse_let_stop_on_pattern()
@@ -739,12 +798,9 @@ class Parser:
                 # Check for next binding: IDENT followed by IDENT (function params) or EQUALS
                 if self._check(TokenType.IDENT):
                     # Look ahead to see if this is a new binding
-                    next_pos = self.pos + 1
-                    if next_pos < len(self.tokens):
-                        next_token = self.tokens[next_pos]
-                        # Continue if: IDENT IDENT (function) or IDENT EQUALS (value)
-                        if next_token.type in (TokenType.IDENT, TokenType.EQUALS):
-                            continue
+                    # Continue if: IDENT IDENT (function) or IDENT EQUALS (value)
+                    if self._peek_type() in (TokenType.IDENT, TokenType.EQUALS):
+                        continue
                 if self._check(TokenType.LPAREN):
                     continue
                 break
@@ -773,11 +829,11 @@ class Parser:
             return ast.If(cond=cond, then_branch=then_branch, else_branch=else_branch)
         if (
             self._check(TokenType.KW_MATCH)
-            and not self._peek().type == TokenType.LPAREN
+            and not self._peek_type() == TokenType.LPAREN
         ):
             self._match(TokenType.KW_MATCH)
             return self._parse_match_stop_on_pattern()
-        return self._parse_or()
+        return self._parse_binary()
 
     def _parse_match_stop_on_pattern(self) -> ast.Expr:
         scrutinee = self._parse_expr_stop_on_pattern()
@@ -795,21 +851,70 @@ class Parser:
             cases.append(ast.MatchCase(pattern=pattern, guard=guard, body=body))
             if self._match(TokenType.PIPE):
                 continue
-            if self._is_pattern_start() and self._peek().type == TokenType.ARROW:
+            if self._is_case_start():
                 continue
-            if self._is_pattern_start():
-                saved_pos = self.pos
-                try:
-                    self._parse_pattern()
-                    if self._check(TokenType.ARROW):
-                        self.pos = saved_pos
-                        continue
-                except:
-                    pass
-                self.pos = saved_pos
             break
         return ast.Match(scrutinee=scrutinee, cases=cases)
 
+    def _is_case_start(self) -> bool:
+        """Check if a match case without a leading ``|`` starts here.
+
+        Every enclosing match whose last case body ends at this token asks
+        again, so the speculative pattern parse is memoized.
+        """
+        if not self._is_pattern_start():
+            return False
+        if self._peek_type() == TokenType.ARROW:
+            return True
+        key = ("case", self.pos)
+        result = self._memo.get(key)
+        if result is None:
+            saved_pos = self.pos
+            try:
+                self._parse_pattern()
+                result = self._check(TokenType.ARROW)
+            except Exception:
+                result = False
+            self.pos = saved_pos
+            self._memo[key] = result
+        return result
+
+    def _skip_group(
+        self, start: int, open_type: TokenType, close_type: TokenType
+    ) -> tuple[int, bool]:
+        """Skip the group opened at ``start``; return the index after it.
+
+        Only ``open_type`` and ``close_type`` nest, and an unclosed group
+        ends at EOF. Also returns whether a ``|`` sits directly inside the
+        group. One pass memoizes the answer for every nested opener of the
+        same kind, so lookahead over nested arguments stays linear.
+        """
+        rule = open_type.name
+        known = self._memo.get((rule, start))
+        if known is not None:
+            return known
+        types = self._types
+        openers = [start]
+        pipes = [False]
+        index = start + 1
+        while openers:
+            if index >= len(types):
+                self._fill(index)
+            token_type = types[index]
+            if token_type == TokenType.EOF:
+                break
+            if token_type == open_type:
+                openers.append(index)
+                pipes.append(False)
+            elif token_type == close_type:
+                self._memo[(rule, openers.pop())] = (index + 1, pipes.pop())
+            elif token_type == TokenType.PIPE:
+                pipes[-1] = True
+            index += 1
+        for opener, pipe in zip(openers, pipes):
+            self._memo[(rule, opener)] = (index, pipe)
+        return self._memo[(rule, start)]
+
     def _is_pattern_start(self) -> bool:
         return self._check(
             TokenType.INT,
@@ -909,7 +1014,8 @@ class Parser:
             TokenType.KW_FN,
             TokenType.KW_GADT,
         ):
-            name = self.tokens[self.pos - 1].value
+            name_token = self.tokens[self.pos - 1]
+            name = name_token.value
             if self._check(TokenType.LPAREN):
                 args = []
                 self.pos += 1
@@ -919,22 +1025,21 @@ class Parser:
                         args.append(self._parse_pattern())
                 self._expect(TokenType.RPAREN, "Expected ')'")
                 return ast.ConstructorPattern(name=name, args=args)
-            name_str = str(name)
-            if name_str and name_str[0].isupper():
+            if name_token.flags & SymbolFlags.CONSTRUCTOR:
                 args = []
                 while self._is_pattern_start():
                     args.append(self._parse_atom_pattern())
                     # Stop if next token is ARROW (start of new case)
-                    if self._peek().type == TokenType.ARROW:
+                    if self._peek_type() == TokenType.ARROW:
                         break
                     if (
                         self._check(TokenType.IDENT)
-                        and self._peek().type == TokenType.EQUALS
+                        and self._peek_type() == TokenType.EQUALS
                     ):
                         break
                     if (
                         self._check(TokenType.IDENT)
-                        and self._peek().type == TokenType.DOT
+                        and self._peek_type() == TokenType.DOT
                     ):
                         break
                 return ast.ConstructorPattern(name=name, args=args)
@@ -944,64 +1049,25 @@ class Parser:
             f"Expected pattern, got {self._current().type}", self._current()
         )
 
-    def _parse_or(self) -> ast.Expr:
-        left = self._parse_and()
-        while self._match(TokenType.DOUBLE_PIPE):
-            right = self._parse_and()
-            left = ast.BinOp(left=left, op="||", right=right)
-        return left
-
-    def _parse_and(self) -> ast.Expr:
-        left = self._parse_comparison()
-        while self._match(TokenType.DOUBLE_AMP):
-            right = self._parse_comparison()
-            left = ast.BinOp(left=left, op="&&", right=right)
-        return left
-
-    def _parse_comparison(self) -> ast.Expr:
-        left = self._parse_cons()
-        while self._match(
-            TokenType.EQ,
-            TokenType.NEQ,
-            TokenType.LT,
-            TokenType.LE,
-            TokenType.GT,
-            TokenType.GE,
-        ):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_cons()
-            left = ast.BinOp(left=left, op=op, right=right)
-        return left
-
-    def _parse_cons(self) -> ast.Expr:
-        left = self._parse_concat()
-        if self._match(TokenType.DOUBLE_COLON):
-            right = self._parse_cons()
-            return ast.BinOp(left=left, op="::", right=right)
-        return left
-
-    def _parse_concat(self) -> ast.Expr:
-        left = self._parse_additive()
-        while self._match(TokenType.DOUBLE_PLUS):
-            right = self._parse_additive()
-            left = ast.BinOp(left=left, op="++", right=right)
-        return left
+    def _parse_binary(self, min_precedence: int = 1) -> ast.Expr:
+        """Parse binary operators by precedence climbing over ``PRECEDENCE``.
 
-    def _parse_additive(self) -> ast.Expr:
-        left = self._parse_multiplicative()
-        while self._match(TokenType.PLUS, TokenType.MINUS):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_multiplicative()
-            left = ast.BinOp(left=left, op=op, right=right)
-        return left
-
-    def _parse_multiplicative(self) -> ast.Expr:
+        Operators in ``RIGHT_ASSOCIATIVE`` take a right operand at their own
+        precedence; all others are left-associative.
+        """
         left = self._parse_unary()
-        while self._match(TokenType.STAR, TokenType.SLASH, TokenType.PERCENT):
-            op = self.tokens[self.pos - 1].value
-            right = self._parse_unary()
+        precedence_of = self.BINARY_PRECEDENCE.get
+        while True:
+            token_type = self._peek_type(0)
+            precedence = precedence_of(token_type)
+            if precedence is None or precedence < min_precedence:
+                return left
+            op = self._current().value
+            self.pos += 1
+            if token_type not in self.RIGHT_ASSOCIATIVE:
+                precedence += 1
+            right = self._parse_binary(precedence)
             left = ast.BinOp(left=left, op=op, right=right)
-        return left
 
     def _parse_unary(self) -> ast.Expr:
         if self._match(TokenType.MINUS, TokenType.BANG):
@@ -1046,37 +1112,28 @@ class Parser:
                 except ParseError:
                     self.pos = saved_pos
                     break
-            elif self._check(TokenType.IDENT) and self._peek().type == TokenType.EQUALS:
+            elif self._check(TokenType.IDENT) and self._peek_type() == TokenType.EQUALS:
                 break
             elif self._is_binding_pattern():
                 break
             # Check for: IDENT IDENT -> (constructor pattern with args followed by ARROW)
             # e.g., "Ok value ->" where Ok is uppercase constructor
-            elif (self._check(TokenType.IDENT) and str(self._current().value)[0].isupper()
-                  and self._peek().type == TokenType.IDENT
-                  and self._peek_n(2).type == TokenType.ARROW):
+            elif (self._check(TokenType.IDENT)
+                  and self._current().flags & SymbolFlags.CONSTRUCTOR
+                  and self._peek_type() == TokenType.IDENT
+                  and self._peek_type(2) == TokenType.ARROW):
                 break
-            elif self._is_pattern_start() and self._peek().type == TokenType.ARROW:
+            elif self._is_pattern_start() and self._peek_type() == TokenType.ARROW:
                 break
             elif self._check(TokenType.IDENT):
-                name = self._current().value
-                if name and str(name)[0].isupper():
-                    if self._peek().type == TokenType.LPAREN:
-                        saved_pos = self.pos
-                        self.pos += 2  # Skip IDENT and LPAREN
-                        depth = 1
-                        while depth > 0 and not self._check(TokenType.EOF):
-                            if self._match(TokenType.LPAREN):
-                                depth += 1
-                            elif self._match(TokenType.RPAREN):
-                                depth -= 1
-                            else:
-                                self.pos += 1
-                        is_arrow = self._check(TokenType.ARROW)
-                        self.pos = saved_pos
-                        if is_arrow:
+                if self._current().flags & SymbolFlags.CONSTRUCTOR:
+                    if self._peek_type() == TokenType.LPAREN:
+                        end, _ = self._skip_group(
+                            self.pos + 1, TokenType.LPAREN, TokenType.RPAREN
+                        )
+                        if self._peek_type(end - self.pos) == TokenType.ARROW:
                             break
-                    elif self._peek().type == TokenType.ARROW:
+                    elif self._peek_type() == TokenType.ARROW:
                         break
                 arg = self._parse_atom()
                 expr = ast.App(func=expr, args=[arg])
@@ -1093,22 +1150,10 @@ class Parser:
                 arg = self._parse_atom()
                 expr = ast.App(func=expr, args=[arg])
             elif self._check(TokenType.LBRACKET):
-                saved_pos = self.pos
-                self.pos += 1
-                has_pipe = False
-                depth = 1
-                while depth > 0 and not self._check(TokenType.EOF):
-                    if self._match(TokenType.LBRACKET):
-                        depth += 1
-                    elif self._match(TokenType.RBRACKET):
-                        depth -= 1
-                    elif self._match(TokenType.PIPE) and depth == 1:
-                        has_pipe = True
-                    else:
-                        self.pos += 1
-                is_arrow = self._check(TokenType.ARROW)
-                self.pos = saved_pos
-                if has_pipe or is_arrow:
+                end, has_pipe = self._skip_group(
+                    self.pos, TokenType.LBRACKET, TokenType.RBRACKET
+                )
+                if has_pipe or self._peek_type(end - self.pos) == TokenType.ARROW:
                     break
                 arg = self._parse_atom()
                 expr = ast.App(func=expr, args=[arg])
@@ -1299,7 +1344,7 @@ class Parser:
                 params.append(self._parse_param())
             self._expect(TokenType.RPAREN, "Expected ')'")
         else:
-            while self._check(TokenType.IDENT) and self._peek().type in (
+            while self._check(TokenType.IDENT) and self._peek_type() in (
                 TokenType.IDENT,
                 TokenType.FAT_ARROW,
                 TokenType.COLON,
@@ -0,0 +1,271 @@
+"""Per-phase timings, peak memory and profiles of a compilation."""
+
+from __future__ import annotations
+
+import cProfile
+import dataclasses
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+# The ``Timings`` that ``declaration`` records into, if any.
+_active: Timings | None = None
+
+_NOT_TIMED = nullcontext()
+
+
+@dataclass
+class Timing:
+    """The wall time and peak memory of one phase, or of one declaration in it."""
+
+    phase: str
+    seconds: float
+    peak_bytes: int
+    declaration: str | None = None
+
+
+@dataclass
+class _Frame:
+    phase: str
+    declaration: str | None
+    start: float
+    base: int
+    peak: int
+    nested: float = 0.0
+
+
+class Timings:
+    """Records how long each compiler phase takes and how much it allocates.
+
+    ``phase`` times a phase over the whole module. A phase begun inside
+    another, like lexing on demand while parsing, is left out of the outer
+    phase's time. While the ``Timings`` is entered, ``declaration`` calls in
+    the compiler's per-definition loops add a ``Timing`` for each definition
+    to the phase they run in.
+
+    With ``memory``, ``tracemalloc`` traces allocations while the
+    ``Timings`` is entered, and a phase's peak is the most it had allocated
+    at once beyond what was allocated when it began. Tracing makes
+    everything several times slower, so times are best compared between
+    runs made the same way.
+    """
+
+    def __init__(self, memory: bool = True) -> None:
+        self.memory = memory
+        self.phases: list[Timing] = []
+        self.declarations: list[Timing] = []
+        self._frames: list[_Frame] = []
+        self._tracing = False
+        self._previous: Timings | None = None
+
+    def __enter__(self) -> Timings:
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        global _active
+        _active = self._previous
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the phase ``name`` of the module."""
+        frame = self._push(name, None)
+        try:
+            yield
+        finally:
+            timing = self._pop(frame)
+            self.phases.append(timing)
+            for outer in reversed(self._frames):
+                if outer.declaration is None:
+                    outer.nested += timing.seconds
+                    break
+
+    @contextmanager
+    def declaration(self, name: str) -> Iterator[None]:
+        """Time the definition ``name`` within the current phase."""
+        phase = self._frames[-1].phase if self._frames else "-"
+        frame = self._push(phase, name)
+        try:
+            yield
+        finally:
+            self.declarations.append(self._pop(frame))
+
+    def _push(self, phase: str, declaration: str | None) -> _Frame:
+        current = peak = 0
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # The enclosing frame keeps the peak it has seen so far, since
+            # the new frame resets it.
+            if self._frames:
+                self._frames[-1].peak = max(self._frames[-1].peak, peak)
+            tracemalloc.reset_peak()
+        frame = _Frame(phase, declaration, time.perf_counter(), current, current)
+        self._frames.append(frame)
+        return frame
+
+    def _pop(self, frame: _Frame) -> Timing:
+        elapsed = time.perf_counter() - frame.start
+        self._frames.pop()
+        peak = frame.peak
+        if tracemalloc.is_tracing():
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if self._frames:
+                self._frames[-1].peak = max(self._frames[-1].peak, peak)
+        return Timing(
+            frame.phase,
+            elapsed - frame.nested,
+            max(peak - frame.base, 0),
+            frame.declaration,
+        )
+
+    @property
+    def total(self) -> float:
+        """The time of all phases together."""
+        return sum(timing.seconds for timing in self.phases)
+
+    def report(self, limit: int = 10) -> str:
+        """The phases and the ``limit`` slowest declarations, as a table."""
+        lines = [f"{'phase':<16}{'time':>12}{'peak':>12}"]
+        for timing in self.phases:
+            lines.append(_row(timing.phase, timing))
+        lines.append(f"{'total':<16}{_milliseconds(self.total):>12}")
+        slowest = sorted(self.declarations, key=lambda t: t.seconds, reverse=True)
+        if slowest:
+            lines.append("")
+            lines.append(f"{'declaration':<24}{'phase':<16}{'time':>12}{'peak':>12}")
+            for timing in slowest[:limit]:
+                name = _truncate(timing.declaration or "", 23)
+                lines.append(f"{name:<24}" + _row(timing.phase, timing))
+        return "\n".join(lines)
+
+    def to_json(self) -> dict[str, Any]:
+        """The timings as JSON-compatible data; times in seconds."""
+
+        def entry(timing: Timing) -> dict[str, Any]:
+            data = dataclasses.asdict(timing)
+            if timing.declaration is None:
+                del data["declaration"]
+            return data
+
+        return {
+            "total_seconds": self.total,
+            "memory": self.memory,
+            "phases": [entry(timing) for timing in self.phases],
+            "declarations": [entry(timing) for timing in self.declarations],
+        }
+
+
+def declaration(*names: str) -> AbstractContextManager[None]:
+    """Time the definitions ``names``, checked as one group, if timings are on.
+
+    Costs a global lookup when they are not, so it can sit in hot loops.
+    """
+    if _active is None:
+        return _NOT_TIMED
+    return _active.declaration(", ".join(names))
+
+
+def _row(phase: str, timing: Timing) -> str:
+    peak = _size(timing.peak_bytes) if timing.peak_bytes else "-"
+    return f"{phase:<16}{_milliseconds(timing.seconds):>12}{peak:>12}"
+
+
+def _milliseconds(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+
+def _size(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    size = n / 1024
+    for unit in ("KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _truncate(text: str, width: int) -> str:
+    return text if len(text) <= width else text[: width - 1] + "…"
+
+
+_Function = tuple[str, int, str]
+
+
+def collapsed_stacks(stats: pstats.Stats) -> dict[tuple[str, ...], int]:
+    """Microseconds of own time per call stack, for flame graph tools.
+
+    cProfile keeps each function's callers but not whole stacks, so the
+    stacks are rebuilt from the roots down, splitting a function's time
+    between its callers in proportion to the time each spent in it.
+    Recursive calls are folded into the outermost one.
+    """
+    entries: dict[_Function, Any] = stats.stats
+    callees: dict[_Function, list[tuple[_Function, float]]] = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((function, edge[3]))
+
+    totals: dict[tuple[str, ...], float] = {}
+    pending = [
+        (function, (_label(function),), frozenset([function]), 1.0)
+        for function, (_, _, _, _, callers) in entries.items()
+        if not callers
+    ]
+    while pending:
+        function, stack, seen, share = pending.pop()
+        own = entries[function][2] * share
+        if own:
+            totals[stack] = totals.get(stack, 0.0) + own
+        for callee, edge_time in callees.get(function, ()):
+            callee_time = entries[callee][3]
+            if callee in seen or not callee_time:
+                continue
+            callee_share = edge_time * share / callee_time
+            if callee_time * callee_share < 1e-6:
+                continue
+            pending.append(
+                (callee, stack + (_label(callee),), seen | {callee}, callee_share)
+            )
+    return {
+        stack: round(seconds * 1e6)
+        for stack, seconds in totals.items()
+        if round(seconds * 1e6)
+    }
+
+
+def _label(function: _Function) -> str:
+    filename, line, name = function
+    if filename == "~":
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(";", ",")
+
+
+def write_profile(profile: cProfile.Profile, path: Path) -> Path:
+    """Write ``profile`` as pstats to ``path`` and as collapsed stacks.
+
+    The stacks go to ``path`` with ``.collapsed`` appended, one
+    ``frame;frame;... microseconds`` line each, which ``flamegraph.pl``
+    and speedscope read. Returns the path of the stacks.
+    """
+    profile.dump_stats(path)
+    stacks = collapsed_stacks(pstats.Stats(profile))
+    collapsed = path.with_name(path.name + ".collapsed")
+    collapsed.write_text(
+        "".join(f"{';'.join(stack)} {n}\n" for stack, n in sorted(stacks.items()))
+    )
+    return collapsed
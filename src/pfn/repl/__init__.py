@@ -3,24 +3,22 @@
 from __future__ import annotations
 
 import sys
+from pathlib import Path
 from typing import Any
 
-from pfn.codegen import CodeGenerator
-from pfn.lexer import Lexer
-from pfn.parser import Parser
-from pfn.parser.ast import DefDecl
-from pfn.typechecker import TypeChecker, TypeError as PfnTypeError
-from pfn.types import Scheme, TFun, Subst, TypeEnv, TVar
+from pfn.lexer import read_source
+from pfn.parser import ASTCache
+from pfn.session import CompilationSession
+from pfn.types import TypeEnv
 
 
 class REPL:
     """Interactive REPL for Pfn."""
 
     def __init__(self):
-        self.checker = TypeChecker()
         self.global_env = TypeEnv()
         self.namespace: dict[str, Any] = {}
-        self.codegen = CodeGenerator()
+        self.cache = ASTCache()
         self.history: list[str] = []
         self.prompt = "pfn> "
         self.multi_line_buffer: list[str] = []
@@ -132,32 +130,32 @@ Examples:
             print(result)
 
     def _eval(self, code: str) -> Any:
-        tokens = Lexer(code).tokenize()
-
+        session = CompilationSession(code, env=self.global_env)
         try:
-            module = Parser(tokens).parse()
+            session.module
         except Exception as e:
             print(f"Parse error: {e}")
             return None
 
-        for decl in module.declarations:
-            if isinstance(decl, DefDecl):
-                try:
-                    self._typecheck_decl(decl)
-                except PfnTypeError as e:
-                    print(f"Type error: {e}")
-                    return None
+        return self._eval_session(session)
 
-        generated = self.codegen.generate_module(module)
+    def _eval_session(self, session: CompilationSession) -> Any:
+        error = session.check()
+        if error is not None:
+            print(f"Type error: {error}")
+            return None
+        for decl, scheme in zip(session.definitions, session.schemes):
+            print(f"{decl.name} : {scheme.type}")
+        self.global_env = session.type_env
 
         try:
-            exec(generated, self.namespace)
+            session.execute(self.namespace)
         except Exception as e:
             print(f"Runtime error: {e}")
             return None
 
-        for decl in module.declarations:
-            if isinstance(decl, DefDecl) and decl.name in self.namespace:
+        for decl in session.definitions:
+            if decl.name in self.namespace:
                 result = self.namespace[decl.name]
                 if callable(result):
                     return None
@@ -165,62 +163,29 @@ Examples:
 
         return None
 
-    def _typecheck_decl(self, decl: DefDecl) -> None:
-        self.checker.env = self.global_env
-
-        for param in decl.params:
-            tv = self.checker.fresh_var()
-            self.checker.env = self.checker.env.extend(param.name, Scheme((), tv))
-
-        t = self.checker.infer(decl.body)
-
-        for param in reversed(decl.params):
-            scheme = self.checker.env.lookup(param.name)
-            if scheme:
-                t = TFun(scheme.type, t)
-
-        subst = Subst()
-        free_in_env = subst.free_vars_env(self.global_env)
-        free_in_t = subst.free_vars(t)
-        gen_vars = tuple(sorted(free_in_t - free_in_env))
-        scheme = Scheme(gen_vars, t)
-
-        self.global_env = self.global_env.extend(decl.name, scheme)
-        print(f"{decl.name} : {t}")
-
     def _type_of(self, expr: str) -> None:
-        code = f"_ = {expr}"
-        tokens = Lexer(code).tokenize()
-
+        session = CompilationSession(f"def _it = {expr}", env=self.global_env)
         try:
-            module = Parser(tokens).parse()
+            session.module
         except Exception as e:
             print(f"Parse error: {e}")
             return
 
-        if not module.declarations:
+        error = session.check()
+        if error is not None:
+            print(f"Type error: {error}")
             return
-
-        decl = module.declarations[0]
-        if isinstance(decl, DefDecl):
-            self.checker.env = self.global_env
-
-            for param in decl.params:
-                tv = self.checker.fresh_var()
-                self.checker.env = self.checker.env.extend(param.name, Scheme((), tv))
-
-            try:
-                t = self.checker.infer(decl.body)
-                print(f"{expr} : {t}")
-            except PfnTypeError as e:
-                print(f"Type error: {e}")
+        for scheme in session.schemes:
+            print(f"{expr} : {scheme.type}")
 
     def _load_file(self, filename: str) -> None:
         try:
-            with open(filename, "r") as f:
-                code = f.read()
+            path = Path(filename)
+            session = CompilationSession(
+                read_source(path), path, ast_cache=self.cache, env=self.global_env
+            )
             print(f"Loading {filename}...")
-            self._eval(code)
+            self._eval_session(session)
             print("Loaded successfully")
         except FileNotFoundError:
             print(f"File not found: {filename}")
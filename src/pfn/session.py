@@ -0,0 +1,189 @@
+"""One compilation of a Pfn source, shared by the CLI and the REPL."""
+
+from __future__ import annotations
+
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+from typing import Any
+
+from pfn.codegen import CodeGenerator
+from pfn.effects.infer import EffectEnv
+from pfn.effects.summary import ModuleEffects
+from pfn.lexer import Lexer, SourceText, TokenBuffer, read_source
+from pfn.parser import ASTCache, Parser, parse_parallel
+from pfn.parser.ast import DefDecl, Module
+from pfn.profiling import Timings
+from pfn.typechecker import SchemeCache, TypeError as PfnTypeError, check_definitions
+from pfn.typechecker.exhaustiveness import MatchWarning, check_matches
+from pfn.types import Scheme, TypeEnv
+
+
+class CompilationSession:
+    """A source and everything derived from it, each computed at most once.
+
+    ``tokens``, ``module``, ``definitions``, ``schemes``, ``type_env``,
+    ``match_warnings``, ``effects`` and ``python`` are computed on first
+    use from the stages before them and then kept, so checking, compiling
+    and running one file lexes, parses and type checks it once. A type
+    error is kept too and raised again by ``schemes``.
+
+    ``path`` enables the AST and scheme caches, and names the source in
+    ``from_path``. ``env`` holds the bindings the source is checked in,
+    e.g. the REPL's earlier definitions. With ``jobs`` above one, parsing
+    and checking run in that many processes. With ``timings``, each stage
+    is recorded as a phase of it; lexing is only a phase of its own when
+    the tokens are needed before parsing, and otherwise part of ``parse``.
+    """
+
+    def __init__(
+        self,
+        source: SourceText,
+        path: Path | None = None,
+        *,
+        ast_cache: ASTCache | None = None,
+        scheme_cache: SchemeCache | None = None,
+        jobs: int = 1,
+        env: TypeEnv | None = None,
+        effect_env: EffectEnv | None = None,
+        timings: Timings | None = None,
+    ) -> None:
+        self.source = source
+        self.path = path
+        self.ast_cache = ast_cache if path is not None else None
+        self.scheme_cache = scheme_cache if path is not None else None
+        self.jobs = jobs
+        self.env = env or TypeEnv()
+        self.effect_env = effect_env
+        self.timings = timings
+        self._tokens: TokenBuffer | None = None
+        self._module: Module | None = None
+        self._definitions: list[DefDecl] | None = None
+        self._schemes: list[Scheme] | None = None
+        self._type_error: PfnTypeError | None = None
+        self._type_env: TypeEnv | None = None
+        self._match_warnings: list[MatchWarning] | None = None
+        self._effects: ModuleEffects | None = None
+        self._python: str | None = None
+
+    @classmethod
+    def from_path(cls, path: Path, **options: Any) -> CompilationSession:
+        """A session over the file at ``path``."""
+        return cls(read_source(path), path, **options)
+
+    def phase(self, name: str) -> AbstractContextManager[None]:
+        """Record the phase ``name`` in ``timings``, if there are any."""
+        if self.timings is None:
+            return nullcontext()
+        return self.timings.phase(name)
+
+    @property
+    def tokens(self) -> TokenBuffer:
+        """The source's tokens. Parsing does not need them unless ``jobs > 1``."""
+        if self._tokens is None:
+            with self.phase("lex"):
+                self._tokens = Lexer(self.source, regex=True).tokenize_buffer()
+        return self._tokens
+
+    @property
+    def module(self) -> Module:
+        """The parsed module, from the AST cache when it has it."""
+        if self._module is None:
+            with self.phase("parse"):
+                if self.ast_cache is not None and self.path is not None:
+                    cache = self.ast_cache
+                    self._module = cache.parse(self.path, self.source, self._parse)
+                else:
+                    self._module = self._parse(self.source)
+        return self._module
+
+    def _parse(self, source: SourceText) -> Module:
+        if self.jobs > 1:
+            return parse_parallel(self.tokens, self.jobs)
+        # Tokens are streamed into the parser as it needs them, timed or not,
+        # so the first error in the source is the one reported either way.
+        if self._tokens is not None:
+            return Parser(self._tokens).parse()
+        return Parser(Lexer(source).stream()).parse()
+
+    @property
+    def definitions(self) -> list[DefDecl]:
+        """The module's top-level ``def``s, in source order."""
+        if self._definitions is None:
+            self._definitions = [
+                decl for decl in self.module.declarations if isinstance(decl, DefDecl)
+            ]
+        return self._definitions
+
+    @property
+    def schemes(self) -> list[Scheme]:
+        """The inferred scheme of each definition; raises ``TypeError``."""
+        if self._type_error is not None:
+            raise self._type_error
+        if self._schemes is None:
+            definitions = self.definitions
+            cache, path = self.scheme_cache, self.path
+            with self.phase("typecheck"):
+                if cache is not None and path is not None:
+                    cache.load(path)
+                try:
+                    self._schemes = check_definitions(
+                        definitions, self.env, workers=self.jobs, cache=cache
+                    )
+                except PfnTypeError as e:
+                    self._type_error = e
+                    raise
+                finally:
+                    if cache is not None and path is not None:
+                        cache.store(path)
+        return self._schemes
+
+    def check(self) -> PfnTypeError | None:
+        """Type check the module; return the error, if there is one."""
+        try:
+            self.schemes
+        except PfnTypeError as e:
+            return e
+        return None
+
+    @property
+    def type_env(self) -> TypeEnv:
+        """``env`` extended with the scheme of every definition."""
+        if self._type_env is None:
+            names = [decl.name for decl in self.definitions]
+            self._type_env = self.env.extend_many(dict(zip(names, self.schemes)))
+        return self._type_env
+
+    @property
+    def match_warnings(self) -> list[MatchWarning]:
+        """Non-exhaustive matches and unreachable arms in the definitions."""
+        if self._match_warnings is None:
+            module = self.module
+            with self.phase("exhaustiveness"):
+                self._match_warnings = check_matches(module.declarations)
+        return self._match_warnings
+
+    @property
+    def effects(self) -> ModuleEffects:
+        """The effect summary of every definition."""
+        if self._effects is None:
+            definitions = self.definitions
+            with self.phase("effects"):
+                self._effects = ModuleEffects(self.effect_env)
+                self._effects.update(definitions)
+        return self._effects
+
+    @property
+    def python(self) -> str:
+        """The generated Python module."""
+        if self._python is None:
+            module = self.module
+            with self.phase("codegen"):
+                self._python = CodeGenerator().generate_module(module)
+        return self._python
+
+    def execute(self, namespace: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Run the generated code in ``namespace``, or a new one, and return it."""
+        if namespace is None:
+            namespace = {}
+        exec(self.python, namespace)
+        return namespace
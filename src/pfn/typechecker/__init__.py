@@ -1,3 +1,18 @@
 from pfn.typechecker.infer import TypeError, TypeChecker
+from pfn.typechecker.cache import SchemeCache
+from pfn.typechecker.driver import (
+    check_definitions,
+    definition_graph,
+    free_names,
+    strongly_connected_components,
+)
 
-__all__ = ["TypeChecker", "TypeError"]
+__all__ = [
+    "SchemeCache",
+    "TypeChecker",
+    "TypeError",
+    "check_definitions",
+    "definition_graph",
+    "free_names",
+    "strongly_connected_components",
+]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import pickle
+import zlib
+from pathlib import Path
+from typing import Mapping
+
+from pfn import __version__
+from pfn.parser import ast
+from pfn.parser.cache import cache_dir, cache_key, sources_digest
+from pfn.types import Scheme
+
+_MAGIC = b"PFNTYP01"
+
+
+@functools.cache
+def _salt() -> bytes:
+    """Mixed into every definition's digest, so schemes inferred by a checker
+    with other rules or builtins (all defined in these packages) never match.
+
+    Computed on first use, so importing the checker does not read its sources.
+    """
+    checker = sources_digest("typechecker", "types", "effects")
+    return hashlib.sha256(_MAGIC + __version__.encode() + checker).digest()
+
+
+def scheme_cache_path(path: Path) -> Path:
+    """Where the inferred schemes of ``path`` are cached, beside its AST."""
+    return cache_dir() / f"{cache_key(path)}.types"
+
+
+def declaration_digest(decl: ast.DefDecl) -> bytes:
+    """Digest of a definition's AST.
+
+    The AST carries no source positions, so moving a definition or editing
+    another one leaves its digest alone. Changing the type checker does not.
+    """
+    return hashlib.sha256(_salt() + repr(decl).encode()).digest()
+
+
+def fingerprint(digests: list[bytes], uses: Mapping[str, Scheme | None]) -> bytes:
+    """Digest of a group of definitions and the schemes of the names they use.
+
+    ``digests`` are the definitions' ``declaration_digest``s; a name the
+    environment does not bind is recorded as such.
+    """
+    digest = hashlib.sha256(b"".join(digests))
+    for name in sorted(uses):
+        digest.update(f"\0{name}:{uses[name]!r}".encode())
+    return digest.digest()
+
+
+class SchemeCache:
+    """Inferred schemes of definition groups, pickled per source file.
+
+    Entries are keyed by ``fingerprint``: a group whose definitions and
+    whose dependencies' schemes are unchanged since it was last checked is
+    not inferred again. The names each definition uses are kept too, keyed
+    by ``declaration_digest``, so an unchanged definition is not walked
+    again either. ``rechecked`` lists the definitions that were inferred,
+    in checking order, and ``reused`` counts the ones that were not. After
+    a complete check only the entries looked up or added since ``load`` are
+    written back, so those of deleted or edited definitions do not pile
+    up; after a failed one, nothing is dropped. Storage follows
+    ``ASTCache``: a bad entry is a miss and failures to write are ignored.
+    """
+
+    def __init__(self) -> None:
+        self.schemes: dict[bytes, list[Scheme]] = {}
+        self.names: dict[bytes, frozenset[str]] = {}
+        self._used_schemes: dict[bytes, list[Scheme]] = {}
+        self._used_names: dict[bytes, frozenset[str]] = {}
+        self.rechecked: list[str] = []
+        self.reused = 0
+        # Cleared when a check stops at a type error.
+        self.complete = True
+
+    def lookup(self, key: bytes) -> list[Scheme] | None:
+        schemes = self.schemes.get(key)
+        if schemes is not None:
+            self._used_schemes[key] = schemes
+            self.reused += len(schemes)
+        return schemes
+
+    def add(self, key: bytes, decls: list[ast.DefDecl], schemes: list[Scheme]) -> None:
+        self.schemes[key] = self._used_schemes[key] = schemes
+        self.rechecked.extend(decl.name for decl in decls)
+
+    def uses(self, digest: bytes) -> frozenset[str] | None:
+        """The names the definition with ``digest`` uses, if known."""
+        names = self.names.get(digest)
+        if names is not None:
+            self._used_names[digest] = names
+        return names
+
+    def add_uses(self, digest: bytes, names: frozenset[str]) -> None:
+        self.names[digest] = self._used_names[digest] = names
+
+    def load(self, path: Path) -> None:
+        """Replace the entries with those stored for ``path``, if readable."""
+        self.schemes, self.names = {}, {}
+        self._used_schemes, self._used_names = {}, {}
+        self.complete = True
+        try:
+            with scheme_cache_path(path).open("rb") as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    return
+                entries = pickle.loads(zlib.decompress(f.read()))
+        except Exception:
+            # Unpickling a stale or foreign entry can fail in many ways.
+            return
+        if isinstance(entries, tuple) and len(entries) == 2:
+            self.schemes, self.names = entries
+
+    def store(self, path: Path) -> None:
+        target = scheme_cache_path(path)
+        temp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            target.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with temp.open("wb") as f:
+                f.write(_MAGIC)
+                if self.complete:
+                    entries = (self._used_schemes, self._used_names)
+                else:
+                    entries = (self.schemes, self.names)
+                data = pickle.dumps(entries, pickle.HIGHEST_PROTOCOL)
+                f.write(zlib.compress(data, 1))
+            os.replace(temp, target)
+        except OSError:
+            temp.unlink(missing_ok=True)
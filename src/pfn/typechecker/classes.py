@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Callable, Any
+from types import MappingProxyType
+from typing import Any, Callable, Hashable, Iterator, Mapping
 from pfn.types import (
     Type,
     TVar,
     TFun,
     TCon,
+    TList,
+    TTuple,
     TConstraint,
     TQualified,
     Scheme,
@@ -49,12 +52,120 @@ class InstanceInfo:
         return f"impl {self.class_name} {self.type_}"
 
 
+def _head(t: Type) -> tuple[Hashable, tuple[Type, ...]] | None:
+    """The index symbol of ``t`` and its children, or None for a variable.
+
+    Types with no structure the index knows are atoms named by their
+    string, so ``TInt()`` and ``TCon("Int")`` are the same symbol, as they
+    were when instances were keyed by strings.
+    """
+    if isinstance(t, TVar):
+        return None
+    if isinstance(t, TCon):
+        return ("con", t.name, len(t.args)), t.args
+    if isinstance(t, TFun):
+        return ("->",), (t.param, t.result)
+    if isinstance(t, TList):
+        return ("[]",), (t.elem,)
+    if isinstance(t, TTuple):
+        return ("()", len(t.elements)), t.elements
+    return ("con", str(t), 0), ()
+
+
+def _match(pattern: Type, t: Type, bindings: dict[str, Type]) -> bool:
+    """Extend ``bindings`` so ``pattern`` with them applied is ``t``."""
+    if isinstance(pattern, TVar):
+        return bindings.setdefault(pattern.name, t) == t
+    pattern_head, t_head = _head(pattern), _head(t)
+    if pattern_head is None or t_head is None or pattern_head[0] != t_head[0]:
+        return False
+    return all(_match(p, a, bindings) for p, a in zip(pattern_head[1], t_head[1]))
+
+
+class _InstanceTrie:
+    """Discrimination trie over the instance heads of one class.
+
+    A path spells an instance type in preorder, one symbol per node, with
+    ``star`` standing for a type variable of the instance: it matches a
+    whole subterm of the type looked up.
+    """
+
+    __slots__ = ("edges", "star", "instances")
+
+    def __init__(self) -> None:
+        self.edges: dict[Hashable, _InstanceTrie] = {}
+        self.star: _InstanceTrie | None = None
+        self.instances: list[InstanceInfo] = []
+
+    def insert(self, inst: InstanceInfo) -> None:
+        node = self
+        pending = [inst.type_]
+        while pending:
+            head = _head(pending.pop())
+            if head is None:
+                if node.star is None:
+                    node.star = _InstanceTrie()
+                node = node.star
+            else:
+                symbol, args = head
+                node = node.edges.setdefault(symbol, _InstanceTrie())
+                pending.extend(reversed(args))
+        node.instances = [i for i in node.instances if i.type_ != inst.type_]
+        node.instances.append(inst)
+
+    def candidates(self, t: Type) -> Iterator[InstanceInfo]:
+        """Instances whose head may match ``t``, more specific ones first."""
+        work: list[tuple[_InstanceTrie, tuple[Type, ...]]] = [(self, (t,))]
+        while work:
+            node, pending = work.pop()
+            if not pending:
+                yield from node.instances
+                continue
+            rest, term = pending[:-1], pending[-1]
+            if node.star is not None:
+                work.append((node.star, rest))
+            head = _head(term)
+            if head is not None:
+                child = node.edges.get(head[0])
+                if child is not None:
+                    work.append((child, rest + tuple(reversed(head[1]))))
+
+
 @dataclass
 class ClassContext:
-    """Type class context holding class definitions and instances."""
+    """Type class context holding class definitions and instances.
+
+    Instances are indexed per class by a discrimination trie on their
+    heads, so an instance such as ``Eq a => Eq (List a)`` is found for
+    ``List Int`` and its constraints solved in turn. Resolutions and
+    dictionaries for ground types, and superclass closures, are memoized
+    and dropped whenever a class or instance is added.
+    """
 
     classes: dict[str, ClassInfo] = field(default_factory=dict)
-    instances: dict[tuple[str, str], InstanceInfo] = field(default_factory=dict)
+    instances: dict[tuple[str, Type], InstanceInfo] = field(default_factory=dict)
+    _index: dict[str, _InstanceTrie] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _resolved: dict[tuple[str, Type], InstanceInfo | None] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _dictionaries: dict[tuple[str, Type], Mapping[str, Any] | None] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _superclasses: dict[str, frozenset[str]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    # Constraints being solved, so a cycle of instances fails, not loops.
+    _solving: set[tuple[str, Type]] = field(
+        default_factory=set, init=False, repr=False, compare=False
+    )
+    # Set when a cycle was cut since the innermost ``lookup_instance`` began.
+    _cut: bool = field(default=False, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        for inst in self.instances.values():
+            self._index.setdefault(inst.class_name, _InstanceTrie()).insert(inst)
 
     def add_class(
         self,
@@ -74,6 +185,8 @@ class ClassContext:
             else superclasses,
             defaults=defaults or {},
         )
+        self._superclasses.clear()
+        self._dictionaries.clear()
 
     def add_instance(
         self,
@@ -83,33 +196,83 @@ class ClassContext:
         constraints: tuple[TConstraint, ...] = (),
     ) -> None:
         """Add a type class instance."""
-        type_key = self._type_key(type_)
-        self.instances[(class_name, type_key)] = InstanceInfo(
+        inst = InstanceInfo(
             class_name=class_name,
             type_=type_,
             methods=methods,
             constraints=constraints,
         )
-
-    def _type_key(self, t: Type) -> str:
-        """Generate a string key for a type for instance lookup."""
-        if isinstance(t, TVar):
-            return f"var:{t.name}"
-        if isinstance(t, TCon):
-            if t.args:
-                args_str = ",".join(self._type_key(a) for a in t.args)
-                return f"{t.name}[{args_str}]"
-            return t.name
-        return str(t)
+        self.instances[(class_name, type_)] = inst
+        self._index.setdefault(class_name, _InstanceTrie()).insert(inst)
+        self._resolved.clear()
+        self._dictionaries.clear()
 
     def lookup_class(self, name: str) -> ClassInfo | None:
         """Look up a type class by name."""
         return self.classes.get(name)
 
     def lookup_instance(self, class_name: str, type_: Type) -> InstanceInfo | None:
-        """Look up an instance by class name and type."""
-        type_key = self._type_key(type_)
-        return self.instances.get((class_name, type_key))
+        """The most specific instance whose head matches ``type_`` and whose
+        constraints hold there."""
+        key = (class_name, type_)
+        if type_.ground and key in self._resolved:
+            return self._resolved[key]
+        outer_cut, self._cut = self._cut, False
+        try:
+            inst = self._solve(class_name, type_)
+            # A result that failed a constraint only because it was already
+            # being solved further out depends on where the lookup started.
+            if type_.ground and not (self._cut and self._solving):
+                self._resolved[key] = inst
+        finally:
+            self._cut = outer_cut or self._cut
+        return inst
+
+    def _solve(self, class_name: str, type_: Type) -> InstanceInfo | None:
+        trie = self._index.get(class_name)
+        key = (class_name, type_)
+        if trie is None:
+            return None
+        if key in self._solving:
+            self._cut = True
+            return None
+        self._solving.add(key)
+        try:
+            for inst in trie.candidates(type_):
+                bindings: dict[str, Type] = {}
+                if not _match(inst.type_, type_, bindings):
+                    continue
+                subst = Subst(bindings)
+                if all(
+                    self.lookup_instance(c.class_name, subst.apply(c.type_))
+                    for c in inst.constraints
+                ):
+                    return inst
+            return None
+        finally:
+            self._solving.discard(key)
+
+    def build_dictionary(
+        self, class_name: str, type_: Type
+    ) -> Mapping[str, Any] | None:
+        """The instance's methods over the class defaults, read-only.
+
+        For a ground type the same mapping is returned every time.
+        """
+        key = (class_name, type_)
+        if type_.ground and key in self._dictionaries:
+            return self._dictionaries[key]
+        cls = self.lookup_class(class_name)
+        inst = self.lookup_instance(class_name, type_)
+        methods: Mapping[str, Any] | None = None
+        if inst is not None:
+            defaults = cls.defaults if cls else {}
+            methods = MappingProxyType({**defaults, **inst.methods})
+        elif cls is not None:
+            methods = MappingProxyType(dict(cls.defaults))
+        if type_.ground:
+            self._dictionaries[key] = methods
+        return methods
 
     def get_method(self, class_name: str, type_: Type, method_name: str) -> Any | None:
         """Get a method implementation from an instance."""
@@ -139,16 +302,26 @@ class ClassContext:
                 return False
         return True
 
+    def superclass_closure(self, class_name: str) -> frozenset[str]:
+        """All superclasses of a class, transitively, computed once."""
+        closure = self._superclasses.get(class_name)
+        if closure is None:
+            seen: set[str] = set()
+            stack = [class_name]
+            while stack:
+                cls = self.lookup_class(stack.pop())
+                if cls is None:
+                    continue
+                for super_name in cls.superclasses:
+                    if super_name not in seen:
+                        seen.add(super_name)
+                        stack.append(super_name)
+            closure = self._superclasses[class_name] = frozenset(seen)
+        return closure
+
     def get_all_superclasses(self, class_name: str) -> set[str]:
         """Get all superclasses transitively."""
-        result: set[str] = set()
-        cls = self.lookup_class(class_name)
-        if not cls:
-            return result
-        for super_name in cls.superclasses:
-            result.add(super_name)
-            result |= self.get_all_superclasses(super_name)
-        return result
+        return set(self.superclass_closure(class_name))
 
 
 def create_default_context() -> ClassContext:
@@ -478,21 +651,12 @@ def solve_constraints(
 
 def build_dictionary(
     ctx: ClassContext, class_name: str, type_: Type
-) -> dict[str, Any] | None:
+) -> Mapping[str, Any] | None:
     """Build a dictionary of method implementations for a type class instance.
 
     This is used for dictionary-passing transformation.
     """
-    inst = ctx.lookup_instance(class_name, type_)
-    if inst:
-        return inst.methods.copy()
-
-    # Check for default methods
-    cls = ctx.lookup_class(class_name)
-    if cls:
-        return cls.defaults.copy()
-
-    return None
+    return ctx.build_dictionary(class_name, type_)
 
 
 def get_qualified_type(
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import fields, is_dataclass
+from typing import Any, Iterator
+
+from pfn.parser import ast
+from pfn.profiling import declaration
+from pfn.types import Scheme, TypeEnv
+from pfn.typechecker.cache import SchemeCache, declaration_digest, fingerprint
+from pfn.typechecker.infer import TypeChecker, TypeError
+
+
+def _pattern_names(pattern: Any) -> Iterator[str]:
+    """The variables a pattern binds."""
+    if isinstance(pattern, ast.VarPattern):
+        yield pattern.name
+    elif isinstance(pattern, list):
+        for item in pattern:
+            yield from _pattern_names(item)
+    elif isinstance(pattern, tuple):
+        yield from _pattern_names(pattern[-1])
+    elif isinstance(pattern, ast.Pattern):
+        for f in fields(pattern):
+            yield from _pattern_names(getattr(pattern, f.name))
+
+
+# Nodes that cannot contain an ``ast.Var``.
+_NO_NAMES = (ast.Pattern, ast.TypeRef, ast.Span)
+
+
+def free_names(node: Any, bound: frozenset[str] = frozenset()) -> set[str]:
+    """Names ``node`` uses that are not bound inside it or in ``bound``.
+
+    Binders are scoped the way ``TypeChecker`` scopes them; nodes it does
+    not bind anything in are searched field by field.
+    """
+    names: set[str] = set()
+    stack: list[tuple[Any, frozenset[str]]] = [(node, bound)]
+    while stack:
+        node, bound = stack.pop()
+        if isinstance(node, ast.Var):
+            if node.name not in bound:
+                names.add(node.name)
+        elif isinstance(node, ast.Lambda):
+            stack.append((node.body, bound | {p.name for p in node.params}))
+        elif isinstance(node, ast.Let):
+            stack.append((node.value, bound))
+            stack.append((node.body, bound | {node.name}))
+        elif isinstance(node, ast.LetPattern):
+            stack.append((node.value, bound))
+            stack.append((node.body, bound | set(_pattern_names(node.pattern))))
+        elif isinstance(node, ast.LetFunc):
+            stack.append((node.value, bound | {p.name for p in node.params}))
+            stack.append((node.body, bound | {node.name}))
+        elif isinstance(node, ast.DoNotation):
+            for binding in node.bindings:
+                stack.append((binding.value, bound))
+                bound = bound | {binding.name}
+            stack.append((node.body, bound))
+        elif isinstance(node, ast.MatchCase):
+            inner = bound | set(_pattern_names(node.pattern))
+            stack.append((node.body, inner))
+            if node.guard is not None:
+                stack.append((node.guard, inner))
+        elif isinstance(node, ast.HandlerCase):
+            params = {p.name for p in node.params}
+            if node.resume_param:
+                params.add(node.resume_param)
+            stack.append((node.body, bound | params))
+        elif isinstance(node, (list, tuple)):
+            stack.extend((item, bound) for item in node)
+        elif is_dataclass(node) and not isinstance(node, _NO_NAMES):
+            stack.extend((getattr(node, name), bound) for name in _field_names(node))
+    return names
+
+
+_FIELD_NAMES: dict[type, tuple[str, ...]] = {}
+
+
+def _field_names(node: Any) -> tuple[str, ...]:
+    cls = type(node)
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _FIELD_NAMES[cls] = tuple(f.name for f in fields(node))
+    return names
+
+
+def _uses(decl: ast.DefDecl) -> frozenset[str]:
+    return frozenset(free_names(decl.body, frozenset(p.name for p in decl.params)))
+
+
+def definition_graph(
+    decls: list[ast.DefDecl], uses: list[frozenset[str]] | None = None
+) -> list[list[int]]:
+    """For each definition, the indices of the definitions it refers to.
+
+    ``uses`` is each definition's ``free_names``, if already known. A name
+    defined more than once refers to its last definition, which is the one
+    the generated module ends up binding.
+    """
+    if uses is None:
+        uses = [_uses(decl) for decl in decls]
+    index = {decl.name: i for i, decl in enumerate(decls)}
+    return [sorted(index[n] for n in names if n in index) for names in uses]
+
+
+def strongly_connected_components(graph: list[list[int]]) -> list[list[int]]:
+    """Tarjan's algorithm, iteratively.
+
+    Components come out in dependency order: every component a component
+    refers to is listed before it. Nodes within one are in index order.
+    """
+    order = [-1] * len(graph)
+    low = [0] * len(graph)
+    on_stack = [False] * len(graph)
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for root in range(len(graph)):
+        if order[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge = work.pop()
+            if edge == 0:
+                order[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            if edge < len(graph[node]):
+                work.append((node, edge + 1))
+                succ = graph[node][edge]
+                if order[succ] == -1:
+                    work.append((succ, 0))
+                elif on_stack[succ]:
+                    low[node] = min(low[node], order[succ])
+                continue
+            if low[node] == order[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(sorted(component))
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+    return components
+
+
+def _check_group(
+    checker: TypeChecker, decls: list[ast.DefDecl], recursive: bool
+) -> list[Scheme]:
+    if recursive:
+        return checker.infer_group(decls)
+    return [checker.infer_definition(decls[0])]
+
+
+# A group of definitions, whether it is recursive, and the bindings it uses.
+_Task = tuple[list[ast.DefDecl], bool, TypeEnv]
+
+
+def _check_tasks(tasks: list[_Task]) -> list[list[Scheme]] | None:
+    """Worker: check each group in its environment; None if any fails.
+
+    As with ``parse_parallel``, errors are not sent back: the caller
+    rechecks serially so the one reported does not depend on scheduling.
+    """
+    try:
+        return [
+            _check_group(TypeChecker(env), decls, recursive)
+            for decls, recursive, env in tasks
+        ]
+    except TypeError:
+        return None
+
+
+def _batches(tasks: list[_Task], count: int) -> list[list[_Task]]:
+    """Split ``tasks`` into about ``count`` runs with similar numbers of defs."""
+    target = max(1, sum(len(task[0]) for task in tasks) // count)
+    batches: list[list[_Task]] = [[]]
+    size = 0
+    for task in tasks:
+        if size >= target:
+            batches.append([])
+            size = 0
+        batches[-1].append(task)
+        size += len(task[0])
+    return batches
+
+
+def _waves(components: list[list[int]], graph: list[list[int]]) -> list[list[int]]:
+    """Group component indices so each group only uses earlier groups."""
+    owner: dict[int, int] = {}
+    for c, component in enumerate(components):
+        for i in component:
+            owner[i] = c
+    depth = [0] * len(components)
+    waves: list[list[int]] = []
+    for c, component in enumerate(components):
+        deps = {owner[j] for i in component for j in graph[i]} - {c}
+        depth[c] = max((depth[d] + 1 for d in deps), default=0)
+        if depth[c] == len(waves):
+            waves.append([])
+        waves[depth[c]].append(c)
+    return waves
+
+
+def check_definitions(
+    decls: list[ast.DefDecl],
+    env: TypeEnv | None = None,
+    workers: int = 1,
+    executor: Executor | None = None,
+    cache: SchemeCache | None = None,
+) -> list[Scheme]:
+    """Infer the scheme of each of a module's top-level definitions.
+
+    Definitions may refer to each other in any order. Each strongly
+    connected component of the reference graph is checked as one group of
+    mutually recursive definitions once every component it refers to has
+    been. With more than one worker, components that do not depend on each
+    other go to a process pool together, each with just the bindings it
+    uses, and their schemes are merged before the next round. The
+    ``TypeError`` raised is always that of the first failing component in
+    dependency order, as if everything were checked serially.
+
+    With a ``cache``, a component whose ``fingerprint`` it has is not
+    inferred again, and the schemes of those that are get added to it.
+    """
+    env = env or TypeEnv()
+    digests: list[bytes] = []
+    uses: list[frozenset[str]] = []
+    if cache is None:
+        uses = [_uses(decl) for decl in decls]
+    else:
+        digests = [declaration_digest(decl) for decl in decls]
+        for decl, digest in zip(decls, digests):
+            names = cache.uses(digest)
+            if names is None:
+                names = _uses(decl)
+                cache.add_uses(digest, names)
+            uses.append(names)
+    graph = definition_graph(decls, uses)
+    components = strongly_connected_components(graph)
+    schemes: list[Scheme | None] = [None] * len(decls)
+    keys: dict[int, bytes] = {}
+
+    def recursive(component: list[int]) -> bool:
+        return len(component) > 1 or component[0] in graph[component[0]]
+
+    def bindings_for(component: list[int]) -> dict[str, Scheme | None]:
+        """What each name the component uses is bound to, if anything."""
+        full = env
+        for i in component:
+            for j in graph[i]:
+                scheme = schemes[j]
+                if scheme is not None:
+                    full = full.extend(decls[j].name, scheme)
+        return {name: full.lookup(name) for i in component for name in uses[i]}
+
+    def reuse(c: int) -> bool:
+        """Take the component's schemes from the cache, if it has them."""
+        component = components[c]
+        if cache is None or c in keys:
+            return False
+        group_digests = [digests[i] for i in component]
+        keys[c] = fingerprint(group_digests, bindings_for(component))
+        cached = cache.lookup(keys[c])
+        if cached is None:
+            return False
+        for i, scheme in zip(component, cached):
+            schemes[i] = scheme
+        return True
+
+    def record(c: int, results: list[Scheme]) -> None:
+        component = components[c]
+        for i, scheme in zip(component, results):
+            schemes[i] = scheme
+        if cache is not None:
+            cache.add(keys[c], [decls[i] for i in component], results)
+
+    def task_for(c: int) -> _Task:
+        component = components[c]
+        bindings = bindings_for(component)
+        used = {name: s for name, s in bindings.items() if s is not None}
+        group = [decls[i] for i in component]
+        return group, recursive(component), TypeEnv(used)
+
+    def check_serially(indices: list[int]) -> None:
+        for c in indices:
+            component = components[c]
+            if schemes[component[0]] is not None or reuse(c):
+                continue
+            # A checker per component, as in the workers, so the variable
+            # names in the schemes do not depend on the number of workers.
+            group, is_recursive, group_env = task_for(c)
+            checker = TypeChecker(group_env)
+            try:
+                with declaration(*(decl.name for decl in group)):
+                    results = _check_group(checker, group, is_recursive)
+            except TypeError:
+                if cache is not None:
+                    cache.complete = False
+                raise
+            record(c, results)
+
+    waves = _waves(components, graph)
+    if workers == 1 or len(waves) == len(components):
+        check_serially(list(range(len(components))))
+        return [scheme for scheme in schemes if scheme is not None]
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        for n, wave in enumerate(waves):
+            wave = [c for c in wave if not reuse(c)]
+            if len(wave) < 2:
+                check_serially(wave)
+                continue
+            tasks = [task_for(c) for c in wave]
+            results = list(pool.map(_check_tasks, _batches(tasks, workers * 4)))
+            if any(result is None for result in results):
+                check_serially(sorted(c for rest in waves[n:] for c in rest))
+                break
+            checked = [group for result in results if result for group in result]
+            for c, group_schemes in zip(wave, checked):
+                record(c, group_schemes)
+    finally:
+        if executor is None:
+            pool.shutdown()
+    return [scheme for scheme in schemes if scheme is not None]
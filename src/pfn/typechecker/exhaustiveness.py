@@ -1,19 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import TYPE_CHECKING, Any, Hashable, Iterable, Iterator
 
 if TYPE_CHECKING:
     from pfn.parser import ast
 from pfn.types import (
     Type,
-    TInt,
-    TFloat,
-    TString,
     TBool,
-    TChar,
-    TList,
-    TTuple,
     TCon,
 )
 
@@ -197,21 +191,63 @@ def pattern_covers(p1: Pattern, p2: Pattern) -> bool:
     return False
 
 
-def get_constructors_for_type(t: Type) -> list[str]:
+# Each constructor of a sum type with its arity, in declaration order.
+Signature = tuple[tuple[str, int], ...]
+
+BUILTIN_SIGNATURES: dict[str, Signature] = {
+    "Bool": (("True", 0), ("False", 0)),
+    "Option": (("Some", 1), ("None", 0)),
+    "Result": (("Ok", 1), ("Error", 1)),
+    "Ordering": (("LT", 0), ("EQ", 0), ("GT", 0)),
+}
+
+
+@dataclass
+class ConstructorSignatures:
+    """The constructors of each sum type, by type name and by constructor."""
+
+    types: dict[str, Signature] = field(default_factory=dict)
+    by_constructor: dict[str, Signature] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.by_constructor = {
+            name: signature
+            for signature in self.types.values()
+            for name, _ in signature
+        }
+
+
+def constructor_signatures(
+    decls: Iterable[ast.Decl] = (),
+) -> ConstructorSignatures:
+    """The built-in sum types plus those declared by ``decls``' ``TypeDecl``s."""
+    from pfn.parser import ast as pfn_ast
+
+    types = dict(BUILTIN_SIGNATURES)
+    for decl in decls:
+        if isinstance(decl, pfn_ast.TypeDecl) and decl.constructors:
+            types[decl.name] = tuple((c.name, len(c.fields)) for c in decl.constructors)
+    return ConstructorSignatures(types)
+
+
+DEFAULT_SIGNATURES = constructor_signatures()
+
+
+def get_constructors_for_type(
+    t: Type, signatures: ConstructorSignatures | None = None
+) -> list[str]:
+    signatures = signatures or DEFAULT_SIGNATURES
     if isinstance(t, TBool):
         return ["True", "False"]
-    if isinstance(t, TCon):
-        if t.name == "Option":
-            return ["Some", "None"]
-        if t.name == "Result":
-            return ["Ok", "Error"]
-        if t.name == "Ordering":
-            return ["LT", "EQ", "GT"]
+    if isinstance(t, TCon) and t.name in signatures.types:
+        return [name for name, _ in signatures.types[t.name]]
     return []
 
 
-def generate_missing_patterns(t: Type, covered: list[Pattern]) -> list[Pattern]:
-    constructors = get_constructors_for_type(t)
+def generate_missing_patterns(
+    t: Type, covered: list[Pattern], signatures: ConstructorSignatures | None = None
+) -> list[Pattern]:
+    constructors = get_constructors_for_type(t, signatures)
 
     if not constructors:
         for p in covered:
@@ -229,47 +265,263 @@ def generate_missing_patterns(t: Type, covered: list[Pattern]) -> list[Pattern]:
     return missing
 
 
-def check_exhaustiveness(
-    patterns: list[Pattern], scrutinee_type: Type | None = None
-) -> ExhaustivenessResult:
-    if not patterns:
-        return ExhaustivenessResult(
-            exhaustive=False,
-            missing_patterns=[PWild()],
-            redundant_patterns=[],
-        )
+# Heads of list patterns: ``[a, b]`` is matched as ``a :: b :: []``.
+_NIL: Hashable = ("[]",)
+_CONS: Hashable = ("::",)
 
-    covered: list[Pattern] = []
-    redundant: list[int] = []
 
-    for i, p in enumerate(patterns):
-        is_redundant = any(pattern_covers(prev, p) for prev in covered)
-        if is_redundant:
-            redundant.append(i)
-        else:
-            covered.append(p)
+def _head(p: Pattern) -> tuple[Hashable, tuple[Pattern, ...]] | None:
+    """The constructor ``p`` matches and its argument patterns; None if wild.
 
-    if scrutinee_type:
-        missing = generate_missing_patterns(scrutinee_type, covered)
+    A literal is a constructor of no arguments, keyed by itself.
+    """
+    if isinstance(p, (PWild, PVar)):
+        return None
+    if isinstance(p, PCon):
+        return ("con", p.name, len(p.args)), p.args
+    if isinstance(p, PBool):
+        return ("con", "True" if p.value else "False", 0), ()
+    if isinstance(p, PTuple):
+        return ("()", len(p.elements)), p.elements
+    if isinstance(p, PCons):
+        return _CONS, (p.head, p.tail)
+    if isinstance(p, PList):
+        if not p.elements:
+            return _NIL, ()
+        return _CONS, (p.elements[0], PList(p.elements[1:]))
+    return p, ()
+
+
+def _arity(key: Hashable) -> int:
+    if key == _CONS:
+        return 2
+    if isinstance(key, tuple) and key[0] in ("con", "()"):
+        return key[-1]
+    return 0
+
+
+def _complete_set(
+    key: Hashable, signatures: ConstructorSignatures
+) -> list[Hashable] | None:
+    """Every constructor of the type ``key`` belongs to; None if unbounded."""
+    if key in (_NIL, _CONS):
+        return [_NIL, _CONS]
+    if not isinstance(key, tuple):
+        return None
+    if key[0] == "()":
+        return [key]
+    if key[0] == "con":
+        signature = signatures.by_constructor.get(key[1])
+        if signature is not None:
+            return [("con", name, arity) for name, arity in signature]
+    return None
+
+
+def _rebuild(key: Hashable, args: tuple[Pattern, ...]) -> Pattern:
+    """The pattern with head ``key`` and argument patterns ``args``."""
+    if key == _NIL:
+        return PList(())
+    if key == _CONS:
+        head, tail = args
+        if isinstance(tail, PList):
+            return PList((head,) + tail.elements)
+        return PCons(head, tail)
+    if isinstance(key, tuple) and key[0] == "()":
+        return PTuple(args)
+    if isinstance(key, tuple) and key[0] == "con":
+        return PCon(key[1], args)
+    assert isinstance(key, Pattern)
+    return key
+
+
+# A row of a pattern matrix: one pattern per column, and its arm's index.
+_Row = tuple[tuple[Pattern, ...], int]
+
+
+def _analyse(
+    rows: list[_Row],
+    width: int,
+    signatures: ConstructorSignatures,
+    heads: list[Hashable] | None = None,
+) -> tuple[set[int], list[tuple[Pattern, ...]]]:
+    """Maranget's usefulness, for every row of a pattern matrix at once.
+
+    Returns the arms some value reaches first, and witnesses: vectors of
+    patterns, one per column, together covering the values no row matches.
+    The rows are split on the first column's constructor, a wildcard row
+    joining every split, so a match on many distinct constructors or
+    literals costs one pass over its arms. ``heads`` is the complete set
+    of constructors of the first column, if the patterns do not say it.
+    """
+    if width == 0:
+        if rows:
+            return {rows[0][1]}, []
+        return set(), [()]
+
+    groups: dict[Hashable, list[_Row]] = {}
+    wild: list[_Row] = []
+    for patterns, arm in rows:
+        first, rest = patterns[0], patterns[1:]
+        head = _head(first)
+        if head is None:
+            for key, group in groups.items():
+                group.append(((PWild(),) * _arity(key) + rest, arm))
+            wild.append((rest, arm))
+            continue
+        key, args = head
+        group = groups.get(key)
+        if group is None:
+            arity = len(args)
+            group = groups[key] = [((PWild(),) * arity + r, a) for r, a in wild]
+        group.append((args + rest, arm))
+
+    reached: set[int] = set()
+    witnesses: list[tuple[Pattern, ...]] = []
+    complete = heads
+    if groups and complete is None:
+        complete = _complete_set(next(iter(groups)), signatures)
+    # An arm naming a constructor no signature lists alongside the others,
+    # like ``Err`` next to ``Ok``, leaves the type's constructors
+    # unconfirmed: none of them are reported missing.
+    unconfirmed = any(
+        isinstance(key, tuple)
+        and key[0] == "con"
+        and (complete is None or key not in complete)
+        for key in groups
+    )
+    missing: list[Hashable] = []
+    for key in () if unconfirmed else complete or ():
+        if key not in groups:
+            missing.append(key)
+    for key, group in groups.items():
+        arity = _arity(key)
+        sub_reached, sub_witnesses = _analyse(
+            group, arity + width - 1, signatures
+        )
+        reached |= sub_reached
+        for w in sub_witnesses:
+            witnesses.append((_rebuild(key, w[:arity]),) + w[arity:])
+
+    if complete is not None and not missing and not unconfirmed:
+        return reached, witnesses
+
+    default_reached, default_witnesses = _analyse(wild, width - 1, signatures)
+    reached |= default_reached
+    if unconfirmed:
+        return reached, witnesses
+    if complete is None:
+        witnesses.extend((PWild(),) + w for w in default_witnesses)
     else:
-        all_wild = any(is_wild(p) for p in covered)
-        if all_wild:
-            missing = []
-        else:
-            missing = [PWild()]
+        for key in missing:
+            pattern = _rebuild(key, (PWild(),) * _arity(key))
+            witnesses.extend((pattern,) + w for w in default_witnesses)
+    return reached, witnesses
 
+
+def check_exhaustiveness(
+    patterns: list[Pattern],
+    scrutinee_type: Type | None = None,
+    signatures: ConstructorSignatures | None = None,
+) -> ExhaustivenessResult:
+    """Find the values no arm matches and the arms no value reaches.
+
+    Constructors are completed from ``signatures``, built-in sum types by
+    default, or from ``scrutinee_type`` when the arms name none of them.
+    A missing pattern is a witness such as ``Some (_, False)``; an arm is
+    redundant when the arms before it match every value it does.
+    """
+    signatures = signatures or DEFAULT_SIGNATURES
+    heads: list[Hashable] | None = None
+    if scrutinee_type is not None:
+        names = get_constructors_for_type(scrutinee_type, signatures)
+        if names:
+            signature = signatures.by_constructor.get(names[0])
+            if signature is None:
+                heads = [("con", name, 0) for name in names]
+            else:
+                heads = [("con", name, arity) for name, arity in signature]
+    rows = [((p,), i) for i, p in enumerate(patterns)]
+    reached, witnesses = _analyse(rows, 1, signatures, heads)
     return ExhaustivenessResult(
-        exhaustive=len(missing) == 0,
-        missing_patterns=missing,
-        redundant_patterns=redundant,
+        exhaustive=not witnesses,
+        missing_patterns=[w[0] for w in witnesses],
+        redundant_patterns=[i for i in range(len(patterns)) if i not in reached],
     )
 
 
 def check_match_exhaustiveness(
-    cases: list[ast.Pattern], scrutinee_type: Type | None = None
+    cases: list[ast.Pattern],
+    scrutinee_type: Type | None = None,
+    signatures: ConstructorSignatures | None = None,
 ) -> ExhaustivenessResult:
     patterns = [convert_pattern(c) for c in cases]
-    return check_exhaustiveness(patterns, scrutinee_type)
+    return check_exhaustiveness(patterns, scrutinee_type, signatures)
+
+
+@dataclass
+class MatchWarning:
+    """A ``match`` in ``definition`` that misses values or has dead arms.
+
+    ``redundant`` holds arm positions counted from 1, as written.
+    """
+
+    definition: str
+    missing: list[Pattern]
+    redundant: list[int]
+
+    def __str__(self) -> str:
+        problems = []
+        if self.missing:
+            missing = format_missing_patterns(self.missing)
+            problems.append(f"match is not exhaustive, missing {missing}")
+        for arm in self.redundant:
+            problems.append(f"match arm {arm} is unreachable")
+        return f"in {self.definition}: " + "; ".join(problems)
+
+
+def check_matches(
+    decls: Iterable[ast.Decl], signatures: ConstructorSignatures | None = None
+) -> list[MatchWarning]:
+    """Check every ``match`` in the ``def``s of a module.
+
+    Constructors are completed from ``signatures``, by default the built-in
+    sum types and those the module's ``TypeDecl``s declare. An arm with a
+    guard may not match, so it neither covers values nor is reported.
+    """
+    from pfn.parser import ast as pfn_ast
+
+    decls = list(decls)
+    if signatures is None:
+        signatures = constructor_signatures(decls)
+    warnings = []
+    for decl in decls:
+        if not isinstance(decl, pfn_ast.DefDecl):
+            continue
+        for match in _matches(decl.body):
+            arms = [i for i, case in enumerate(match.cases) if case.guard is None]
+            patterns = [convert_pattern(match.cases[i].pattern) for i in arms]
+            result = check_exhaustiveness(patterns, signatures=signatures)
+            redundant = [arms[i] + 1 for i in result.redundant_patterns]
+            if result.missing_patterns or redundant:
+                warnings.append(
+                    MatchWarning(decl.name, result.missing_patterns, redundant)
+                )
+    return warnings
+
+
+def _matches(node: Any) -> Iterator[ast.Match]:
+    """The ``match`` expressions in ``node``, outermost first."""
+    from pfn.parser import ast as pfn_ast
+
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, pfn_ast.Match):
+            yield node
+        if isinstance(node, (list, tuple)):
+            stack.extend(reversed(node))
+        elif is_dataclass(node) and not isinstance(node, pfn_ast.Pattern):
+            stack.extend(getattr(node, f.name) for f in reversed(fields(node)))
 
 
 def pattern_to_string(p: Pattern) -> str:
@@ -22,6 +22,7 @@ from pfn.types import (
     TVar,
     Type,
     TypeEnv,
+    Unifier,
 )
 from pfn.typechecker.classes import (
     ClassContext,
@@ -42,55 +43,132 @@ class TypeChecker:
     ):
         self.env = env or TypeEnv()
         self.var_counter = 0
+        self.level = 0
+        self.unifier = Unifier()
         self.class_ctx = class_ctx or get_default_context()
 
     def fresh_var(self) -> TVar:
         self.var_counter += 1
-        return TVar(f"t{self.var_counter}")
+        return self.unifier.fresh(f"t{self.var_counter}", self.level)
 
     def instantiate(self, scheme: Scheme) -> Type:
         if not scheme.vars:
             return scheme.type
         subst = Subst()
         for var in scheme.vars:
-            subst.mapping[var] = self.fresh_var()
+            # Subst.apply re-applies the mapping to what it substitutes, so
+            # a fresh name equal to a quantified one would be replaced again.
+            # Schemes from another checker may use any names.
+            fresh = self.fresh_var()
+            while fresh.name in scheme.vars:
+                fresh = self.fresh_var()
+            subst.mapping[var] = fresh
         return subst.apply(scheme.type)
 
-    def generalize(self, env: TypeEnv, t: Type) -> Scheme:
-        subst = Subst()
-        env_vars = subst.free_vars_env(env)
-        type_vars = subst.free_vars(t)
-        gen_vars = tuple(sorted(type_vars - env_vars))
-        return Scheme(gen_vars, t)
+    def generalize(self, t: Type) -> Scheme:
+        """Quantify the variables of ``t`` created deeper than ``self.level``.
+
+        Unification keeps every variable reachable from the environment at
+        or below the level of the binding it came from, so only ``t`` is
+        inspected, not the environment.
+        """
+        gen_vars = tuple(self.unifier.generalizable(t, self.level))
+        return Scheme(gen_vars, self.unifier.resolve(t))
 
     def infer(self, expr: ast.Expr) -> Type:
-        subst, t = self._infer(expr, Subst())
-        return subst.apply(t)
+        mark = self.unifier.mark()
+        level = self.level
+        try:
+            return self.unifier.zonk(self._infer(expr))
+        finally:
+            # Each call starts from an empty substitution.
+            self.unifier.undo(mark)
+            self.level = level
+
+    def infer_definition(self, decl: ast.DefDecl) -> Scheme:
+        """Infer a top-level ``def`` in ``self.env`` and generalize it."""
+        mark = self.unifier.mark()
+        level, env = self.level, self.env
+        try:
+            self.level += 1
+            t = self._infer_definition(decl, env)
+            self.level -= 1
+            scheme = self.generalize(t)
+            return Scheme(scheme.vars, self.unifier.zonk(scheme.type))
+        finally:
+            self.unifier.undo(mark)
+            self.level, self.env = level, env
+
+    def infer_group(self, decls: list[ast.DefDecl]) -> list[Scheme]:
+        """Infer mutually recursive top-level ``def``s together.
+
+        Each name is bound to a fresh monomorphic variable while the bodies
+        are inferred, so uses within the group must agree on one type, and
+        the schemes are generalized only once every body has been.
+        """
+        mark = self.unifier.mark()
+        level, env = self.level, self.env
+        try:
+            self.level += 1
+            own_types = [self.fresh_var() for _ in decls]
+            group_env = env
+            for decl, tv in zip(decls, own_types):
+                group_env = group_env.extend(decl.name, Scheme((), tv))
+
+            for decl, tv in zip(decls, own_types):
+                t = self._infer_definition(decl, group_env)
+                if not self.unifier.unify(tv, t):
+                    raise TypeError(
+                        f"Recursive use of {decl.name} does not match its type"
+                    )
+
+            self.level -= 1
+            schemes = []
+            for tv in own_types:
+                scheme = self.generalize(tv)
+                schemes.append(Scheme(scheme.vars, self.unifier.zonk(scheme.type)))
+            return schemes
+        finally:
+            self.unifier.undo(mark)
+            self.level, self.env = level, env
+
+    def _infer_definition(self, decl: ast.DefDecl, env: TypeEnv) -> Type:
+        param_types = []
+        self.env = env
+        for param in decl.params:
+            tv = self.fresh_var()
+            param_types.append(tv)
+            self.env = self.env.extend(param.name, Scheme((), tv))
 
-    def _infer(self, expr: ast.Expr, subst: Subst) -> tuple[Subst, Type]:
+        t = self._infer(decl.body)
+        for pt in reversed(param_types):
+            t = TFun(pt, t)
+        return t
+
+    def _infer(self, expr: ast.Expr) -> Type:
         if isinstance(expr, ast.IntLit):
-            return subst, TInt()
+            return TInt()
 
         if isinstance(expr, ast.FloatLit):
-            return subst, TFloat()
+            return TFloat()
 
         if isinstance(expr, ast.StringLit):
-            return subst, TString()
+            return TString()
 
         if isinstance(expr, ast.CharLit):
-            return subst, TChar()
+            return TChar()
 
         if isinstance(expr, ast.BoolLit):
-            return subst, TBool()
+            return TBool()
 
         if isinstance(expr, ast.UnitLit):
-            return subst, TUnit()
+            return TUnit()
 
         if isinstance(expr, ast.Var):
             scheme = self.env.lookup(expr.name)
             if scheme is None:
                 raise TypeError(f"Unbound variable: {expr.name}")
-            return subst, self.instantiate(scheme)
+            return self.instantiate(scheme)
 
         if isinstance(expr, ast.Lambda):
             param_types = []
@@ -102,147 +180,118 @@ class TypeChecker:
 
             old_env = self.env
             self.env = new_env
-            subst, body_type = self._infer(expr.body, subst)
+            body_type = self._infer(expr.body)
             self.env = old_env
 
             result_type = body_type
             for pt in reversed(param_types):
                 result_type = TFun(pt, result_type)
 
-            return subst, result_type
+            return result_type
 
         if isinstance(expr, ast.App):
-            subst, func_type = self._infer(expr.func, subst)
+            func_type = self._infer(expr.func)
             for arg in expr.args:
-                subst, arg_type = self._infer(arg, subst)
+                arg_type = self._infer(arg)
                 result_type = self.fresh_var()
-                new_subst = subst.unify(func_type, TFun(arg_type, result_type))
-                if new_subst is None:
+                if not self.unifier.unify(func_type, TFun(arg_type, result_type)):
                     raise TypeError(f"Cannot apply {func_type} to {arg_type}")
-                subst = new_subst.compose(subst)
-                func_type = subst.apply(result_type)
-            return subst, func_type
+                func_type = self.unifier.resolve(result_type)
+            return func_type
 
         if isinstance(expr, ast.BinOp):
-            subst, left_type = self._infer(expr.left, subst)
-            subst, right_type = self._infer(expr.right, subst)
+            left_type = self._infer(expr.left)
+            right_type = self._infer(expr.right)
 
             op = expr.op
             if op in ["+", "-", "*", "/", "%"]:
-                new_subst = subst.unify(left_type, TInt())
-                if new_subst is None:
-                    new_subst = subst.unify(left_type, TFloat())
-                    if new_subst is None:
+                if not self.unifier.unify(left_type, TInt()):
+                    if not self.unifier.unify(left_type, TFloat()):
                         raise TypeError(f"Expected Int or Float for operator {op}")
-                subst = new_subst.compose(subst)
-                new_subst = subst.unify(right_type, left_type)
-                if new_subst is None:
+                if not self.unifier.unify(right_type, left_type):
                     raise TypeError(f"Type mismatch in {op}")
-                subst = new_subst.compose(subst)
-                return subst, subst.apply(left_type)
+                return self.unifier.resolve(left_type)
 
             if op in ["<", "<=", ">", ">="]:
-                new_subst = subst.unify(left_type, TInt())
-                if new_subst is None:
-                    new_subst = subst.unify(left_type, TFloat())
-                    if new_subst is None:
+                if not self.unifier.unify(left_type, TInt()):
+                    if not self.unifier.unify(left_type, TFloat()):
                         raise TypeError(f"Expected Int or Float for operator {op}")
-                subst = new_subst.compose(subst)
-                new_subst = subst.unify(right_type, left_type)
-                if new_subst is None:
+                if not self.unifier.unify(right_type, left_type):
                     raise TypeError(f"Type mismatch in {op}")
-                subst = new_subst.compose(subst)
-                return subst, TBool()
+                return TBool()
 
             if op in ["==", "!="]:
-                new_subst = subst.unify(left_type, right_type)
-                if new_subst is None:
+                if not self.unifier.unify(left_type, right_type):
                     raise TypeError(f"Type mismatch in {op}")
-                subst = new_subst.compose(subst)
-                return subst, TBool()
+                return TBool()
 
             if op in ["&&", "||"]:
-                new_subst = subst.unify(left_type, TBool())
-                if new_subst is None:
+                if not self.unifier.unify(left_type, TBool()):
                     raise TypeError(f"Expected Bool for operator {op}")
-                subst = new_subst.compose(subst)
-                new_subst = subst.unify(right_type, TBool())
-                if new_subst is None:
+                if not self.unifier.unify(right_type, TBool()):
                     raise TypeError(f"Expected Bool for operator {op}")
-                subst = new_subst.compose(subst)
-                return subst, TBool()
+                return TBool()
 
             if op == "++":
                 elem_type = self.fresh_var()
-                new_subst = subst.unify(left_type, TList(elem_type))
-                if new_subst is None:
+                if not self.unifier.unify(left_type, TList(elem_type)):
                     raise TypeError(f"Expected List for operator ++")
-                subst = new_subst.compose(subst)
-                new_subst = subst.unify(right_type, TList(subst.apply(elem_type)))
-                if new_subst is None:
+                elem_list = TList(self.unifier.resolve(elem_type))
+                if not self.unifier.unify(right_type, elem_list):
                     raise TypeError(f"Type mismatch in ++")
-                subst = new_subst.compose(subst)
-                return subst, TList(subst.apply(elem_type))
+                return TList(self.unifier.resolve(elem_type))
 
             if op == "::":
                 elem_type = left_type
-                new_subst = subst.unify(right_type, TList(elem_type))
-                if new_subst is None:
+                if not self.unifier.unify(right_type, TList(elem_type)):
                     raise TypeError(f"Expected List for operator ::")
-                subst = new_subst.compose(subst)
-                return subst, TList(subst.apply(elem_type))
+                return TList(self.unifier.resolve(elem_type))
 
             raise TypeError(f"Unknown operator: {op}")
 
         if isinstance(expr, ast.UnaryOp):
-            subst, operand_type = self._infer(expr.operand, subst)
+            operand_type = self._infer(expr.operand)
 
             if expr.op == "-":
-                new_subst = subst.unify(operand_type, TInt())
-                if new_subst is None:
-                    new_subst = subst.unify(operand_type, TFloat())
-                    if new_subst is None:
+                if not self.unifier.unify(operand_type, TInt()):
+                    if not self.unifier.unify(operand_type, TFloat()):
                         raise TypeError(f"Expected Int or Float for operator -")
-                subst = new_subst.compose(subst)
-                return subst, subst.apply(operand_type)
+                return self.unifier.resolve(operand_type)
 
             if expr.op == "!":
-                new_subst = subst.unify(operand_type, TBool())
-                if new_subst is None:
+                if not self.unifier.unify(operand_type, TBool()):
                     raise TypeError(f"Expected Bool for operator !")
-                subst = new_subst.compose(subst)
-                return subst, TBool()
+                return TBool()
 
             raise TypeError(f"Unknown unary operator: {expr.op}")
 
         if isinstance(expr, ast.If):
-            subst, cond_type = self._infer(expr.cond, subst)
-            new_subst = subst.unify(cond_type, TBool())
-            if new_subst is None:
+            cond_type = self._infer(expr.cond)
+            if not self.unifier.unify(cond_type, TBool()):
                 raise TypeError(f"If condition must be Bool, got {cond_type}")
-            subst = new_subst.compose(subst)
 
-            subst, then_type = self._infer(expr.then_branch, subst)
-            subst, else_type = self._infer(expr.else_branch, subst)
+            then_type = self._infer(expr.then_branch)
+            else_type = self._infer(expr.else_branch)
 
-            new_subst = subst.unify(then_type, else_type)
-            if new_subst is None:
+            if not self.unifier.unify(then_type, else_type):
                 raise TypeError(
                     f"If branches must have same type: {then_type} vs {else_type}"
                 )
-            subst = new_subst.compose(subst)
-            return subst, subst.apply(then_type)
+            return self.unifier.resolve(then_type)
 
         if isinstance(expr, ast.Let):
-            subst, value_type = self._infer(expr.value, subst)
-            scheme = self.generalize(self.env, value_type)
+            self.level += 1
+            value_type = self._infer(expr.value)
+            self.level -= 1
+            scheme = self.generalize(value_type)
             old_env = self.env
             self.env = self.env.extend(expr.name, scheme)
-            subst, body_type = self._infer(expr.body, subst)
+            body_type = self._infer(expr.body)
             self.env = old_env
-            return subst, body_type
+            return body_type
 
         if isinstance(expr, ast.LetFunc):
+            self.level += 1
             param_types = []
             new_env = self.env
             for param in expr.params:
@@ -252,155 +301,140 @@ class TypeChecker:
 
             old_env = self.env
             self.env = new_env
-            subst, value_type = self._infer(expr.value, subst)
+            value_type = self._infer(expr.value)
             self.env = old_env
 
             for pt in reversed(param_types):
-                value_type = TFun(subst.apply(pt), value_type)
+                value_type = TFun(self.unifier.resolve(pt), value_type)
 
-            scheme = self.generalize(self.env, value_type)
+            self.level -= 1
+            scheme = self.generalize(value_type)
             self.env = self.env.extend(expr.name, scheme)
-            subst, body_type = self._infer(expr.body, subst)
+            body_type = self._infer(expr.body)
             self.env = old_env
-            return subst, body_type
+            return body_type
 
         if isinstance(expr, ast.ListLit):
             if not expr.elements:
-                return subst, TList(self.fresh_var())
+                return TList(self.fresh_var())
 
-            subst, first_type = self._infer(expr.elements[0], subst)
+            first_type = self._infer(expr.elements[0])
             elem_type = first_type
 
             for elem in expr.elements[1:]:
-                subst, t = self._infer(elem, subst)
-                new_subst = subst.unify(elem_type, t)
-                if new_subst is None:
+                t = self._infer(elem)
+                if not self.unifier.unify(elem_type, t):
                     raise TypeError(f"List elements must have same type")
-                subst = new_subst.compose(subst)
-                elem_type = subst.apply(elem_type)
+                elem_type = self.unifier.resolve(elem_type)
 
-            return subst, TList(elem_type)
+            return TList(elem_type)
 
         if isinstance(expr, ast.TupleLit):
             types = []
             for elem in expr.elements:
-                subst, t = self._infer(elem, subst)
+                t = self._infer(elem)
                 types.append(t)
-            return subst, TTuple(tuple(types))
+            return TTuple(tuple(types))
 
         if isinstance(expr, ast.Match):
-            subst, scrutinee_type = self._infer(expr.scrutinee, subst)
+            scrutinee_type = self._infer(expr.scrutinee)
 
             if not expr.cases:
-                return subst, self.fresh_var()
+                return self.fresh_var()
 
             result_type = self.fresh_var()
             for case in expr.cases:
-                case_env = self.env
-                subst, pattern_type = self._infer_pattern(case.pattern, subst, case_env)
+                pattern_type, case_env = self._infer_pattern(case.pattern, self.env)
 
-                new_subst = subst.unify(scrutinee_type, pattern_type)
-                if new_subst is None:
+                if not self.unifier.unify(scrutinee_type, pattern_type):
                     raise TypeError(f"Pattern type mismatch")
-                subst = new_subst.compose(subst)
-
-                if case.guard:
-                    subst, guard_type = self._infer(case.guard, subst)
-                    new_subst = subst.unify(guard_type, TBool())
-                    if new_subst is None:
-                        raise TypeError(f"Guard must be Bool")
-                    subst = new_subst.compose(subst)
 
+                # The guard and the body both see the pattern's variables.
                 old_env = self.env
                 self.env = case_env
-                subst, body_type = self._infer(case.body, subst)
+                if case.guard:
+                    guard_type = self._infer(case.guard)
+                    if not self.unifier.unify(guard_type, TBool()):
+                        raise TypeError(f"Guard must be Bool")
+                body_type = self._infer(case.body)
                 self.env = old_env
 
-                new_subst = subst.unify(result_type, body_type)
-                if new_subst is None:
+                if not self.unifier.unify(result_type, body_type):
                     raise TypeError(f"Match cases must have same type")
-                subst = new_subst.compose(subst)
-                result_type = subst.apply(result_type)
+                result_type = self.unifier.resolve(result_type)
 
-            return subst, result_type
+            return result_type
 
         if isinstance(expr, ast.FieldAccess):
-            subst, expr_type = self._infer(expr.expr, subst)
+            self._infer(expr.expr)
             result_type = self.fresh_var()
-            return subst, result_type
+            return result_type
 
         if isinstance(expr, ast.IndexAccess):
-            subst, expr_type = self._infer(expr.expr, subst)
-            subst, index_type = self._infer(expr.index, subst)
-            new_subst = subst.unify(index_type, TInt())
-            if new_subst is None:
+            self._infer(expr.expr)
+            index_type = self._infer(expr.index)
+            if not self.unifier.unify(index_type, TInt()):
                 raise TypeError(f"Index must be Int")
-            subst = new_subst.compose(subst)
             result_type = self.fresh_var()
-            return subst, result_type
+            return result_type
 
         raise TypeError(f"Unknown expression type: {type(expr)}")
 
     def _infer_pattern(
-        self, pattern: ast.Pattern, subst: Subst, env: TypeEnv
-    ) -> tuple[Subst, Type]:
+        self, pattern: ast.Pattern, env: TypeEnv
+    ) -> tuple[Type, TypeEnv]:
+        """Infer a pattern's type; also return ``env`` extended with its variables."""
         if isinstance(pattern, ast.IntPattern):
-            return subst, TInt()
+            return TInt(), env
 
         if isinstance(pattern, ast.FloatPattern):
-            return subst, TFloat()
+            return TFloat(), env
 
         if isinstance(pattern, ast.StringPattern):
-            return subst, TString()
+            return TString(), env
 
         if isinstance(pattern, ast.CharPattern):
-            return subst, TChar()
+            return TChar(), env
 
         if isinstance(pattern, ast.BoolPattern):
-            return subst, TBool()
+            return TBool(), env
 
         if isinstance(pattern, ast.VarPattern):
             tv = self.fresh_var()
-            new_env = env.extend(pattern.name, Scheme((), tv))
-            env.bindings.update(new_env.bindings)
-            return subst, tv
+            return tv, env.extend(pattern.name, Scheme((), tv))
 
         if isinstance(pattern, ast.WildcardPattern):
-            return subst, self.fresh_var()
+            return self.fresh_var(), env
 
         if isinstance(pattern, ast.ListPattern):
             if not pattern.elements:
-                return subst, TList(self.fresh_var())
+                return TList(self.fresh_var()), env
 
-            subst, first_type = self._infer_pattern(pattern.elements[0], subst, env)
+            first_type, env = self._infer_pattern(pattern.elements[0], env)
             elem_type = first_type
 
             for elem in pattern.elements[1:]:
-                subst, t = self._infer_pattern(elem, subst, env)
-                new_subst = subst.unify(elem_type, t)
-                if new_subst is None:
+                t, env = self._infer_pattern(elem, env)
+                if not self.unifier.unify(elem_type, t):
                     raise TypeError(f"Pattern elements must have same type")
-                subst = new_subst.compose(subst)
-                elem_type = subst.apply(elem_type)
+                elem_type = self.unifier.resolve(elem_type)
 
-            return subst, TList(elem_type)
+            return TList(elem_type), env
 
         if isinstance(pattern, ast.ConsPattern):
-            subst, head_type = self._infer_pattern(pattern.head, subst, env)
-            subst, tail_type = self._infer_pattern(pattern.tail, subst, env)
+            head_type, env = self._infer_pattern(pattern.head, env)
+            tail_type, env = self._infer_pattern(pattern.tail, env)
 
-            new_subst = subst.unify(tail_type, TList(head_type))
-            if new_subst is None:
+            if not self.unifier.unify(tail_type, TList(head_type)):
                 raise TypeError(f"Cons pattern type mismatch")
-            subst = new_subst.compose(subst)
-            return subst, TList(subst.apply(head_type))
+            return TList(self.unifier.resolve(head_type)), env
 
         if isinstance(pattern, ast.TuplePattern):
             types = []
             for elem in pattern.elements:
-                subst, t = self._infer_pattern(elem, subst, env)
+                t, env = self._infer_pattern(elem, env)
                 types.append(t)
-            return subst, TTuple(tuple(types))
+            return TTuple(tuple(types)), env
 
         raise TypeError(f"Unknown pattern type: {type(pattern)}")
 
@@ -480,9 +514,7 @@ class TypeChecker:
 
     def infer_qualified(self, expr: ast.Expr) -> tuple[Type, tuple[TConstraint, ...]]:
         """Infer type with constraints for qualified types."""
-        subst, t = self._infer(expr, Subst())
-        t = subst.apply(t)
-        return t, ()
+        return self.infer(expr), ()
 
     def check_constraint_satisfiable(self, constraint: TConstraint) -> bool:
         """Check if a type class constraint is satisfiable."""
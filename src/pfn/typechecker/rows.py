@@ -1,33 +1,42 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Mapping
+
+from pfn.types import RowFields
 
 if TYPE_CHECKING:
     from pfn.types import Type, TRowPoly, Subst
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, init=False)
 class Row:
-    fields: dict[str, Type]
+    """Fields sorted by label, closed or ending in the row variable ``rest``.
+
+    ``fields`` may be given as any mapping; it is stored as ``RowFields``,
+    so rows are hashable and two of them unify in one merge.
+    """
+
+    fields: RowFields
     rest: str | None = None
 
+    def __init__(self, fields: Mapping[str, Type], rest: str | None = None) -> None:
+        if not isinstance(fields, RowFields):
+            fields = RowFields(fields)
+        object.__setattr__(self, "fields", fields)
+        object.__setattr__(self, "rest", rest)
+
 
 def row_empty() -> Row:
-    return Row({})
+    return Row(RowFields())
 
 
 def row_extend(row: Row, label: str, t: Type) -> Row:
-    new_fields = dict(row.fields)
-    new_fields[label] = t
-    return Row(new_fields, row.rest)
+    return Row(row.fields.set(label, t), row.rest)
 
 
 def row_restrict(row: Row, label: str) -> Row:
-    new_fields = dict(row.fields)
-    if label in new_fields:
-        del new_fields[label]
-    return Row(new_fields, row.rest)
+    return Row(row.fields.remove(label), row.rest)
 
 
 def row_has_field(row: Row, label: str) -> bool:
@@ -39,7 +48,7 @@ def row_get_field(row: Row, label: str) -> Type | None:
 
 
 def row_labels(row: Row) -> set[str]:
-    return set(row.fields.keys())
+    return set(row.fields.labels)
 
 
 def row_to_trowpoly(row: Row) -> TRowPoly:
@@ -52,96 +61,96 @@ def trowpoly_to_row(t: TRowPoly) -> Row:
     return Row(t.fields, t.rest)
 
 
-def unify_rows(r1: Row, r2: Row, subst: Subst) -> Subst | None:
-    from pfn.types import Subst
+def unify_rows(
+    r1: Row, r2: Row, subst: Subst, fresh: Callable[[], str] | None = None
+) -> Subst | None:
+    """Unify two rows, walking their sorted labels together.
 
-    common_labels = row_labels(r1) & row_labels(r2)
+    Fields both rows have are unified; a row variable is bound to the
+    fields only the other row has. When both rows are open and each has
+    fields the other lacks, their variables share a new tail named by
+    ``fresh``, or by priming the first variable.
 
-    for label in common_labels:
-        t1 = row_get_field(r1, label)
-        t2 = row_get_field(r2, label)
-        if t1 is not None and t2 is not None:
-            result = subst.unify(t1, t2)
+    Bindings are added to a copy of ``subst`` rather than composed in
+    field by field: ``Subst.apply`` follows a variable's binding through to
+    the end, so the result applies the same, without reapplying the whole
+    substitution to itself once per field.
+    """
+    from pfn.types import Subst
+
+    subst = Subst(subst.mapping)
+    labels1, labels2 = r1.fields.labels, r2.fields.labels
+    types1, types2 = r1.fields.types, r2.fields.types
+    only1: list[tuple[str, Type]] = []
+    only2: list[tuple[str, Type]] = []
+    i = j = 0
+    while i < len(labels1) and j < len(labels2):
+        if labels1[i] == labels2[j]:
+            result = subst.unify(types1[i], types2[j])
             if result is None:
                 return None
-            subst = result.compose(subst)
-
-    r1_only = row_labels(r1) - common_labels
-    r2_only = row_labels(r2) - common_labels
-
-    if r1.rest is None and r2.rest is None:
-        if r1_only or r2_only:
-            return None
-        return subst
-
-    if r1.rest is not None and r2.rest is None:
-        if r1_only:
-            return None
-        r2_extended = Row({}, r1.rest)
-        for label in r2_only:
-            r2_extended = row_extend(r2_extended, label, row_get_field(r2, label))
-        return subst
-
-    if r1.rest is None and r2.rest is not None:
-        if r2_only:
-            return None
-        r1_extended = Row({}, r2.rest)
-        for label in r1_only:
-            r1_extended = row_extend(r1_extended, label, row_get_field(r1, label))
-        return subst
-
-    if r1.rest == r2.rest:
-        return subst
-
-    r1_rest = Row({label: row_get_field(r1, label) for label in r1_only}, r1.rest)
-    r2_rest = Row({label: row_get_field(r2, label) for label in r2_only}, r2.rest)
-
-    if r1.rest is not None:
-        subst = Subst({r1.rest: row_to_trowpoly(r2_rest)})
-    elif r2.rest is not None:
-        subst = Subst({r2.rest: row_to_trowpoly(r1_rest)})
+            subst.mapping.update(result.mapping)
+            i += 1
+            j += 1
+        elif labels1[i] < labels2[j]:
+            only1.append((labels1[i], types1[i]))
+            i += 1
+        else:
+            only2.append((labels2[j], types2[j]))
+            j += 1
+    only1.extend(zip(labels1[i:], types1[i:]))
+    only2.extend(zip(labels2[j:], types2[j:]))
+
+    rest1, rest2 = r1.rest, r2.rest
+    if rest1 == rest2:
+        return None if only1 or only2 else subst
+    if rest1 is not None and not only1:
+        return _bind_rest(rest1, _tail(only2, rest2), subst)
+    if rest2 is not None and not only2:
+        return _bind_rest(rest2, _tail(only1, rest1), subst)
+    if rest1 is None or rest2 is None:
+        return None
+
+    rest = fresh() if fresh is not None else f"{rest1}'"
+    if _bind_rest(rest1, _tail(only2, rest), subst) is None:
+        return None
+    return _bind_rest(rest2, _tail(only1, rest), subst)
+
+
+def _tail(pairs: list[tuple[str, Type]], rest: str | None) -> TRowPoly:
+    """The row of ``pairs``, already in label order, then ``rest``."""
+    from pfn.types import TRowPoly
+
+    labels = tuple(label for label, _ in pairs)
+    types = tuple(t for _, t in pairs)
+    return TRowPoly(RowFields._sorted(labels, types), rest)
 
+
+def _bind_rest(rest: str, tail: TRowPoly, subst: Subst) -> Subst | None:
+    """Bind the row variable ``rest`` to ``tail`` in ``subst``, in place."""
+    if rest in subst.apply(tail).free_vars:
+        return None
+    subst.mapping[rest] = tail
     return subst
 
 
 def rewrite_row(row: Row, subst: Subst) -> Row:
-    new_fields = {}
-    for label, t in row.fields.items():
-        new_fields[label] = subst.apply(t)
-
-    new_rest = row.rest
-    if row.rest and row.rest in subst.mapping:
-        rest_type = subst.mapping[row.rest]
-        if hasattr(rest_type, "fields"):
-            for label, t in rest_type.fields.items():
-                if label not in new_fields:
-                    new_fields[label] = t
-            new_rest = getattr(rest_type, "rest", None)
+    """Apply ``subst`` to the row's fields and splice in a bound tail."""
+    from pfn.types import TRowPoly, TVar
 
-    return Row(new_fields, new_rest)
+    fields, rest = row.fields.map(subst.apply), row.rest
+    if rest is not None:
+        tail = subst.apply(TVar(rest))
+        if isinstance(tail, TRowPoly):
+            fields, rest = fields.extend(tail.fields), tail.rest
+        elif isinstance(tail, TVar):
+            rest = tail.name
+    return Row(fields, rest)
 
 
 def row_free_vars(row: Row, subst: Subst) -> set[str]:
-    result: set[str] = set()
-    for t in row.fields.values():
-        result |= subst.free_vars(t)
-    if row.rest:
-        result.add(row.rest)
-    return result
+    return set(row_to_trowpoly(row).free_vars)
 
 
 def row_substitute(row: Row, subst: Subst) -> Row:
-    new_fields = {}
-    for label, t in row.fields.items():
-        new_fields[label] = subst.apply(t)
-
-    new_rest = row.rest
-    if row.rest and row.rest in subst.mapping:
-        rest_type = subst.mapping[row.rest]
-        if hasattr(rest_type, "fields"):
-            for label, t in rest_type.fields.items():
-                if label not in new_fields:
-                    new_fields[label] = t
-            new_rest = getattr(rest_type, "rest", None)
-
-    return Row(new_fields, new_rest)
+    return rewrite_row(row, subst)
@@ -16,6 +16,7 @@ from pfn.types.types import (
     TQualified,
     TRecord,
     TRowPoly,
+    RowFields,
     TSet,
     TState,
     TString,
@@ -29,6 +30,7 @@ from pfn.types.types import (
     GADTConstructor,
     TGADT,
 )
+from pfn.types.unify import TMeta, Unifier
 
 __all__ = [
     "Type",
@@ -39,6 +41,7 @@ __all__ = [
     "TChar",
     "TUnit",
     "TVar",
+    "TMeta",
     "TFun",
     "TList",
     "TDict",
@@ -50,6 +53,7 @@ __all__ = [
     "TState",
     "TGADT",
     "TRowPoly",
+    "RowFields",
     "TForall",
     "TExists",
     "TConstraint",
@@ -57,6 +61,7 @@ __all__ = [
     "Scheme",
     "Subst",
     "TypeEnv",
+    "Unifier",
     "TypeClass",
     "ClassInstance",
     "GADTConstructor",
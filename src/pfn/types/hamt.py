@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from operator import itemgetter
+from typing import Any, Generic, Iterable, Iterator, TypeVar, Union
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+
+
+class _Bitmap:
+    """Interior node: ``slots`` holds one entry per set bit of ``bitmap``.
+
+    An entry is either a ``(key, value)`` tuple or a child node.
+    """
+
+    __slots__ = ("bitmap", "slots")
+
+    def __init__(self, bitmap: int, slots: tuple[_Entry, ...]):
+        self.bitmap = bitmap
+        self.slots = slots
+
+
+class _Collision:
+    """Leaf for distinct keys whose 64-bit hashes are equal."""
+
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, hash: int, pairs: tuple[_Pair, ...]):
+        self.hash = hash
+        self.pairs = pairs
+
+
+_Pair = tuple[Any, Any]
+_Node = Union[_Bitmap, _Collision]
+_Entry = Union[_Pair, _Node]
+
+_EMPTY = _Bitmap(0, ())
+_MISSING = object()
+
+
+def _hash(key: object) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _join(
+    shift: int, first: _Pair, first_hash: int, second: _Pair, second_hash: int
+) -> _Node:
+    """A node holding two leaves whose hashes differ from bit ``shift`` on."""
+    if first_hash == second_hash:
+        return _Collision(first_hash, (first, second))
+    first_bit = (first_hash >> shift) & _MASK
+    second_bit = (second_hash >> shift) & _MASK
+    if first_bit == second_bit:
+        child = _join(shift + _BITS, first, first_hash, second, second_hash)
+        return _Bitmap(1 << first_bit, (child,))
+    if first_bit > second_bit:
+        first, second = second, first
+    return _Bitmap((1 << first_bit) | (1 << second_bit), (first, second))
+
+
+def _set(
+    node: _Node, shift: int, key_hash: int, key: Any, value: Any
+) -> tuple[_Node, bool]:
+    """Return ``node`` with ``key`` bound and whether the key is new."""
+    if isinstance(node, _Collision):
+        if key_hash != node.hash:
+            # Push the collision one level down next to the new key.
+            bit = 1 << ((node.hash >> shift) & _MASK)
+            return _set(_Bitmap(bit, (node,)), shift, key_hash, key, value)
+        for i, (other, _) in enumerate(node.pairs):
+            if other == key:
+                pairs = node.pairs[:i] + ((key, value),) + node.pairs[i + 1 :]
+                return _Collision(key_hash, pairs), False
+        return _Collision(key_hash, node.pairs + ((key, value),)), True
+
+    bit = 1 << ((key_hash >> shift) & _MASK)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    slots = node.slots
+    if not node.bitmap & bit:
+        slots = slots[:index] + ((key, value),) + slots[index:]
+        return _Bitmap(node.bitmap | bit, slots), True
+
+    slot = slots[index]
+    replaced: _Entry
+    if type(slot) is tuple:
+        if slot[0] == key:
+            replaced, added = (key, value), False
+        else:
+            other_hash = _hash(slot[0])
+            replaced = _join(shift + _BITS, slot, other_hash, (key, value), key_hash)
+            added = True
+    else:
+        replaced, added = _set(slot, shift + _BITS, key_hash, key, value)
+    slots = slots[:index] + (replaced,) + slots[index + 1 :]
+    return _Bitmap(node.bitmap, slots), added
+
+
+def _delete(node: _Node, shift: int, key_hash: int, key: Any) -> _Node | None:
+    """Return ``node`` without ``key`` (None once empty), or ``node`` itself."""
+    if isinstance(node, _Collision):
+        pairs = tuple(pair for pair in node.pairs if pair[0] != key)
+        if len(pairs) == len(node.pairs):
+            return node
+        if len(pairs) == 1:
+            return _Bitmap(1 << ((key_hash >> shift) & _MASK), pairs)
+        return _Collision(node.hash, pairs)
+
+    bit = 1 << ((key_hash >> shift) & _MASK)
+    if not node.bitmap & bit:
+        return node
+    index = (node.bitmap & (bit - 1)).bit_count()
+    slot = node.slots[index]
+    replaced: _Node | None
+    if type(slot) is tuple:
+        if slot[0] != key:
+            return node
+        replaced = None
+    else:
+        replaced = _delete(slot, shift + _BITS, key_hash, key)
+        if replaced is slot:
+            return node
+    if replaced is None:
+        if node.bitmap == bit:
+            return None
+        slots = node.slots[:index] + node.slots[index + 1 :]
+        return _Bitmap(node.bitmap & ~bit, slots)
+    slots = node.slots[:index] + (replaced,) + node.slots[index + 1 :]
+    return _Bitmap(node.bitmap, slots)
+
+
+def _get(node: _Node, key: Any, default: Any) -> Any:
+    key_hash = hash(key) & _HASH_MASK
+    shift = 0
+    while True:
+        if type(node) is _Collision:
+            for other, value in node.pairs:
+                if other == key:
+                    return value
+            return default
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not node.bitmap & bit:
+            return default
+        entry = node.slots[(node.bitmap & (bit - 1)).bit_count()]
+        if type(entry) is tuple:
+            return entry[1] if entry[0] == key else default
+        node = entry
+        shift += _BITS
+
+
+def _items(node: _Node) -> Iterator[_Pair]:
+    # An explicit stack instead of nested generators keeps full walks, which
+    # generalization does over the whole environment, close to dict speed.
+    stack: list[_Node] = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is _Collision:
+            yield from node.pairs
+            continue
+        for slot in node.slots:
+            if type(slot) is tuple:
+                yield slot
+            else:
+                stack.append(slot)
+
+
+class HAMT(Generic[K, V]):
+    """Immutable hash array mapped trie.
+
+    ``set`` and ``delete`` copy only the O(log n) nodes on the path to the
+    key and share the rest with the original map, so keeping every
+    version of a growing map costs no more than the map itself.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, items: Iterable[tuple[K, V]] = ()):
+        self._root: _Node = _EMPTY
+        self._size = 0
+        for key, value in items:
+            self._root, added = _set(self._root, 0, _hash(key), key, value)
+            self._size += added
+
+    @classmethod
+    def _make(cls, root: _Node, size: int) -> HAMT[K, V]:
+        result = cls.__new__(cls)
+        result._root = root
+        result._size = size
+        return result
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: object) -> bool:
+        return _get(self._root, key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[K]:
+        return map(itemgetter(0), _items(self._root))
+
+    def __repr__(self) -> str:
+        return f"HAMT({dict(self.items())!r})"
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        result: V | None = _get(self._root, key, default)
+        return result
+
+    def set(self, key: K, value: V) -> HAMT[K, V]:
+        root, added = _set(self._root, 0, _hash(key), key, value)
+        return self._make(root, self._size + added)
+
+    def update(self, items: Iterable[tuple[K, V]]) -> HAMT[K, V]:
+        root, size = self._root, self._size
+        for key, value in items:
+            root, added = _set(root, 0, _hash(key), key, value)
+            size += added
+        return self._make(root, size)
+
+    def delete(self, key: K) -> HAMT[K, V]:
+        root = _delete(self._root, 0, _hash(key), key)
+        if root is self._root:
+            return self
+        return self._make(_EMPTY if root is None else root, self._size - 1)
+
+    def items(self) -> Iterator[tuple[K, V]]:
+        return _items(self._root)
+
+    def values(self) -> Iterator[V]:
+        return map(itemgetter(1), _items(self._root))
+
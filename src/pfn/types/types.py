@@ -1,60 +1,263 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
+import weakref
+from bisect import bisect_left
+from dataclasses import MISSING, dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping
+
+from pfn.types.hamt import HAMT
+
+_NO_VARS: frozenset[str] = frozenset()
+_set = object.__setattr__
+# One shared singleton set per variable name: checkers number their fresh
+# variables from zero, so the same few names come up again and again.
+_NAME_SETS: dict[str, frozenset[str]] = {}
+
+
+def _name_set(name: str) -> frozenset[str]:
+    names = _NAME_SETS.get(name)
+    if names is None:
+        names = _NAME_SETS[name] = frozenset((name,))
+    return names
+
+
+def _child_types(value: Any) -> Iterator[Type]:
+    """The types held in a field value: a type, or tuples, lists and dicts."""
+    if isinstance(value, Type):
+        yield value
+    elif isinstance(value, RowFields):
+        yield from value.types
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _child_types(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _child_types(item)
+
+
+_Fields = tuple[
+    tuple[str, ...],
+    tuple[Any, ...],
+    Callable[[tuple[Any, ...]], tuple[Any, ...]] | None,
+]
+
+
+class _HashConsed(type):
+    """Metaclass that interns type nodes.
+
+    Calling a type class with fields equal to those of a live node returns
+    that node, so structurally equal types are the same object and compare
+    and hash by identity. Every node caches the names of the variables in
+    it when it is built. Ground nodes are kept for good, so ``TInt()`` and
+    friends are singletons; nodes with variables are held weakly, since
+    inference builds many short-lived ones around fresh variables, and
+    entries for dead ones are swept whenever that table has doubled. Nodes
+    with dict fields are unhashable and are built fresh, as are classes
+    that set ``_hash_cons = False`` and any node with such a node below it.
+    A class may define ``_canonical`` to put its field values in a normal,
+    hashable form before the lookup.
+    """
+
+    _ground: dict[tuple[Any, ...], Type] = {}
+    _live: dict[tuple[Any, ...], weakref.ref[Type]] = {}
+    _sweep_at = 1024
+    # Per class: the field names, defaults and ``_canonical``, or None if
+    # not interned.
+    _fields: dict[type, _Fields | None] = {}
+
+    def __call__(cls, *args: Any, **kwargs: Any) -> Any:
+        try:
+            fields = _HashConsed._fields[cls]
+        except KeyError:
+            fields = _HashConsed._fields[cls] = cls._field_defaults()
+        if fields is None:
+            return cls._build(args, kwargs)
+        names, defaults, canonical = fields
+        if kwargs or len(args) != len(names):
+            values = list(args)
+            for name, default in zip(names[len(args) :], defaults[len(args) :]):
+                value = kwargs.get(name, default)
+                if value is MISSING:
+                    return cls._build(args, kwargs)
+                values.append(value)
+            args = tuple(values)
+        if canonical is not None:
+            args = canonical(args)
+        for arg in args:
+            if type(arg) is list:
+                args = tuple(tuple(a) if type(a) is list else a for a in args)
+                break
+        key = (cls, *args)
+        try:
+            node = _HashConsed._ground.get(key)
+        except TypeError:
+            return cls._build(args, kwargs)
+        if node is not None:
+            return node
+        ref = _HashConsed._live.get(key)
+        if ref is not None:
+            node = ref()
+            if node is not None:
+                return node
+
+        node = cls.__new__(cls)
+        for name, arg in zip(names, args):
+            _set(node, name, arg)
+        node._cache_vars()
+        if not node._shared:
+            return node
+        if not node._vars:
+            _HashConsed._ground[key] = node
+            return node
+        live = _HashConsed._live
+        live[key] = weakref.ref(node)
+        if len(live) >= _HashConsed._sweep_at:
+            _HashConsed._sweep()
+        return node
+
+    def _field_defaults(cls) -> _Fields | None:
+        if not cls.__dict__.get("_hash_cons", True):
+            return None
+        fields = getattr(cls, "__dataclass_fields__").values()
+        names = tuple(f.name for f in fields)
+        defaults = tuple(f.default for f in fields)
+        return names, defaults, getattr(cls, "_canonical", None)
+
+    def _build(cls, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+        node = type.__call__(cls, *args, **kwargs)
+        node._cache_vars()
+        _set(node, "_shared", False)
+        return node
+
+    @staticmethod
+    def _sweep() -> None:
+        live = {key: ref for key, ref in _HashConsed._live.items() if ref() is not None}
+        _HashConsed._live = live
+        _HashConsed._sweep_at = max(1024, 2 * len(live))
+
+
+@dataclass(frozen=True, eq=False)
+class Type(metaclass=_HashConsed):
+    """Base of all types.
+
+    Types are hash-consed (see ``_HashConsed``): ``TInt()`` is always the
+    same object, equality is identity, and ``free_vars`` and ``ground`` are
+    precomputed per node. Nodes over unification cells are built fresh, so
+    two of them are equal only if they are the same object; compare those
+    after resolving.
+    """
+
+    if TYPE_CHECKING:
+        # Every variable name in the type, bound or not, which is what
+        # Subst.apply may replace, and the free ones. They differ only
+        # under TForall and TExists.
+        _vars: frozenset[str]
+        _free: frozenset[str]
+        # Whether the node is interned: false if it or a node below it was
+        # built fresh.
+        _shared: bool
 
-
-@dataclass(frozen=True)
-class Type:
     def __str__(self) -> str:
         return "Type"
 
-
-@dataclass(frozen=True)
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Rebuild through the constructor so copies and unpickled types are
+        # interned too.
+        fields = self.__dataclass_fields__
+        return (type(self), tuple(getattr(self, name) for name in fields))
+
+    def _cache_vars(self) -> None:
+        all_vars = free = _NO_VARS
+        shared = True
+        for name in self.__dataclass_fields__:
+            value = getattr(self, name)
+            if isinstance(value, Type):
+                children: Iterable[Type] = (value,)
+            elif isinstance(value, (tuple, list, dict, RowFields)):
+                children = _child_types(value)
+            else:
+                continue
+            for child in children:
+                if not child._shared:
+                    shared = False
+                if not child._vars:
+                    continue
+                if not all_vars:
+                    all_vars, free = child._vars, child._free
+                elif free is all_vars and child._free is child._vars:
+                    all_vars = free = all_vars | child._vars
+                else:
+                    all_vars = all_vars | child._vars
+                    free = free | child._free
+        self._set_vars(all_vars, free, shared)
+
+    def _set_vars(
+        self, all_vars: frozenset[str], free: frozenset[str], shared: bool = True
+    ) -> None:
+        _set(self, "_vars", all_vars)
+        _set(self, "_free", free)
+        _set(self, "_shared", shared)
+
+    @property
+    def free_vars(self) -> frozenset[str]:
+        """Names of the type variables free in this type."""
+        return self._free
+
+    @property
+    def ground(self) -> bool:
+        """Whether no type variable occurs in this type at all."""
+        return not self._vars
+
+
+@dataclass(frozen=True, eq=False)
 class TInt(Type):
     def __str__(self) -> str:
         return "Int"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TFloat(Type):
     def __str__(self) -> str:
         return "Float"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TString(Type):
     def __str__(self) -> str:
         return "String"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TBool(Type):
     def __str__(self) -> str:
         return "Bool"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TChar(Type):
     def __str__(self) -> str:
         return "Char"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TUnit(Type):
     def __str__(self) -> str:
         return "()"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TVar(Type):
     name: str
 
     def __str__(self) -> str:
         return self.name
 
+    def _cache_vars(self) -> None:
+        names = _name_set(self.name)
+        self._set_vars(names, names)
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, eq=False)
 class TFun(Type):
     param: Type
     result: Type
@@ -65,7 +268,7 @@ class TFun(Type):
         return f"{self.param} -> {self.result}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TList(Type):
     elem: Type
 
@@ -73,7 +276,7 @@ class TList(Type):
         return f"[{self.elem}]"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TDict(Type):
     key: Type
     value: Type
@@ -82,7 +285,7 @@ class TDict(Type):
         return f"Dict {self.key} {self.value}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TSet(Type):
     elem: Type
 
@@ -90,7 +293,7 @@ class TSet(Type):
         return f"Set {self.elem}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TTuple(Type):
     elements: tuple[Type, ...]
 
@@ -99,7 +302,7 @@ class TTuple(Type):
         return f"({elems})"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TRecord(Type):
     fields: tuple[tuple[str, Type], ...]
 
@@ -108,7 +311,7 @@ class TRecord(Type):
         return f"{{{fields}}}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TCon(Type):
     name: str
     args: tuple[Type, ...] = ()
@@ -120,7 +323,7 @@ class TCon(Type):
         return self.name
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TIO(Type):
     inner: Type
 
@@ -128,7 +331,7 @@ class TIO(Type):
         return f"IO {self.inner}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TState(Type):
     state: Type
     inner: Type
@@ -148,19 +351,155 @@ class TGADT(Type):
         return f"GADT {self.name} {params_str}"
 
 
-@dataclass(frozen=True)
+class RowFields(Mapping[str, "Type"]):
+    """The labelled field types of a row, sorted by label.
+
+    Immutable and hashable, so rows can be interned. A label is found by
+    bisection, and two rows are compared or merged in one pass over both.
+    Built from a mapping or from ``(label, type)`` pairs; a repeated label
+    keeps its last type.
+    """
+
+    __slots__ = ("labels", "types", "_hash")
+
+    labels: tuple[str, ...]
+    types: tuple[Type, ...]
+    _hash: int | None
+
+    def __init__(
+        self, fields: Mapping[str, Type] | Iterable[tuple[str, Type]] = ()
+    ) -> None:
+        pairs = fields.items() if isinstance(fields, Mapping) else fields
+        ordered = sorted(dict(pairs).items())
+        _set(self, "labels", tuple(label for label, _ in ordered))
+        _set(self, "types", tuple(t for _, t in ordered))
+        _set(self, "_hash", None)
+
+    @classmethod
+    def _sorted(cls, labels: tuple[str, ...], types: tuple[Type, ...]) -> RowFields:
+        """Wrap labels that are already sorted and unique, and their types."""
+        fields = object.__new__(cls)
+        _set(fields, "labels", labels)
+        _set(fields, "types", types)
+        _set(fields, "_hash", None)
+        return fields
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("RowFields is immutable")
+
+    def _index(self, label: str) -> int:
+        """Where ``label`` is or would go in ``labels``."""
+        return bisect_left(self.labels, label)
+
+    def __getitem__(self, label: str) -> Type:
+        i = self._index(label)
+        if i < len(self.labels) and self.labels[i] == label:
+            return self.types[i]
+        raise KeyError(label)
+
+    def __contains__(self, label: object) -> bool:
+        if not isinstance(label, str):
+            return False
+        i = self._index(label)
+        return i < len(self.labels) and self.labels[i] == label
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.labels)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, RowFields):
+            return self.labels == other.labels and self.types == other.types
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        h = self._hash
+        if h is None:
+            h = hash((self.labels, self.types))
+            _set(self, "_hash", h)
+        return h
+
+    def __repr__(self) -> str:
+        return f"RowFields({dict(self.pairs())!r})"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (RowFields, (tuple(self.pairs()),))
+
+    def pairs(self) -> Iterator[tuple[str, Type]]:
+        """The ``(label, type)`` pairs in label order."""
+        return zip(self.labels, self.types)
+
+    def set(self, label: str, t: Type) -> RowFields:
+        """These fields with ``label`` added or given type ``t``."""
+        i = self._index(label)
+        labels, types = self.labels, self.types
+        if i < len(labels) and labels[i] == label:
+            return RowFields._sorted(labels, types[:i] + (t,) + types[i + 1 :])
+        return RowFields._sorted(
+            labels[:i] + (label,) + labels[i:], types[:i] + (t,) + types[i:]
+        )
+
+    def remove(self, label: str) -> RowFields:
+        """These fields without ``label``."""
+        i = self._index(label)
+        labels, types = self.labels, self.types
+        if i < len(labels) and labels[i] == label:
+            return RowFields._sorted(
+                labels[:i] + labels[i + 1 :], types[:i] + types[i + 1 :]
+            )
+        return self
+
+    def map(self, f: Callable[[Type], Type]) -> RowFields:
+        """The same labels with ``f`` applied to each type."""
+        types = tuple(map(f, self.types))
+        if types == self.types:
+            return self
+        return RowFields._sorted(self.labels, types)
+
+    def extend(self, other: RowFields) -> RowFields:
+        """These fields plus those of ``other`` whose labels they lack."""
+        merged = dict(other.pairs())
+        merged.update(self.pairs())
+        if len(merged) == len(self.labels):
+            return self
+        # The labels are unique, so sorting never compares two types.
+        labels, types = zip(*sorted(merged.items()))
+        return RowFields._sorted(labels, types)
+
+
+@dataclass(frozen=True, eq=False)
 class TRowPoly(Type):
-    fields: dict[str, Type]
+    """A row of labelled fields, closed or ending in the row variable ``rest``.
+
+    ``fields`` may be given as any mapping; it is stored as ``RowFields``.
+    """
+
+    fields: RowFields
     rest: str | None = None
 
+    @staticmethod
+    def _canonical(args: tuple[Any, ...]) -> tuple[Any, ...]:
+        fields, rest = args
+        if not isinstance(fields, RowFields):
+            fields = RowFields(fields)
+        return fields, rest
+
     def __str__(self) -> str:
-        fields = ", ".join(f"{k}: {v}" for k, v in self.fields.items())
+        fields = ", ".join(f"{k}: {v}" for k, v in self.fields.pairs())
         if self.rest:
             return f"{{{fields} | {self.rest}}}"
         return f"{{{fields}}}"
 
+    def _cache_vars(self) -> None:
+        super()._cache_vars()
+        if self.rest:
+            rest = {self.rest}
+            self._set_vars(self._vars | rest, self._free | rest, self._shared)
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TForall(Type):
     vars: tuple[str, ...]
     inner: Type
@@ -169,8 +508,13 @@ class TForall(Type):
         vars_str = " ".join(self.vars)
         return f"forall {vars_str}. {self.inner}"
 
+    def _cache_vars(self) -> None:
+        bound = frozenset(self.vars)
+        inner = self.inner
+        self._set_vars(inner._vars | bound, inner._free - bound, inner._shared)
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, eq=False)
 class TExists(Type):
     vars: tuple[str, ...]
     inner: Type
@@ -179,8 +523,13 @@ class TExists(Type):
         vars_str = " ".join(self.vars)
         return f"exists {vars_str}. {self.inner}"
 
+    def _cache_vars(self) -> None:
+        bound = frozenset(self.vars)
+        inner = self.inner
+        self._set_vars(inner._vars | bound, inner._free - bound, inner._shared)
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, eq=False)
 class TConstraint(Type):
     class_name: str
     type_: Type
@@ -189,7 +538,7 @@ class TConstraint(Type):
         return f"{self.class_name} {self.type_}"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class TQualified(Type):
     constraints: tuple[TConstraint, ...]
     inner: Type
@@ -255,18 +604,14 @@ class Subst:
         return f"Subst({self.mapping})"
 
     def apply(self, t: Type) -> Type:
-        if isinstance(t, TInt):
-            return t
-        if isinstance(t, TFloat):
-            return t
-        if isinstance(t, TString):
-            return t
-        if isinstance(t, TBool):
-            return t
-        if isinstance(t, TChar):
-            return t
-        if isinstance(t, TUnit):
+        # Types are interned, so rebuilding a node whose variables are all
+        # unmapped would only find the same node again.
+        if self.mapping.keys().isdisjoint(t._vars):
             return t
+        return self._apply_node(t)
+
+    def _apply_node(self, t: Type) -> Type:
+        """Rebuild ``t`` with ``apply`` mapped over its children."""
         if isinstance(t, TVar):
             if t.name in self.mapping:
                 return self.apply(self.mapping[t.name])
@@ -294,10 +639,14 @@ class Subst:
                 {k: self.apply(v) for k, v in t.constructors.items()},
             )
         if isinstance(t, TRowPoly):
-            return TRowPoly(
-                {k: self.apply(v) for k, v in t.fields.items()},
-                t.rest,
-            )
+            fields, rest = t.fields.map(self.apply), t.rest
+            if rest is not None:
+                tail = self.apply(TVar(rest))
+                if isinstance(tail, TRowPoly):
+                    fields, rest = fields.extend(tail.fields), tail.rest
+                elif isinstance(tail, TVar):
+                    rest = tail.name
+            return TRowPoly(fields, rest)
         if isinstance(t, (TForall, TExists)):
             return type(t)(
                 t.vars,
@@ -330,58 +679,7 @@ class Subst:
         return Subst(new_mapping)
 
     def free_vars(self, t: Type) -> set[str]:
-        if isinstance(t, (TInt, TFloat, TString, TBool, TChar, TUnit)):
-            return set()
-        if isinstance(t, TVar):
-            return {t.name}
-        if isinstance(t, TFun):
-            return self.free_vars(t.param) | self.free_vars(t.result)
-        if isinstance(t, TList):
-            return self.free_vars(t.elem)
-        if isinstance(t, TTuple):
-            result: set[str] = set()
-            for e in t.elements:
-                result |= self.free_vars(e)
-            return result
-        if isinstance(t, TRecord):
-            result = set()
-            for _, v in t.fields:
-                result |= self.free_vars(v)
-            return result
-        if isinstance(t, TCon):
-            result = set()
-            for a in t.args:
-                result |= self.free_vars(a)
-            return result
-        if isinstance(t, TIO):
-            return self.free_vars(t.inner)
-        if isinstance(t, TState):
-            return self.free_vars(t.state) | self.free_vars(t.inner)
-        if isinstance(t, TGADT):
-            result = set()
-            for p in t.params:
-                result |= self.free_vars(p)
-            for v in t.constructors.values():
-                result |= self.free_vars(v)
-            return result
-        if isinstance(t, TRowPoly):
-            result = set()
-            for v in t.fields.values():
-                result |= self.free_vars(v)
-            if t.rest:
-                result.add(t.rest)
-            return result
-        if isinstance(t, (TForall, TExists)):
-            return self.free_vars(t.inner) - set(t.vars)
-        if isinstance(t, TConstraint):
-            return self.free_vars(t.type_)
-        if isinstance(t, TQualified):
-            result = set()
-            for c in t.constraints:
-                result |= self.free_vars(c.type_)
-            result |= self.free_vars(t.inner)
-            return result
-        return set()
+        return set(t.free_vars)
 
     def free_vars_scheme(self, scheme: Scheme) -> set[str]:
         return self.free_vars(scheme.type) - set(scheme.vars)
@@ -393,7 +691,7 @@ class Subst:
         return result
 
     def occurs_in(self, var: str, t: Type) -> bool:
-        return var in self.free_vars(t)
+        return var in t.free_vars
 
     def unify(self, t1: Type, t2: Type) -> Subst | None:
         t1 = self.apply(t1)
@@ -453,35 +751,50 @@ class Subst:
 
 
 class TypeEnv:
-    def __init__(self, bindings: dict[str, Scheme] | None = None):
-        self.bindings: dict[str, Scheme] = bindings.copy() if bindings else {}
+    """Type schemes in scope, held in a persistent map.
+
+    ``extend`` and the other updates share all but O(log n) nodes with the
+    environment they start from, so adding a binder does not copy every
+    binding in scope.
+    """
+
+    def __init__(self, bindings: Mapping[str, Scheme] | None = None):
+        self._map: HAMT[str, Scheme] = HAMT(bindings.items() if bindings else ())
+
+    @classmethod
+    def _from_map(cls, bindings: HAMT[str, Scheme]) -> TypeEnv:
+        env = cls.__new__(cls)
+        env._map = bindings
+        return env
+
+    @property
+    def bindings(self) -> dict[str, Scheme]:
+        """A snapshot of the bindings; changing it does not change the env."""
+        return dict(self._map.items())
+
+    def __iter__(self) -> Iterator[Scheme]:
+        return self._map.values()
+
+    def __len__(self) -> int:
+        return len(self._map)
 
-    def __iter__(self):
-        return iter(self.bindings.values())
+    def values(self) -> Iterator[Scheme]:
+        return self._map.values()
 
-    def values(self):
-        return self.bindings.values()
+    def items(self) -> Iterator[tuple[str, Scheme]]:
+        return self._map.items()
 
     def lookup(self, name: str) -> Scheme | None:
-        return self.bindings.get(name)
+        return self._map.get(name)
 
     def extend(self, name: str, scheme: Scheme) -> TypeEnv:
-        new_bindings = self.bindings.copy()
-        new_bindings[name] = scheme
-        return TypeEnv(new_bindings)
+        return self._from_map(self._map.set(name, scheme))
 
-    def extend_many(self, bindings: dict[str, Scheme]) -> TypeEnv:
-        new_bindings = self.bindings.copy()
-        new_bindings.update(bindings)
-        return TypeEnv(new_bindings)
+    def extend_many(self, bindings: Mapping[str, Scheme]) -> TypeEnv:
+        return self._from_map(self._map.update(bindings.items()))
 
     def remove(self, name: str) -> TypeEnv:
-        new_bindings = self.bindings.copy()
-        if name in new_bindings:
-            del new_bindings[name]
-        return TypeEnv(new_bindings)
+        return self._from_map(self._map.delete(name))
 
     def merge(self, other: TypeEnv) -> TypeEnv:
-        new_bindings = self.bindings.copy()
-        new_bindings.update(other.bindings)
-        return TypeEnv(new_bindings)
+        return self._from_map(self._map.update(other.items()))
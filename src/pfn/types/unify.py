@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+from typing import Union
+
+from pfn.types.types import (
+    Subst,
+    TCon,
+    TFun,
+    TIO,
+    TList,
+    TRecord,
+    TState,
+    TTuple,
+    TVar,
+    Type,
+    _name_set,
+)
+
+
+class TMeta(TVar):
+    """A type variable that is also a mutable union-find cell.
+
+    ``ref`` is None while the variable is unbound and otherwise the type it
+    was unified with, possibly another variable. ``level`` is the ``let``
+    depth the variable belongs to: binding a variable lowers the level of
+    every variable in its new type to at most its own, so a variable still
+    above the current level after inferring a ``let`` value cannot be
+    reached from the environment and may be generalized. Cells are not
+    interned: each is its own variable, equal only to itself, but ``Subst``
+    and the ``Scheme`` machinery treat it as an ordinary variable by name.
+    """
+
+    _hash_cons = False
+    # Cells are mutable; skip the frozen dataclass check on every update.
+    __setattr__ = object.__setattr__
+
+    ref: Type | None
+    level: int
+
+    def __init__(self, name: str, level: int = 0):
+        names = _name_set(name)
+        self.name = name
+        self.ref = None
+        self.level = level
+        self._vars = self._free = names
+        self._shared = False
+
+    @classmethod
+    def new(cls, name: str, level: int) -> TMeta:
+        """Build a cell without going through the interning metaclass."""
+        cell = object.__new__(cls)
+        cls.__init__(cell, name, level)
+        return cell
+
+    def _cache_vars(self) -> None:
+        pass  # Set by __init__, which fresh variables are hot enough to need.
+
+
+_Trail = list[tuple[TMeta, Union[Type, None], int]]
+
+
+class _Resolver(Subst):
+    """``Subst.apply`` with the cells' bindings as the mapping."""
+
+    def __init__(self, unifier: Unifier, final: bool):
+        super().__init__()
+        self.unifier = unifier
+        self.final = final
+
+    def apply(self, t: Type) -> Type:
+        if not t._vars:
+            return t
+        if isinstance(t, TVar):
+            t = self.unifier.find(t)
+            if isinstance(t, TVar):
+                if self.final and type(t) is TMeta:
+                    return TVar(t.name)
+                return t
+        return self._apply_node(t)
+
+
+class Unifier:
+    """In-place unification over ``TMeta`` cells.
+
+    ``unify`` binds variables in the same direction ``Subst.unify`` does, so
+    resolving a type gives exactly what applying the equivalent substitution
+    would, but a binding is a single assignment instead of a composed
+    mapping. Every assignment, including path compression, is logged on a
+    trail so a failed ``unify`` leaves no partial bindings and a caller can
+    discard everything since a ``mark``.
+
+    Plain ``TVar``s, for instance from schemes the caller put in the
+    environment, share the cell registered under their name and sit at level
+    0, so they are never generalized.
+    """
+
+    def __init__(self) -> None:
+        self.cells: dict[str, TMeta] = {}
+        self.trail: _Trail = []
+        self._resolver = _Resolver(self, final=False)
+        self._zonker = _Resolver(self, final=True)
+
+    def fresh(self, name: str, level: int = 0) -> TMeta:
+        cell = self.cells[name] = TMeta.new(name, level)
+        return cell
+
+    def _cell(self, var: TVar) -> TMeta:
+        if type(var) is TMeta:
+            return var
+        cell = self.cells.get(var.name)
+        if cell is None:
+            cell = self.fresh(var.name)
+        return cell
+
+    def find(self, t: Type) -> Type:
+        """Return the representative of ``t``, compressing the path to it."""
+        path: list[TMeta] = []
+        while isinstance(t, TVar):
+            cell = t if type(t) is TMeta else self.cells.get(t.name)
+            if cell is None:
+                break
+            if cell.ref is None:
+                t = cell
+                break
+            path.append(cell)
+            t = cell.ref
+        for cell in path:
+            if cell.ref is not t:
+                self.trail.append((cell, cell.ref, cell.level))
+                cell.ref = t
+        return t
+
+    def bind(self, var: TVar, t: Type) -> bool:
+        """Bind ``var`` to ``t`` unless ``var`` occurs in it."""
+        cell = self._cell(var)
+        if self._occurs_adjust(cell, t):
+            return False
+        self.trail.append((cell, cell.ref, cell.level))
+        cell.ref = t
+        return True
+
+    def mark(self) -> int:
+        return len(self.trail)
+
+    def undo(self, mark: int) -> None:
+        """Reset every cell assigned since ``mark``."""
+        trail = self.trail
+        while len(trail) > mark:
+            cell, ref, level = trail.pop()
+            cell.ref = ref
+            cell.level = level
+
+    def resolve(self, t: Type) -> Type:
+        """``t`` with every bound variable replaced by its binding."""
+        return self._resolver.apply(t)
+
+    def zonk(self, t: Type) -> Type:
+        """Like ``resolve``, but leave plain ``TVar``s for unbound cells."""
+        return self._zonker.apply(t)
+
+    def generalizable(self, t: Type, level: int) -> list[str]:
+        """The sorted unbound variables of ``t`` whose level is above ``level``."""
+        names = self._resolver.free_vars(self.resolve(t))
+        cells = self.cells
+        return sorted(
+            name for name in names if name in cells and cells[name].level > level
+        )
+
+    def _occurs_adjust(self, cell: TMeta, t: Type) -> bool:
+        """Whether ``cell`` occurs in ``t``, lowering levels in ``t`` to its own.
+
+        Bound variables are looked through in place; no resolved copy of
+        ``t`` is built.
+        """
+        t = self.find(t)
+        if isinstance(t, TVar):
+            if t.name == cell.name:
+                return True
+            if type(t) is TMeta and t.level > cell.level:
+                self.trail.append((t, t.ref, t.level))
+                t.level = cell.level
+            return False
+        if not t._vars:
+            return False
+        if isinstance(t, TFun):
+            return self._occurs_adjust(cell, t.param) or self._occurs_adjust(
+                cell, t.result
+            )
+        if isinstance(t, TList):
+            return self._occurs_adjust(cell, t.elem)
+        if isinstance(t, TTuple):
+            return any(self._occurs_adjust(cell, e) for e in t.elements)
+        if isinstance(t, TCon):
+            return any(self._occurs_adjust(cell, a) for a in t.args)
+        if isinstance(t, TRecord):
+            return any(self._occurs_adjust(cell, v) for _, v in t.fields)
+        if isinstance(t, TIO):
+            return self._occurs_adjust(cell, t.inner)
+        if isinstance(t, TState):
+            return self._occurs_adjust(cell, t.state) or self._occurs_adjust(
+                cell, t.inner
+            )
+        names = self._resolver.free_vars(self.resolve(t))
+        return any(self._occurs_adjust(cell, TVar(name)) for name in names)
+
+    def unify(self, t1: Type, t2: Type) -> bool:
+        """Unify in place; on failure undo any bindings made and return False."""
+        mark = len(self.trail)
+        if self._unify(t1, t2):
+            return True
+        self.undo(mark)
+        return False
+
+    def _unify(self, t1: Type, t2: Type) -> bool:
+        t1 = self.find(t1)
+        t2 = self.find(t2)
+
+        if t1 is t2:
+            return True
+
+        if isinstance(t1, TVar):
+            if isinstance(t2, TVar) and t1.name == t2.name:
+                return True
+            return self.bind(t1, t2)
+
+        if isinstance(t2, TVar):
+            return self.bind(t2, t1)
+
+        if isinstance(t1, TFun) and isinstance(t2, TFun):
+            return self._unify(t1.param, t2.param) and self._unify(
+                t1.result, t2.result
+            )
+
+        if isinstance(t1, TList) and isinstance(t2, TList):
+            return self._unify(t1.elem, t2.elem)
+
+        if isinstance(t1, TTuple) and isinstance(t2, TTuple):
+            if len(t1.elements) != len(t2.elements):
+                return False
+            return all(self._unify(e1, e2) for e1, e2 in zip(t1.elements, t2.elements))
+        return False
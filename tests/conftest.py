@@ -4,3 +4,11 @@ import pytest
 @pytest.fixture
 def sample_pfn_code():
     return 'def main() = "Hello, World!"'
+
+
+@pytest.fixture(autouse=True)
+def pfn_cache_dir(tmp_path, monkeypatch):
+    """Keep cache entries out of the user's cache directory."""
+    directory = tmp_path / "pfn-cache"
+    monkeypatch.setenv("PFN_CACHE_DIR", str(directory))
+    return directory
@@ -20,6 +20,7 @@ from pfn.effects.infer import (
     is_pure,
     get_effect_names,
 )
+from pfn.effects.summary import ModuleEffects
 from pfn.effects.handlers import (
     HandlerContext,
     HandlerRegistry,
@@ -223,3 +224,91 @@ class TestEffectInferer:
         assert inferer.check_effect_handled(IOEffect())
         inferer.pop_handler()
         assert not inferer.check_effect_handled(IOEffect())
+
+
+IO = EffectSet(frozenset({IOEffect()}))
+
+
+def parse_defs(source):
+    from pfn.lexer import Lexer
+    from pfn.parser import Parser
+
+    return Parser(Lexer(source).tokenize()).parse().declarations
+
+
+MODULE = """
+def log x = print x
+def helper x = x + 1
+def even n = if n == 0 then True else odd (n - 1)
+def odd n = if n == 0 then False else even (n - 1)
+def loud n = if n == 0 then log n else loud2 (n - 1)
+def loud2 n = loud n
+def main = helper (log 1)
+"""
+
+
+class TestModuleEffects:
+    def make(self, source=MODULE):
+        effects = ModuleEffects(EffectEnv({"print": IO}))
+        effects.update(parse_defs(source))
+        return effects
+
+    def test_summaries(self):
+        effects = self.make()
+        assert effects.effects_of("log") == IO
+        assert effects.is_pure("helper")
+        assert effects.effects_of("main") == IO
+        assert effects.effects_of("missing") is None
+        assert not effects.is_pure("missing")
+
+    def test_recursive_fixed_point(self):
+        effects = self.make()
+        assert effects.is_pure("even")
+        assert effects.is_pure("odd")
+        assert effects.effects_of("loud") == IO
+        assert effects.effects_of("loud2") == IO
+
+    def test_forward_reference(self):
+        effects = self.make("def main = log 1\ndef log x = print x")
+        assert effects.effects_of("main") == IO
+
+    def test_perform(self):
+        from pfn.parser import ast
+
+        ask = ast.DefDecl(
+            "ask",
+            [ast.Param("x")],
+            ast.PerformExpr("IO", "input", [ast.Var("x")]),
+        )
+        effects = ModuleEffects()
+        effects.update([ask])
+        assert effects.effects_of("ask") == IO
+
+    def test_infer_in_module_scope(self):
+        from pfn.parser import ast
+
+        effects = self.make()
+        assert effects.infer(ast.App(ast.Var("loud"), [ast.IntLit(1)])) == IO
+        assert effects.infer(ast.App(ast.Var("helper"), [ast.IntLit(1)])) == PURE
+
+    def test_update_reinfers_dependents_of_changed_summary(self):
+        effects = self.make()
+        effects.update(parse_defs(MODULE.replace("= print x", "= x")))
+        assert effects.reinferred == ["log", "loud", "loud2", "main"]
+        assert effects.is_pure("main")
+        assert effects.is_pure("loud")
+
+    def test_update_stops_at_unchanged_summary(self):
+        effects = self.make()
+        effects.update(parse_defs(MODULE.replace("x + 1", "x + 2")))
+        assert effects.reinferred == ["helper"]
+        effects.update(parse_defs(MODULE.replace("x + 1", "x + 2")))
+        assert effects.reinferred == []
+
+    def test_update_removed_definition(self):
+        effects = self.make()
+        source = MODULE.replace("def log x = print x\n", "")
+        effects.update(parse_defs(source))
+        assert effects.effects_of("log") is None
+        assert "main" in effects.reinferred
+        assert effects.is_pure("main")
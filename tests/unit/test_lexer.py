@@ -1,6 +1,17 @@
 import pytest
 
-from pfn.lexer import Lexer, LexerError, Token, TokenType
+from pfn.lexer import (
+    LineIndex,
+    Lexer,
+    LexerError,
+    SymbolFlags,
+    SymbolTable,
+    TextEdit,
+    Token,
+    TokenType,
+    read_source,
+    relex,
+)
 
 
 class TestLexerInteger:
@@ -345,3 +356,224 @@ class TestLexerSpan:
         tokens = Lexer("1\n2").tokenize()
         assert tokens[0].span.line == 1
         assert tokens[1].span.line == 2
+
+    def test_span_column_after_multiline_string(self):
+        tokens = Lexer('"a\\\nbc" x').tokenize()
+        assert (tokens[1].span.line, tokens[1].span.column) == (2, 5)
+
+    def test_eof_span(self):
+        tokens = Lexer("a\n").tokenize()
+        assert (tokens[-1].span.line, tokens[-1].span.column) == (2, 1)
+
+
+class TestLineIndex:
+    def test_positions(self):
+        index = LineIndex("ab\ncd\n\nx")
+        assert len(index) == 4
+        assert index.position(0) == (1, 1)
+        assert index.position(2) == (1, 3)
+        assert index.position(3) == (2, 1)
+        assert index.position(6) == (3, 1)
+        assert index.position(7) == (4, 1)
+
+    def test_line_text(self):
+        index = LineIndex("first\nsecond")
+        assert index.line_text(1) == "first"
+        assert index.line_text(2) == "second"
+
+    def test_shared_by_tokens(self):
+        lexer = Lexer("a\nb")
+        tokens = lexer.tokenize()
+        assert all(t.span.lines is lexer.lines for t in tokens)
+
+
+class TestLexerRegexMode:
+    SOURCES = [
+        'def greet name = "Hello, " ++ name ++ "!\\n"',
+        "match xs with\n| [] -> 0\n| x :: rest -> x + sum rest",
+        "let f = \\x -> x * 2.5e-3 in f 1_000",
+        "-- comment\n{ a: 1, b: 'c' } ... .. . <- <= >= != == => -> ::",
+        "_ _foo foo_ True False `x` @py.export ; & && | ||",
+        "'\\n' '\\'' \"a\\\"b\" \"multi\\\nline\"",
+        "caf\u00e9 = 1\u0663 + 2.\u0663 + x\u00a0y",
+    ]
+
+    @pytest.mark.parametrize("source", SOURCES)
+    def test_matches_char_scanner(self, source):
+        assert Lexer(source, regex=True).tokenize() == Lexer(source).tokenize()
+
+    def test_bootstrap_sources_match(self):
+        from pathlib import Path
+
+        root = Path(__file__).resolve().parents[2] / "src" / "pfn" / "bootstrap"
+        for path in sorted(root.glob("*.pfn")):
+            source = path.read_text()
+            assert Lexer(source, regex=True).tokenize() == Lexer(source).tokenize()
+
+    @pytest.mark.parametrize("source", ['"unclosed', "''", "'ab'", "$", '"a\nb"'])
+    def test_errors_match_char_scanner(self, source):
+        with pytest.raises(LexerError) as expected:
+            Lexer(source).tokenize()
+        with pytest.raises(LexerError) as actual:
+            Lexer(source, regex=True).tokenize()
+        assert actual.value.message == expected.value.message
+        assert actual.value.span == expected.value.span
+
+
+class TestTokenBuffer:
+    def test_matches_token_list(self):
+        source = 'def f x = match x with\n| 1 -> "one"\n| _ -> 2.5'
+        buffer = Lexer(source).tokenize_buffer()
+        tokens = Lexer(source).tokenize()
+        assert len(buffer) == len(tokens)
+        assert buffer.to_list() == tokens
+        assert list(buffer) == tokens
+
+    def test_regex_mode_fills_buffer(self):
+        source = "let x = [1, 2] ++ xs in x"
+        buffer = Lexer(source, regex=True).tokenize_buffer()
+        assert buffer.to_list() == Lexer(source).tokenize()
+
+    def test_indexing_materializes_tokens(self):
+        buffer = Lexer("foo\n  bar").tokenize_buffer()
+        token = buffer[1]
+        assert isinstance(token, Token)
+        assert token.type == TokenType.IDENT
+        assert token.value == "bar"
+        assert (token.span.line, token.span.column) == (2, 3)
+        assert buffer[-1].type == TokenType.EOF
+        with pytest.raises(IndexError):
+            buffer[len(buffer)]
+
+    def test_values_are_interned(self):
+        buffer = Lexer("x x x 1 1.0").tokenize_buffer()
+        assert buffer.values == ["x", 1, 1.0]
+        assert buffer[4].value == 1.0
+        assert isinstance(buffer[4].value, float)
+
+
+class TestRelex:
+    SOURCE = 'def f x =\n  let y = x + 1.5 in\n  -- note\n  g "s" y\n\ndef g a b = a'
+
+    def relex_all(self, source, edits):
+        tokens = Lexer(source, regex=True).tokenize_buffer()
+        for edit in edits:
+            result = relex(source, tokens, edit)
+            source, tokens = result.source, result.tokens
+            expected = Lexer(source).tokenize()
+            assert tokens.to_list() == expected
+            assert list(tokens.starts) == [t.span.start for t in expected]
+            assert [t.span.line for t in tokens] == [t.span.line for t in expected]
+            assert tokens.line_index.starts == LineIndex(source).starts
+        return result
+
+    @pytest.mark.parametrize(
+        "edit",
+        [
+            TextEdit(0, 0, "-- header\n"),
+            TextEdit(4, 1, "foo"),
+            TextEdit(5, 0, "oo"),
+            TextEdit(22, 0, "0"),
+            TextEdit(25, 0, "e"),
+            TextEdit(26, 0, "-"),
+            TextEdit(33, 0, "\n"),
+            TextEdit(46, 1, "str"),
+            TextEdit(44, 0, '"x" '),
+            TextEdit(58, 4, ""),
+        ],
+    )
+    def test_matches_full_tokenize(self, edit):
+        self.relex_all(self.SOURCE, [edit])
+
+    def test_consecutive_edits(self):
+        offset = self.SOURCE.index("in")
+        edits = [TextEdit(offset + i, 0, c) for i, c in enumerate(" * 2\n ")]
+        edits += [TextEdit(3, 2, ""), TextEdit(len(self.SOURCE) - 4, 0, "h ")]
+        self.relex_all(self.SOURCE, edits)
+
+    def test_rescans_only_near_edit(self):
+        source = "\n".join(f"def f{i} x = x + {i}" for i in range(200))
+        offset = source.index("f100") + 2
+        result = self.relex_all(source, [TextEdit(offset, 0, "9")])
+        assert result.new_stop - result.start == 1
+        assert result.old_stop - result.start == 1
+
+    def test_error_in_edit(self):
+        tokens = Lexer(self.SOURCE).tokenize_buffer()
+        with pytest.raises(LexerError, match="Unterminated string"):
+            relex(self.SOURCE, tokens, TextEdit(47, 1, ""))
+
+
+class TestBytesSource:
+    @pytest.mark.parametrize(
+        "source",
+        [
+            'def f x = "héllo" ++ x -- café',
+            "café = 1٣ + 2.٣ + x y",
+            "let c = 'é' in '\\n'",
+            "中文 _ __ x1 1_000 1.5e3",
+        ],
+    )
+    def test_matches_text(self, source):
+        expected = Lexer(source).tokenize()
+        tokens = Lexer(source.encode("utf-8")).tokenize()
+        assert [(t.type, t.value) for t in tokens] == [
+            (t.type, t.value) for t in expected
+        ]
+        assert [(t.span.line, t.span.column) for t in tokens] == [
+            (t.span.line, t.span.column) for t in expected
+        ]
+
+    def test_error_span_counts_characters(self):
+        with pytest.raises(LexerError) as exc:
+            Lexer('x = "éé\n"'.encode("utf-8")).tokenize()
+        assert exc.value.message == "Unterminated string"
+        assert (exc.value.span.line, exc.value.span.column) == (1, 5)
+
+    def test_read_source_maps_file(self, tmp_path):
+        path = tmp_path / "main.pfn"
+        path.write_text("def main = \"é\"\n", encoding="utf-8")
+        tokens = Lexer(read_source(path)).tokenize_buffer()
+        assert tokens.to_list()[3].value == "é"
+        assert tokens.line_index.line_text(1) == 'def main = "é"'
+
+    def test_read_source_empty_file(self, tmp_path):
+        path = tmp_path / "empty.pfn"
+        path.write_text("")
+        assert Lexer(read_source(path)).tokenize()[0].type == TokenType.EOF
+
+
+class TestSymbolTable:
+    def test_identifiers_are_interned(self):
+        source = "foo bar foo foo"
+        for tokens in (
+            Lexer(source).tokenize(),
+            Lexer(source, regex=True).tokenize(),
+            Lexer(source.encode()).tokenize(),
+        ):
+            assert tokens[0].value is tokens[2].value is tokens[3].value
+
+    def test_flags(self):
+        tokens = Lexer('def Just lambda x "Foo" True').tokenize()
+        assert tokens[0].flags == SymbolFlags.KEYWORD | SymbolFlags.PY_KEYWORD
+        assert tokens[1].flags == SymbolFlags.CONSTRUCTOR
+        assert tokens[2].flags == SymbolFlags.PY_KEYWORD
+        assert tokens[3].flags == SymbolFlags.NONE
+        assert tokens[4].flags == SymbolFlags.NONE
+        assert tokens[5].flags & SymbolFlags.KEYWORD
+        assert tokens[5].flags & SymbolFlags.CONSTRUCTOR
+
+    def test_buffer_and_list_flags_agree(self):
+        source = "match x with | Some class -> class"
+        buffer = Lexer(source, regex=True).tokenize_buffer()
+        tokens = Lexer(source).tokenize()
+        assert [t.flags for t in buffer] == [t.flags for t in tokens]
+        assert [t.flags for t in buffer.to_list()] == [t.flags for t in tokens]
+
+    def test_table_shared_per_compilation(self):
+        symbols = SymbolTable()
+        first = Lexer("count", symbols=symbols).tokenize()[0].value
+        second = Lexer("x = count", symbols=symbols).tokenize()[2].value
+        assert first is second
+        assert symbols.lookup("count").type == TokenType.IDENT
+        assert symbols.lookup("where").type == TokenType.KW_WHERE
@@ -1,8 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from pfn.lexer import Lexer
-from pfn.parser import Parser, ParseError
-from pfn.parser import ast
+from pfn.lexer import Lexer, LexerError, TokenType
+from pfn.parser import (
+    ASTCache,
+    IncrementalParser,
+    Parser,
+    ParseError,
+    ast,
+    parse_parallel,
+)
+from pfn.parser.cache import cache_dir, cache_path
 
 
 class TestParserLiterals:
@@ -148,6 +157,30 @@ class TestParserBinaryOps:
         assert isinstance(expr, ast.BinOp)
         assert expr.op == "=="
 
+    def test_cons_is_right_associative(self):
+        expr = Parser(Lexer("a :: b :: c").tokenize()).parse_expr()
+        assert expr.op == "::"
+        assert isinstance(expr.left, ast.Var)
+        assert expr.right.op == "::"
+
+    def test_concat_is_left_associative(self):
+        expr = Parser(Lexer("a ++ b ++ c").tokenize()).parse_expr()
+        assert expr.op == "++"
+        assert expr.left.op == "++"
+        assert isinstance(expr.right, ast.Var)
+
+    def test_precedence_levels(self):
+        expr = Parser(Lexer("x || 1 + 2 * -3 :: xs == ys && z").tokenize()).parse_expr()
+        assert expr.op == "||"
+        conj = expr.right
+        assert conj.op == "&&"
+        assert conj.left.op == "=="
+        cons = conj.left.left
+        assert cons.op == "::"
+        assert cons.left.op == "+"
+        assert cons.left.right.op == "*"
+        assert isinstance(cons.left.right.right, ast.UnaryOp)
+
 
 class TestParserIf:
     def test_simple_if(self):
@@ -283,3 +316,272 @@ class TestParserType:
         decl = module.declarations[0]
         assert isinstance(decl, ast.TypeDecl)
         assert len(decl.constructors) == 2
+
+
+class TestParserLookahead:
+    def test_nested_matches_share_case_lookahead(self, monkeypatch):
+        depth = 30
+        source = "\n".join(
+            ["def f x = let r = match x with"]
+            + ["  | A -> match x with"] * depth
+            + ["  | B -> 0", "  (p, q, s) = pair", "  in r"]
+        )
+        calls = 0
+        parse_pattern = Parser._parse_pattern
+
+        def counting(self):
+            nonlocal calls
+            calls += 1
+            return parse_pattern(self)
+
+        monkeypatch.setattr(Parser, "_parse_pattern", counting)
+        module = Parser(Lexer(source).tokenize()).parse()
+        binding = module.declarations[0].body
+        assert isinstance(binding, ast.Let)
+        assert isinstance(binding.body, ast.LetPattern)
+        # One per case, then the tuple and its three elements are parsed
+        # once speculatively and once for real, not once per match level.
+        assert calls == depth + 1 + 2 * 4
+
+    def test_long_application(self):
+        args = " ".join(f"a{i}" for i in range(300))
+        expr = Parser(Lexer(f"g {args}\nh = 1").tokenize()).parse_expr()
+        count = 0
+        while isinstance(expr, ast.App):
+            expr = expr.func
+            count += 1
+        assert count == 300
+
+    def test_nested_constructor_arguments(self):
+        source = "def f x = g " + "Foo (g " * 50 + "x" + ")" * 50
+        expected = Parser(Lexer(source).tokenize()).parse()
+        assert Parser(Lexer(source, regex=True).stream()).parse() == expected
+        assert expected.declarations[0].body.func.args[0].name == "Foo"
+
+
+class TestAstNodes:
+    def test_nodes_have_no_instance_dict(self):
+        module = Parser(Lexer("def f x = if x then [1] else []").tokenize()).parse()
+        decl = module.declarations[0]
+        for node in (module, decl, decl.params[0], decl.body, decl.body.then_branch):
+            assert not hasattr(node, "__dict__")
+
+    def test_unknown_attribute_is_rejected(self):
+        with pytest.raises(AttributeError):
+            ast.Var("x").span = None
+
+
+class TestParserTokenBuffer:
+    def test_parses_buffer_like_list(self):
+        source = (
+            "def sum xs = match xs with\n"
+            "| [] -> 0\n"
+            "| x :: rest -> x + sum rest\n"
+            "def main = let y = sum [1, 2, 3] in y * 2"
+        )
+        expected = Parser(Lexer(source).tokenize()).parse()
+        actual = Parser(Lexer(source, regex=True).tokenize_buffer()).parse()
+        assert actual == expected
+
+    def test_error_reports_span(self):
+        with pytest.raises(ParseError) as exc:
+            Parser(Lexer("def f = (1").tokenize_buffer()).parse()
+        assert exc.value.token.span.line == 1
+
+
+class TestParserTokenStream:
+    SOURCE = (
+        "module Demo\n"
+        "type Shape = Circle Int | Square Int\n"
+        "def area s = match s with\n"
+        "| Circle r -> r * r * 3\n"
+        "| Square w -> w * w\n"
+        "def main =\n"
+        "  let a = area (Circle 2)\n"
+        "  b = area (Square 3)\n"
+        "  in a + b"
+    )
+
+    @pytest.mark.parametrize("chunk", [1, 2, 64])
+    def test_parses_stream_like_list(self, chunk):
+        expected = Parser(Lexer(self.SOURCE).tokenize()).parse()
+        stream = Lexer(self.SOURCE, regex=True).stream()
+        stream.chunk = chunk
+        assert Parser(stream).parse() == expected
+
+    def test_window_holds_one_declaration(self):
+        source = "\n".join(f"def f{i} x = x + {i}" for i in range(100))
+        stream = Lexer(source).stream()
+        stream.chunk = 1
+        parser = Parser(stream)
+        widths = []
+        while not parser._check(TokenType.EOF):
+            parser._parse_declaration()
+            widths.append(len(parser._window))
+            parser._release()
+        assert max(widths) <= 8
+
+    def test_lexer_error_surfaces_when_reached(self):
+        with pytest.raises(LexerError, match="Unterminated string"):
+            Parser(Lexer('def f = 1\ndef g = "x').stream()).parse()
+
+
+class TestIncrementalParser:
+    SOURCE = (
+        "module Demo\n"
+        "import List\n"
+        "type Shape = Circle Int | Square Int\n"
+        "def area s = match s with\n"
+        "| Circle r -> r * r * 3\n"
+        "| Square w -> w * w\n"
+        "def double x = x * 2\n"
+        "def main = area (Circle 2)\n"
+    )
+
+    def test_matches_full_parse(self):
+        tokens = Lexer(self.SOURCE).tokenize()
+        module = IncrementalParser().parse(tokens)
+        assert module == Parser(tokens).parse()
+        assert module.name == "Demo"
+
+    def test_reuses_unchanged_declarations(self):
+        parser = IncrementalParser()
+        before = parser.parse(Lexer(self.SOURCE).tokenize())
+        edited = self.SOURCE.replace("x * 2", "x + x")
+        after = parser.parse(Lexer(edited, regex=True).tokenize_buffer())
+        assert after == Parser(Lexer(edited).tokenize()).parse()
+        assert (parser.parsed, parser.reused) == (1, 5)
+        reused = [a is b for a, b in zip(before.declarations, after.declarations)]
+        assert reused == [True, True, True, False, True]
+
+    def test_moved_and_duplicated_declarations(self):
+        parser = IncrementalParser()
+        parser.parse(Lexer("def a = 1\ndef b = 2\n").tokenize())
+        module = parser.parse(Lexer("\n\ndef b = 2\ndef a = 1\ndef a = 1\n").tokenize())
+        assert [d.name for d in module.declarations] == ["b", "a", "a"]
+        assert module.declarations[1] is not module.declarations[2]
+        assert (parser.parsed, parser.reused) == (1, 2)
+
+    def test_error_matches_full_parse(self):
+        source = "def a = 1\ndef b = (2\ndef c = 3"
+        with pytest.raises(ParseError) as expected:
+            Parser(Lexer(source).tokenize()).parse()
+        with pytest.raises(ParseError) as actual:
+            IncrementalParser().parse(Lexer(source).tokenize())
+        assert actual.value.message == expected.value.message
+        assert actual.value.token == expected.value.token
+
+
+class TestParseParallel:
+    SOURCE = TestIncrementalParser.SOURCE
+
+    def test_thread_pool_matches_serial(self):
+        tokens = Lexer(self.SOURCE, regex=True).tokenize_buffer()
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            module = parse_parallel(tokens, workers=3, executor=pool)
+        assert module == Parser(tokens).parse()
+        assert module.name == "Demo"
+
+    def test_process_pool_matches_serial(self):
+        tokens = Lexer(self.SOURCE).tokenize()
+        assert parse_parallel(tokens, workers=2) == Parser(tokens).parse()
+
+    def test_error_matches_serial(self):
+        source = "def a = 1\ndef b = (2\ndef c = )\n"
+        with pytest.raises(ParseError) as expected:
+            Parser(Lexer(source).tokenize()).parse()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with pytest.raises(ParseError) as actual:
+                parse_parallel(Lexer(source).tokenize(), workers=2, executor=pool)
+        assert actual.value.message == expected.value.message
+        assert actual.value.token == expected.value.token
+
+
+class TestASTCache:
+    SOURCE = "def inc x = x + 1\ndef main = inc 41\n"
+
+    def write(self, tmp_path, text):
+        path = tmp_path / "demo.pfn"
+        path.write_text(text)
+        return path
+
+    def test_second_parse_hits(self, tmp_path):
+        path = self.write(tmp_path, self.SOURCE)
+        cache = ASTCache()
+        first = cache.parse(path, path.read_bytes())
+        second = cache.parse(path, path.read_bytes())
+        assert second == first == Parser(Lexer(self.SOURCE).tokenize()).parse()
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache_path(path).parent == cache_dir()
+        assert not (tmp_path / "__pfncache__").exists()
+
+    def test_changed_source_misses_and_replaces_entry(self, tmp_path):
+        path = self.write(tmp_path, self.SOURCE)
+        cache = ASTCache()
+        cache.parse(path, self.SOURCE)
+        changed = self.SOURCE.replace("41", "1")
+        module = cache.parse(path, changed)
+        assert module.declarations[1].body.args[0].value == 1
+        assert cache.load(path, self.SOURCE) is None
+        assert cache.load(path, changed) == module
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        path = self.write(tmp_path, self.SOURCE)
+        cache = ASTCache()
+        cache.parse(path, self.SOURCE)
+        entry = cache_path(path)
+        entry.write_bytes(entry.read_bytes()[:-10])
+        assert cache.load(path, self.SOURCE) is None
+        cache.parse(path, self.SOURCE)
+        assert cache.load(path, self.SOURCE) is not None
+
+    def test_unloadable_pickle_is_a_miss(self, tmp_path):
+        import pickle
+        import zlib
+
+        from pfn.parser.cache import _MAGIC, source_digest
+
+        path = self.write(tmp_path, self.SOURCE)
+        entry = cache_path(path)
+        entry.parent.mkdir(parents=True)
+        # Refers to a module that no longer exists.
+        stale = pickle.dumps(ast.Module(None, [])).replace(b"parser.ast", b"parser.old")
+        header = _MAGIC + source_digest(self.SOURCE)
+        entry.write_bytes(header + zlib.compress(stale))
+        assert ASTCache().load(path, self.SOURCE) is None
+
+    def test_key_covers_parser_sources(self):
+        from pfn.parser.cache import sources_digest
+
+        assert sources_digest("parser") != sources_digest("lexer")
+        assert sources_digest("parser") == sources_digest("parser")
+
+    def test_same_name_in_another_directory_is_another_entry(self, tmp_path):
+        first = self.write(tmp_path, self.SOURCE)
+        (tmp_path / "other").mkdir()
+        second = tmp_path / "other" / first.name
+        second.write_text(self.SOURCE)
+        assert cache_path(first) != cache_path(second)
+
+    def test_salt_is_computed_lazily(self):
+        import os
+        import subprocess
+        import sys
+        from pathlib import Path
+
+        import pfn
+
+        code = (
+            "import pfn.parser.cache as c, pfn.typechecker.cache as t, pfn.repl;"
+            " print(c._salt.cache_info().misses + t._salt.cache_info().misses)"
+        )
+        env = dict(os.environ, PYTHONPATH=str(Path(pfn.__file__).parent.parent))
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        )
+        assert out.stdout.strip() == "0"
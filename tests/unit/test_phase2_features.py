@@ -31,6 +31,8 @@ from pfn.typechecker.exhaustiveness import (
     PList,
     PTuple,
     check_exhaustiveness,
+    check_matches,
+    constructor_signatures,
     pattern_to_string,
     format_missing_patterns,
 )
@@ -41,6 +43,8 @@ from pfn.typechecker.rows import (
     row_restrict,
     row_has_field,
     row_labels,
+    rewrite_row,
+    unify_rows,
 )
 
 
@@ -212,6 +216,97 @@ class TestExhaustiveness:
         assert "True" in formatted
         assert "False" in formatted
 
+    def test_user_sum_type(self):
+        from pfn.parser import ast
+
+        decl = ast.TypeDecl(
+            "Shape",
+            constructors=[
+                ast.Constructor("Dot"),
+                ast.Constructor("Circle", [ast.SimpleTypeRef("Int")]),
+            ],
+        )
+        signatures = constructor_signatures([decl])
+        result = check_exhaustiveness([PCon("Dot")], signatures=signatures)
+        assert [pattern_to_string(p) for p in result.missing_patterns] == ["Circle _"]
+        result = check_exhaustiveness(
+            [PCon("Circle", (PWild(),)), PCon("Dot")], signatures=signatures
+        )
+        assert result.exhaustive
+
+    def test_nested_witness(self):
+        patterns = [
+            PCon("Some", (PTuple((PWild(), PBool(True))),)),
+            PCon("None"),
+        ]
+        result = check_exhaustiveness(patterns)
+        assert [pattern_to_string(p) for p in result.missing_patterns] == [
+            "Some (_, False)"
+        ]
+
+    def test_redundant_by_union_of_arms(self):
+        patterns = [
+            PTuple((PBool(True), PWild())),
+            PTuple((PWild(), PBool(True))),
+            PTuple((PBool(True), PBool(True))),
+            PTuple((PBool(False), PBool(False))),
+        ]
+        result = check_exhaustiveness(patterns)
+        assert result.exhaustive
+        assert result.redundant_patterns == [2]
+
+    def test_lists(self):
+        result = check_exhaustiveness([PList(()), PList((PWild(),))])
+        assert [pattern_to_string(p) for p in result.missing_patterns] == [
+            "_ :: _ :: _"
+        ]
+
+    def test_wide_literal_match(self):
+        patterns = [PInt(i) for i in range(2000)] + [PInt(7), PWild()]
+        result = check_exhaustiveness(patterns)
+        assert result.exhaustive
+        assert result.redundant_patterns == [2000]
+
+    def test_module_matches_use_declared_types(self):
+        from pfn.lexer import Lexer
+        from pfn.parser import Parser
+
+        source = (
+            "type Color\n| Red | Green | Blue\n"
+            "def name c = match c with | Red -> 1 | Green -> 2\n"
+            "def all c = match c with | Red -> 1 | Green -> 2 | Blue -> 3\n"
+            "def opt x = match x with | Some y -> y | _ -> 0 | None -> 1\n"
+            "def pos x = match x with | n if n > 0 -> 1 | 0 -> 0\n"
+        )
+        module = Parser(Lexer(source).tokenize()).parse()
+        warnings = check_matches(module.declarations)
+        assert [str(w) for w in warnings] == [
+            "in name: match is not exhaustive, missing Blue",
+            "in opt: match arm 3 is unreachable",
+            "in pos: match is not exhaustive, missing _",
+        ]
+
+    def test_unconfirmed_constructors_are_not_reported_missing(self):
+        from pfn.lexer import Lexer
+        from pfn.parser import Parser
+
+        def warnings(source):
+            module = Parser(Lexer(source).tokenize()).parse()
+            return [str(w) for w in check_matches(module.declarations)]
+
+        # Ok comes with Error among the built-ins, not Err.
+        source = (
+            "def ok r = match r with | Ok x -> x | Err e -> 0\n"
+            "def tag t = match t with | Leaf -> 0\n"
+        )
+        assert warnings(source) == []
+        declared = "type Outcome\n| Ok Int | Err String\n"
+        source = (
+            declared + "def ok r = match r with | Ok x -> x | Err e -> 0\n"
+            "def out r = match r with | Ok x -> x\n"
+        )
+        assert warnings(source) == ["in out: match is not exhaustive, missing Err _"]
+
 
 class TestRowPolymorphism:
     def test_row_empty(self):
@@ -246,6 +341,45 @@ class TestRowPolymorphism:
         assert r.rest == "r"
         assert row_has_field(r, "name")
 
+    def test_row_fields_sorted_and_hashable(self):
+        r = Row({"name": TString(), "age": TInt()}, "r")
+        assert list(r.fields) == ["age", "name"]
+        assert r == Row({"age": TInt(), "name": TString()}, "r")
+        assert hash(r) == hash(Row({"age": TInt(), "name": TString()}, "r"))
+        assert TRowPoly({"b": TInt(), "a": TVar("x")}) is TRowPoly(
+            {"a": TVar("x"), "b": TInt()}
+        )
+
+    def test_unify_closed_rows(self):
+        r1 = Row({"x": TVar("a"), "y": TInt()})
+        s = unify_rows(r1, Row({"y": TInt(), "x": TString()}), Subst())
+        assert s is not None
+        assert s.apply(TVar("a")) == TString()
+        assert unify_rows(r1, Row({"x": TInt()}), Subst()) is None
+
+    def test_unify_open_with_closed_row(self):
+        r1 = Row({"x": TInt()}, "r")
+        r2 = Row({"x": TInt(), "y": TString()})
+        s = unify_rows(r1, r2, Subst())
+        assert s is not None
+        assert rewrite_row(r1, s) == r2
+        assert unify_rows(Row({"z": TInt()}, "r"), r2, Subst()) is None
+
+    def test_unify_open_rows_share_tail(self):
+        r1 = Row({"x": TInt()}, "r")
+        r2 = Row({"y": TString()}, "s")
+        s = unify_rows(r1, r2, Subst(), fresh=lambda: "t")
+        assert s is not None
+        expected = Row({"x": TInt(), "y": TString()}, "t")
+        assert rewrite_row(r1, s) == expected
+        assert rewrite_row(r2, s) == expected
+        assert unify_rows(r1, Row({"y": TString()}, "r"), Subst()) is None
+
+    def test_apply_splices_bound_tail(self):
+        s = Subst({"r": TRowPoly({"y": TVar("a")}, "q"), "a": TInt()})
+        t = s.apply(TRowPoly({"x": TInt()}, "r"))
+        assert t is TRowPoly({"x": TInt(), "y": TInt()}, "q")
+
 
 class TestRankNTypes:
     def test_rank1_type(self):
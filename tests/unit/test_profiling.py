@@ -0,0 +1,136 @@
+import cProfile
+import json
+import pstats
+import time
+
+import pytest
+
+from pfn.cli import main
+from pfn.profiling import Timings, collapsed_stacks, declaration, write_profile
+from pfn.session import CompilationSession
+
+
+SOURCE = "def double x = x + x\ndef main = double 21\n"
+
+
+class TestTimings:
+    def test_nested_phase_is_not_counted_twice(self):
+        timings = Timings(memory=False)
+        with timings.phase("outer"):
+            with timings.phase("inner"):
+                time.sleep(0.02)
+        inner, outer = timings.phases
+        assert (inner.phase, outer.phase) == ("inner", "outer")
+        assert inner.seconds >= 0.02
+        assert outer.seconds < inner.seconds
+
+    def test_peak_memory(self):
+        with Timings() as timings:
+            with timings.phase("alloc"):
+                data = bytearray(1 << 20)
+                del data
+            with timings.phase("idle"):
+                pass
+        alloc, idle = timings.phases
+        assert alloc.peak_bytes >= 1 << 20
+        assert idle.peak_bytes < 1 << 20
+
+    def test_declaration_is_a_no_op_unless_entered(self):
+        timings = Timings(memory=False)
+        with declaration("f"):
+            pass
+        with timings:
+            with timings.phase("typecheck"):
+                with declaration("isEven", "isOdd"):
+                    pass
+        with declaration("g"):
+            pass
+        [timing] = timings.declarations
+        assert timing.phase == "typecheck"
+        assert timing.declaration == "isEven, isOdd"
+
+    def test_session_phases(self):
+        with Timings(memory=False) as timings:
+            session = CompilationSession(SOURCE, timings=timings)
+            session.check()
+            session.effects
+            session.python
+        phases = [timing.phase for timing in timings.phases]
+        assert phases == ["parse", "typecheck", "effects", "codegen"]
+        checked = [t for t in timings.declarations if t.phase == "typecheck"]
+        assert [timing.declaration for timing in checked] == ["double", "main"]
+        data = timings.to_json()
+        assert json.loads(json.dumps(data)) == data
+        assert "declaration" not in data["phases"][0]
+
+    def test_timings_json_from_the_cli(self, tmp_path, capsys):
+        path = tmp_path / "m.pfn"
+        path.write_text(SOURCE)
+        out = tmp_path / "timings.json"
+        args = ["check", "--no-cache", "--timings-json", str(out), str(path)]
+        assert main(args) == 0
+        data = json.loads(out.read_text())
+        assert data["command"] == "check"
+        assert data["module"] == str(path)
+        phases = [p["phase"] for p in data["phases"]]
+        assert phases == ["parse", "exhaustiveness", "typecheck"]
+        assert "Timings for" not in capsys.readouterr().err
+
+    def test_timings_do_not_change_the_error_reported(self, tmp_path):
+        from pfn.parser import ParseError
+
+        # A parse error early on and a lexer error far past the lookahead.
+        body = "".join(f"def g{i} = {i}\n" for i in range(200))
+        source = "def f x = if x then 1\n" + body + 'def h = "oops\n'
+        with pytest.raises(ParseError):
+            CompilationSession(source).module
+        with Timings(memory=False) as timings:
+            with pytest.raises(ParseError):
+                CompilationSession(source, timings=timings).module
+
+    def test_timings_do_not_change_the_work_done(self, tmp_path, capsys):
+        path = tmp_path / "m.pfn"
+        path.write_text(SOURCE)
+        out = tmp_path / "timings.json"
+        assert main(["check", "--no-cache", "--effects", str(path)]) == 0
+        untimed = capsys.readouterr().out
+        args = ["check", "--no-cache", "--effects", "--timings-json", str(out)]
+        assert main([*args, str(path)]) == 0
+        assert capsys.readouterr().out == untimed
+        assert "double ! Pure" in untimed
+        phases = [p["phase"] for p in json.loads(out.read_text())["phases"]]
+        assert phases[-1] == "effects"
+
+
+def _fib(n):
+    return n if n < 2 else _fib(n - 1) + _fib(n - 2)
+
+
+def _work():
+    return _fib(18)
+
+
+class TestProfile:
+    def test_collapsed_stacks(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        _work()
+        profile.disable()
+        stacks = collapsed_stacks(pstats.Stats(profile))
+        [fib] = [stack for stack in stacks if stack[-1].startswith("_fib ")]
+        assert fib[-2].startswith("_work ")
+        total = sum(stacks.values())
+        assert stacks[fib] > total / 2
+
+    def test_write_profile(self, tmp_path):
+        profile = cProfile.Profile()
+        profile.enable()
+        _work()
+        profile.disable()
+        path = tmp_path / "out.prof"
+        collapsed = write_profile(profile, path)
+        assert collapsed == tmp_path / "out.prof.collapsed"
+        assert pstats.Stats(str(path)).total_calls > 0
+        for line in collapsed.read_text().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert stack and int(count) > 0
@@ -0,0 +1,78 @@
+import pytest
+
+from pfn.parser import ASTCache
+from pfn.session import CompilationSession
+from pfn.typechecker import SchemeCache, TypeError as PfnTypeError
+from pfn.types import Scheme, TInt, TypeEnv
+
+
+SOURCE = "def double x = x + x\ndef main = double 21\n"
+
+
+class TestCompilationSession:
+    def test_stages_are_computed_once(self):
+        session = CompilationSession(SOURCE)
+        module = session.module
+        schemes = session.schemes
+        assert session.module is module
+        assert session.schemes is schemes
+        assert [decl.name for decl in session.definitions] == ["double", "main"]
+        assert str(session.type_env.lookup("main").type) == "Int"
+
+    def test_execute_runs_the_generated_code(self):
+        session = CompilationSession(SOURCE)
+        python = session.python
+        namespace = session.execute()
+        assert namespace["main"] == 42
+        assert session.python is python
+
+    def test_type_error_is_kept(self):
+        session = CompilationSession('def main = 1 + "a"\n')
+        error = session.check()
+        assert isinstance(error, PfnTypeError)
+        assert session.check() is error
+        with pytest.raises(PfnTypeError):
+            session.schemes
+
+    def test_checks_in_the_given_env(self):
+        env = TypeEnv().extend("base", Scheme([], TInt()))
+        session = CompilationSession("def main = base + 1\n", env=env)
+        assert session.check() is None
+        assert session.type_env.lookup("base") is not None
+
+    def test_match_warnings(self, capsys):
+        from pfn.cli import report_types
+
+        source = "def f x = match x with | Some y -> y\n"
+        session = CompilationSession(source)
+        [warning] = session.match_warnings
+        assert warning.definition == "f"
+        report_types(session)
+        assert "missing None" in capsys.readouterr().err
+
+    def test_repl_type_of_goes_through_a_session(self, capsys):
+        from pfn.repl import REPL
+
+        repl = REPL()
+        repl._eval("def double x = x + x")
+        env = repl.global_env
+        repl._type_of("double 2")
+        repl._type_of('double "a"')
+        out = capsys.readouterr().out.splitlines()
+        assert out[-2] == "double 2 : Int"
+        assert out[-1].startswith("Type error:")
+        assert repl.global_env is env
+
+    def test_from_path_uses_the_caches(self, tmp_path):
+        path = tmp_path / "m.pfn"
+        path.write_text(SOURCE)
+        first = CompilationSession.from_path(
+            path, ast_cache=ASTCache(), scheme_cache=SchemeCache()
+        )
+        first.check()
+        scheme_cache = SchemeCache()
+        second = CompilationSession.from_path(
+            path, ast_cache=ASTCache(), scheme_cache=scheme_cache
+        )
+        assert second.schemes == first.schemes
+        assert scheme_cache.rechecked == []
@@ -1,3 +1,9 @@
+import copy
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 from pfn.types import (
     Type,
     TInt,
@@ -8,9 +14,11 @@ from pfn.types import (
     TFun,
     TList,
     TTuple,
+    TForall,
     Scheme,
     TypeEnv,
     Subst,
+    Unifier,
 )
 from pfn.lexer import Lexer
 from pfn.parser import Parser
@@ -85,6 +93,42 @@ class TestSubstitution:
         assert result == TInt()
 
 
+class TestHashConsing:
+    def test_ground_types_are_singletons(self):
+        assert TInt() is TInt()
+        assert TFun(TInt(), TList(TBool())) is TFun(TInt(), TList(TBool()))
+
+    def test_equal_types_are_identical(self):
+        assert TFun(TVar("a"), TInt()) is TFun(TVar("a"), TInt())
+        assert TTuple([TInt(), TVar("a")]) is TTuple((TInt(), TVar("a")))
+        assert TFun(TVar("a"), TInt()) is not TFun(TVar("b"), TInt())
+
+    def test_cached_free_vars(self):
+        t = TFun(TVar("a"), TTuple([TVar("b"), TInt()]))
+        assert t.free_vars == {"a", "b"}
+        assert not t.ground
+        assert TList(TInt()).ground
+        assert TForall(("a",), TFun(TVar("a"), TVar("b"))).free_vars == {"b"}
+
+    def test_apply_keeps_untouched_nodes(self):
+        t = TFun(TVar("a"), TList(TVar("b")))
+        s = Subst({"a": TInt()})
+        assert s.apply(t.result) is t.result
+        assert s.apply(t) is TFun(TInt(), TList(TVar("b")))
+
+    def test_copies_are_interned(self):
+        t = TFun(TVar("a"), TInt())
+        assert copy.deepcopy(t) is t
+        assert pickle.loads(pickle.dumps(t)) is t
+
+    def test_cells_are_distinct(self):
+        u = Unifier()
+        a, b = u.fresh("a"), Unifier().fresh("a")
+        assert a is not b
+        assert a != b
+        assert u.zonk(TFun(a, TInt())) is TFun(TVar("a"), TInt())
+
+
 class TestTypeEnv:
     def test_empty_env(self):
         env = TypeEnv()
@@ -104,6 +148,75 @@ class TestTypeEnv:
         assert env.lookup("x").type == TInt()
         assert env.lookup("y").type == TString()
 
+    def test_extend_leaves_original_unchanged(self):
+        env = TypeEnv({"x": Scheme([], TInt())})
+        extended = env.extend("y", Scheme([], TString()))
+        assert env.lookup("y") is None
+        assert len(env) == 1
+        assert len(extended) == 2
+
+    def test_shadowing_keeps_size(self):
+        env = TypeEnv().extend("x", Scheme([], TInt()))
+        env = env.extend("x", Scheme([], TString()))
+        assert env.lookup("x").type == TString()
+        assert len(env) == 1
+
+    def test_remove_and_merge(self):
+        env = TypeEnv({"x": Scheme([], TInt()), "y": Scheme([], TBool())})
+        removed = env.remove("x").remove("missing")
+        assert removed.lookup("x") is None
+        assert env.lookup("x") is not None
+        merged = removed.merge(TypeEnv({"y": Scheme([], TString())}))
+        assert merged.lookup("y").type == TString()
+        assert len(merged) == 1
+
+    def test_bindings_is_a_snapshot(self):
+        env = TypeEnv({"x": Scheme([], TInt())})
+        env.bindings["y"] = Scheme([], TInt())
+        assert env.lookup("y") is None
+
+    def test_many_bindings(self):
+        env = TypeEnv()
+        for i in range(2000):
+            env = env.extend(f"v{i}", Scheme([], TInt()))
+        smaller = env
+        for i in range(0, 2000, 2):
+            smaller = smaller.remove(f"v{i}")
+        assert len(env) == 2000
+        assert len(smaller) == 1000
+        assert smaller.lookup("v1") is not None
+        assert smaller.lookup("v2") is None
+        assert sorted(smaller.bindings) == sorted(f"v{i}" for i in range(1, 2000, 2))
+
+    def test_hash_collisions(self):
+        from pfn.types.hamt import HAMT
+
+        class Key:
+            def __init__(self, name):
+                self.name = name
+
+            def __hash__(self):
+                return 7
+
+            def __eq__(self, other):
+                return isinstance(other, Key) and other.name == self.name
+
+        a, b, c = Key("a"), Key("b"), Key("c")
+        m = HAMT([(a, 1), (b, 2)]).set(c, 3).set(a, 4)
+        assert (m.get(a), m.get(b), m.get(c), len(m)) == (4, 2, 3, 3)
+        m = m.delete(b).delete(c)
+        assert dict(m.items()) == {a: 4}
+
+    def test_match_pattern_variables_do_not_leak(self):
+        from pfn.typechecker import TypeChecker
+
+        source = "match (1, True) with | (a, b) -> a"
+        expr = Parser(Lexer(source).tokenize()).parse_expr()
+        checker = TypeChecker()
+        assert checker.infer(expr) == TInt()
+        assert checker.env.lookup("a") is None
+        assert checker.env.lookup("b") is None
+
 
 class TestUnification:
     def test_unify_same_type(self):
@@ -146,6 +259,72 @@ class TestUnification:
         assert result is None
 
 
+class TestUnifier:
+    def test_unify_binds_in_place(self):
+        u = Unifier()
+        a, b = u.fresh("a"), u.fresh("b")
+        assert u.unify(TFun(a, TInt()), TFun(TString(), b))
+        assert u.zonk(a) == TString()
+        assert u.zonk(TFun(a, b)) == TFun(TString(), TInt())
+
+    def test_zonk_leaves_plain_vars(self):
+        u = Unifier()
+        a, b = u.fresh("a"), u.fresh("b")
+        assert u.unify(a, b)
+        assert u.resolve(a) is b
+        assert type(u.zonk(a)) is TVar
+        assert u.zonk(a) == TVar("b")
+
+    def test_path_compression(self):
+        u = Unifier()
+        cells = [u.fresh(f"v{i}") for i in range(50)]
+        for left, right in zip(cells, cells[1:]):
+            assert u.unify(left, right)
+        assert u.unify(cells[-1], TInt())
+        assert u.find(cells[0]) == TInt()
+        assert all(cell.ref == TInt() for cell in cells)
+
+    def test_failed_unify_leaves_no_bindings(self):
+        u = Unifier()
+        a = u.fresh("a")
+        assert not u.unify(TTuple((a, TInt())), TTuple((TBool(), TString())))
+        assert a.ref is None
+        assert u.trail == []
+
+    def test_occurs_check_follows_bindings(self):
+        u = Unifier()
+        a, b = u.fresh("a"), u.fresh("b")
+        assert u.unify(b, TList(a))
+        assert not u.unify(a, TFun(TInt(), b))
+
+    def test_plain_vars_share_named_cell(self):
+        u = Unifier()
+        assert u.unify(TVar("a"), TInt())
+        assert u.zonk(TList(TVar("a"))) == TList(TInt())
+
+    def test_undo_to_mark(self):
+        u = Unifier()
+        a, b = u.fresh("a"), u.fresh("b")
+        assert u.unify(a, TInt())
+        mark = u.mark()
+        assert u.unify(b, a)
+        u.undo(mark)
+        assert b.ref is None
+        assert u.zonk(a) == TInt()
+
+    def test_infer_resets_bindings(self):
+        from pfn.typechecker import TypeChecker
+
+        checker = TypeChecker()
+        x = checker.fresh_var()
+        env = TypeEnv().extend("x", Scheme((), x))
+        checker.env = env
+        expr = Parser(Lexer("x + 1").tokenize()).parse_expr()
+        assert checker.infer(expr) == TInt()
+        assert checker.unifier.zonk(x) == TVar(x.name)
+        assert checker.unifier.trail == []
+
+
 class TestTypeInference:
     def test_infer_int_literal(self):
         from pfn.typechecker import TypeChecker
@@ -156,6 +335,16 @@ class TestTypeInference:
         t = checker.infer(expr)
         assert t == TInt()
 
+    def test_guard_sees_pattern_variables(self):
+        from pfn.typechecker import TypeChecker
+
+        for source in (
+            "match 5 with | x if x > 0 -> x | _ -> 0",
+            "match (1, 2) with | (a, b) if a == b -> a | _ -> 0",
+        ):
+            expr = Parser(Lexer(source).tokenize()).parse_expr()
+            assert TypeChecker().infer(expr) == TInt()
+
     def test_infer_float_literal(self):
         from pfn.typechecker import TypeChecker
 
@@ -246,3 +435,198 @@ class TestTypeInference:
         checker = TypeChecker()
         t = checker.infer(expr)
         assert isinstance(t, TTuple)
+
+
+class TestGeneralization:
+    def _infer(self, source, env=None):
+        from pfn.typechecker import TypeChecker
+
+        expr = Parser(Lexer(source).tokenize()).parse_expr()
+        return TypeChecker(env).infer(expr)
+
+    def test_let_generalizes_fresh_variables(self):
+        t = self._infer("let id = fn x => x in (id 1, id True)")
+        assert t == TTuple((TInt(), TBool()))
+
+    def test_let_does_not_generalize_resolved_variables(self):
+        from pfn.typechecker import TypeError as PfnTypeError
+
+        with pytest.raises(PfnTypeError):
+            self._infer('let f = fn x => x + 1 in f "s"')
+
+    def test_lambda_bound_variable_stays_monomorphic(self):
+        t = self._infer("fn y => let g = fn x => y in (g 1, g True)")
+        assert isinstance(t, TFun)
+        assert t.result == TTuple((t.param, t.param))
+
+    def test_generalize_does_not_scan_environment(self, monkeypatch):
+        def fail(self, env):
+            raise AssertionError("environment scanned")
+
+        monkeypatch.setattr(Subst, "free_vars_env", fail)
+        env = TypeEnv({f"v{i}": Scheme((), TVar(f"a{i}")) for i in range(100)})
+        t = self._infer("let id = fn x => x in id 1", env)
+        assert t == TInt()
+
+    def test_free_environment_variable_is_not_generalized(self):
+        env = TypeEnv({"y": Scheme((), TVar("a"))})
+        t = self._infer("let g = y in (g + 1, g)", env)
+        assert t == TTuple((TInt(), TInt()))
+
+    def test_infer_definition(self):
+        from pfn.parser.ast import DefDecl
+        from pfn.typechecker import TypeChecker
+
+        source = "def inc x = x + 1\ndef ident x = x"
+        decls = Parser(Lexer(source).tokenize()).parse().declarations
+        assert all(isinstance(d, DefDecl) for d in decls)
+        checker = TypeChecker()
+        inc = checker.infer_definition(decls[0])
+        ident = checker.infer_definition(decls[1])
+        assert inc == Scheme((), TFun(TInt(), TInt()))
+        assert len(ident.vars) == 1
+        assert ident.type == TFun(TVar(ident.vars[0]), TVar(ident.vars[0]))
+        assert checker.level == 0
+        assert checker.unifier.trail == []
+
+
+class TestCheckDefinitions:
+    SOURCE = """
+def main = fact 5
+def fact n = if n == 0 then 1 else n * fact (n - 1)
+def isEven n = if n == 0 then True else isOdd (n - 1)
+def isOdd n = if n == 0 then False else isEven (n - 1)
+def ident x = x
+def pair = (ident 1, ident "s")
+def shadow fact = fact + 1
+"""
+
+    def _decls(self, source):
+        return Parser(Lexer(source).tokenize()).parse().declarations
+
+    def test_graph_and_components(self):
+        from pfn.typechecker import definition_graph, strongly_connected_components
+
+        decls = self._decls(self.SOURCE)
+        graph = definition_graph(decls)
+        assert graph == [[1], [1], [3], [2], [], [4], []]
+        components = strongly_connected_components(graph)
+        assert components == [[1], [0], [2, 3], [4], [5], [6]]
+
+    def test_free_names_respect_binders(self):
+        from pfn.typechecker import free_names
+
+        [decl] = self._decls(
+            "def f x = let y = g x in match y with | (a, b) -> a + h b"
+        )
+        assert free_names(decl.body, frozenset(["x"])) == {"g", "h"}
+
+    def test_forward_and_mutual_references(self):
+        from pfn.typechecker import check_definitions
+
+        schemes = check_definitions(self._decls(self.SOURCE))
+        types = [str(scheme.type) for scheme in schemes]
+        assert types[:4] == ["Int", "Int -> Int", "Int -> Bool", "Int -> Bool"]
+        assert schemes[4].vars == ("t1",)
+        assert types[5:] == ["(Int, String)", "Int -> Int"]
+
+    def test_recursive_uses_are_monomorphic(self):
+        from pfn.typechecker import TypeError as PfnTypeError, check_definitions
+
+        decls = self._decls('def f x = g x + 1\ndef g y = f "s" ++ "t"')
+        with pytest.raises(PfnTypeError):
+            check_definitions(decls)
+
+    def test_thread_pool_matches_serial(self):
+        from pfn.typechecker import check_definitions
+
+        decls = self._decls(self.SOURCE)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            schemes = check_definitions(decls, workers=3, executor=pool)
+        assert schemes == check_definitions(decls)
+
+    def test_process_pool_matches_serial(self):
+        from pfn.typechecker import check_definitions
+
+        decls = self._decls(self.SOURCE)
+        assert check_definitions(decls, workers=2) == check_definitions(decls)
+
+    def test_error_matches_serial(self):
+        from pfn.typechecker import TypeError as PfnTypeError, check_definitions
+
+        decls = self._decls('def a = 1 + "x"\ndef b = c 1\ndef c = 2')
+        with pytest.raises(PfnTypeError) as expected:
+            check_definitions(decls)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with pytest.raises(PfnTypeError) as actual:
+                check_definitions(decls, workers=2, executor=pool)
+        assert str(actual.value) == str(expected.value)
+
+
+class TestSchemeCache:
+    SOURCE = TestCheckDefinitions.SOURCE
+
+    def _decls(self, source):
+        return Parser(Lexer(source).tokenize()).parse().declarations
+
+    def _check(self, source, path):
+        from pfn.typechecker import SchemeCache, check_definitions
+
+        cache = SchemeCache()
+        cache.load(path)
+        try:
+            schemes = check_definitions(self._decls(source), cache=cache)
+        finally:
+            cache.store(path)
+        return schemes, cache
+
+    def test_unchanged_module_is_not_rechecked(self, tmp_path):
+        path = tmp_path / "m.pfn"
+        schemes, cache = self._check(self.SOURCE, path)
+        assert sorted(cache.rechecked) == sorted(
+            ["main", "fact", "isEven", "isOdd", "ident", "pair", "shadow"]
+        )
+        cached, cache = self._check(self.SOURCE, path)
+        assert cached == schemes
+        assert cache.rechecked == []
+        assert cache.reused == 7
+
+    def test_only_edited_definitions_are_rechecked(self, tmp_path):
+        path = tmp_path / "m.pfn"
+        self._check(self.SOURCE, path)
+        edited = self.SOURCE.replace("then 1 else", "then 2 else")
+        _, cache = self._check("def extra = 0\n" + edited, path)
+        assert cache.rechecked == ["extra", "fact"]
+
+    def test_changed_scheme_rechecks_dependents(self, tmp_path):
+        path = tmp_path / "m.pfn"
+        self._check(self.SOURCE, path)
+        edited = self.SOURCE.replace("def ident x = x", "def ident x = x + 0")
+        from pfn.typechecker import TypeError as PfnTypeError
+
+        with pytest.raises(PfnTypeError):
+            self._check(edited, path)
+        edited = edited.replace('ident "s"', "ident 2")
+        schemes, cache = self._check(edited, path)
+        assert cache.rechecked == ["pair"]
+        assert str(schemes[5].type) == "(Int, Int)"
+
+    def test_unreadable_entry_is_a_miss(self, tmp_path):
+        from pfn.typechecker.cache import scheme_cache_path
+
+        path = tmp_path / "m.pfn"
+        self._check(self.SOURCE, path)
+        scheme_cache_path(path).write_bytes(b"garbage")
+        _, cache = self._check(self.SOURCE, path)
+        assert cache.reused == 0
+        assert len(cache.rechecked) == 7
+
+    def test_changed_checker_is_a_miss(self, tmp_path, monkeypatch):
+        from pfn.typechecker import cache as scheme_cache
+
+        path = tmp_path / "m.pfn"
+        self._check(self.SOURCE, path)
+        monkeypatch.setattr(scheme_cache, "_salt", lambda: b"another checker")
+        _, cache = self._check(self.SOURCE, path)
+        assert cache.reused == 0
+        assert len(cache.rechecked) == 7
@@ -1,11 +1,14 @@
+import pytest
+
 from pfn.typechecker.classes import (
     ClassContext,
     ClassInfo,
     InstanceInfo,
+    build_dictionary,
     get_default_context,
     resolve_instance,
 )
-from pfn.types import TCon
+from pfn.types import TCon, TConstraint, TInt, TVar
 
 
 class TestClassContext:
@@ -45,3 +48,89 @@ class TestClassContext:
         ctx.add_instance("Show", TCon("String"), {"show": "show_string_impl"})
         method = ctx.get_method("Show", TCon("String"), "show")
         assert method == "show_string_impl"
+
+
+class TestInstanceIndex:
+    def make_context(self):
+        ctx = ClassContext()
+        ctx.add_class("Eq", ["a"], {"eq": None}, defaults={"neq": "default_neq"})
+        ctx.add_class("Ord", ["a"], {"lt": None}, superclasses=["Eq"])
+        ctx.add_instance("Eq", TCon("Int"), {"eq": "eq_int"})
+        ctx.add_instance(
+            "Eq",
+            TCon("List", (TVar("a"),)),
+            {"eq": "eq_list"},
+            constraints=(TConstraint("Eq", TVar("a")),),
+        )
+        return ctx
+
+    def test_polymorphic_instance_with_constraint(self):
+        ctx = self.make_context()
+        inst = ctx.lookup_instance("Eq", TCon("List", (TCon("Int"),)))
+        assert inst is not None
+        assert inst.methods["eq"] == "eq_list"
+        nested = TCon("List", (TCon("List", (TCon("Int"),)),))
+        assert ctx.lookup_instance("Eq", nested) is inst
+
+    def test_unsatisfied_constraint_rejected(self):
+        ctx = self.make_context()
+        assert ctx.lookup_instance("Eq", TCon("List", (TCon("Float"),))) is None
+
+    def test_builtin_type_matches_constructor(self):
+        ctx = self.make_context()
+        assert ctx.lookup_instance("Eq", TInt()) is not None
+
+    def test_memo_invalidated_by_add_instance(self):
+        ctx = self.make_context()
+        float_list = TCon("List", (TCon("Float"),))
+        assert ctx.lookup_instance("Eq", float_list) is None
+        ctx.add_instance("Eq", TCon("Float"), {"eq": "eq_float"})
+        assert ctx.lookup_instance("Eq", float_list) is not None
+
+    def test_cycle_does_not_depend_on_query_order(self):
+        def make_cyclic():
+            ctx = ClassContext()
+            ctx.add_class("C", ["a"], {"c": None})
+            ctx.add_instance(
+                "C",
+                TCon("List", (TVar("a"),)),
+                {"c": "c_list"},
+                constraints=(TConstraint("C", TVar("a")),),
+            )
+            ctx.add_instance(
+                "C",
+                TInt(),
+                {"c": "c_int"},
+                constraints=(TConstraint("C", TCon("List", (TInt(),))),),
+            )
+            ctx.add_instance("C", TCon("List", (TVar("b"),)), {"c": "c_any_list"})
+            return ctx
+
+        ints = TCon("List", (TInt(),))
+        fresh = make_cyclic().lookup_instance("C", TInt())
+        assert fresh is not None
+        ctx = make_cyclic()
+        assert ctx.lookup_instance("C", ints) is not None
+        inst = ctx.lookup_instance("C", TInt())
+        assert inst is not None
+        assert inst.methods == fresh.methods
+
+    def test_specific_instance_preferred(self):
+        ctx = self.make_context()
+        ctx.add_instance("Eq", TCon("List", (TCon("Int"),)), {"eq": "eq_ints"})
+        inst = ctx.lookup_instance("Eq", TCon("List", (TCon("Int"),)))
+        assert inst.methods["eq"] == "eq_ints"
+
+    def test_superclass_closure(self):
+        ctx = self.make_context()
+        ctx.add_class("Num", ["a"], {"add": None}, superclasses=["Ord"])
+        assert ctx.superclass_closure("Num") == {"Ord", "Eq"}
+        assert ctx.get_all_superclasses("Num") == {"Ord", "Eq"}
+
+    def test_dictionary_shared_and_read_only(self):
+        ctx = self.make_context()
+        d = build_dictionary(ctx, "Eq", TCon("Int"))
+        assert d == {"eq": "eq_int", "neq": "default_neq"}
+        assert build_dictionary(ctx, "Eq", TCon("Int")) is d
+        with pytest.raises(TypeError):
+            d["eq"] = None